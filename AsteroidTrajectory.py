@@ -1,183 +1,217 @@
-from vpython import *
+"""Interactive VPython scene: the Sun-Earth-Moon system, an asteroid and its impact.
+
+Importing this module is cheap: vpython is imported, and the scene and
+its controls are built, only when main() starts the app, and folium only
+when the first impact map is drawn (see impact_map.py).
+"""
 import math
-import folium
-import webbrowser
-import os
+import random
 import time
 
-# Constants
-G = 6.67430e-11  # Gravitational constant
-AU = 1.496e11    # Astronomical unit in meters
-EARTH_ROTATION_PERIOD = 86400  # Earth's rotation period in seconds (1 day)
-MOON_DISTANCE = 384400 * 1000  # Distance to Moon in meters
-EARTH_RADIUS = 6.371e6  # Earth's radius in meters
+import physics
+import integrators
+import events
+import checkpoint
+import trails
+import parameters
+import profiling
+from impact_map import ImpactMapWorker, MapCache
+from physics import G, AU, EARTH_ROTATION_PERIOD, MOON_DISTANCE, EARTH_RADIUS
+from scenarios import REAL_ASTEROIDS, PRESETS, real_asteroid_scenario
+
+vp = None  # The vpython module, imported by main()
+
+# Snapshots of the running simulation
+CHECKPOINT_FILE = "asteroid_checkpoint.npz"  # Save Snapshot / Restore Snapshot
+AUTOSAVE_FILE = "asteroid_autosave.npz"  # Automatic snapshots, kept apart from the saved one
+CHECKPOINT_EVERY = 1000  # Steps between automatic snapshots while the asteroid is active
+
+# Frame pacing: physics runs in substeps between rendered frames
+FRAME_RATE = 60  # Rendered frames per second
+FRAME_BUDGET = 0.6 / FRAME_RATE  # Wall-clock seconds of physics per frame
+
+# Status display
+HUD_RATE = 8  # Status refreshes per second
+
+# Per-phase frame timings (see profiling.py)
+TIMING_LOG = "frame_timings.csv"
+TIMING_WINDOW = 60  # Frames averaged in the live overlay
 
 # Zoom limits
 MIN_ZOOM_RANGE = 1.2 * AU  # Minimum zoom distance
 MAX_ZOOM_RANGE = 10 * AU   # Maximum zoom distance
 
-# Planet data with scaled-up sizes for visibility
+# Planet visuals with scaled-up sizes for visibility (physical data lives in physics.BODY_DATA)
+# Colors are RGB tuples; trail_points is the vertex budget of each body's trail
 PLANET_DATA = {
-    'Sun': {'mass': 1.989e30, 'radius': 0.25, 'distance': 0, 'velocity': 0, 'color': color.yellow, 'trail': color.orange},
-    'Earth': {'mass': 5.972e24, 'radius': 0.12, 'distance': 1.0, 'velocity': 29.78, 'color': color.white, 'trail': color.cyan},
-    'Moon': {'mass': 7.347e22, 'radius': 0.055, 'distance': 0.00257, 'velocity': 1.022, 'color': color.white, 'trail': vector(0.9,0.9,0.9), 'parent': 'Earth'}
+    'Sun': {'radius': 0.25, 'color': (1, 1, 0), 'trail': (1, 0.6, 0), 'trail_points': 50},
+    'Earth': {'radius': 0.12, 'color': (1, 1, 1), 'trail': (0, 1, 1), 'trail_points': 600},
+    'Moon': {'radius': 0.055, 'color': (1, 1, 1), 'trail': (0.9, 0.9, 0.9), 'trail_points': 1500}
 }
+ASTEROID_TRAIL_POINTS = 800
+TRAIL_MAX_SPACING = 0.2 * AU  # Longest straight trail segment
 
-# Real asteroids database
-REAL_ASTEROIDS = {
-    "99942 Apophis": {
-        "description": "Potentially hazardous asteroid, closest approach to Earth in 2029",
-        "diameter_km": 0.34,
-        "mass_kg": 6.1e10,
-        "orbit_distance_au": 1.1,
-        "velocity_kms": 30.7,
-        "threat_level": "Medium",
-        "discovery_year": 2004,
-        "coordinates": [40.7128, -74.0060]  # New York
-    },
-    "101955 Bennu": {
-        "description": "B-type asteroid, target of OSIRIS-REx mission",
-        "diameter_km": 0.49,
-        "mass_kg": 7.8e10,
-        "orbit_distance_au": 1.2,
-        "velocity_kms": 28.0,
-        "threat_level": "Low",
-        "discovery_year": 1999,
-        "coordinates": [51.5074, -0.1278]  # London
-    },
-    "1 Ceres": {
-        "description": "Largest object in the asteroid belt, dwarf planet",
-        "diameter_km": 939.4,
-        "mass_kg": 9.1e20,
-        "orbit_distance_au": 2.8,
-        "velocity_kms": 17.9,
-        "threat_level": "None",
-        "discovery_year": 1801,
-        "coordinates": [41.9028, 12.4964]  # Rome
-    },
-    "4 Vesta": {
-        "description": "Second most massive asteroid in the asteroid belt",
-        "diameter_km": 525.4,
-        "mass_kg": 2.6e20,
-        "orbit_distance_au": 2.4,
-        "velocity_kms": 19.3,
-        "threat_level": "None",
-        "discovery_year": 1807,
-        "coordinates": [48.8566, 2.3522]  # Paris
-    },
-    "1036 Ganymed": {
-        "description": "Large Amor-type asteroid, first discovered of its type",
-        "diameter_km": 31.7,
-        "mass_kg": 3.3e16,
-        "orbit_distance_au": 1.6,
-        "velocity_kms": 23.5,
-        "threat_level": "Very Low",
-        "discovery_year": 1924,
-        "coordinates": [52.5200, 13.4050]  # Berlin
-    },
-    "1566 Icarus": {
-        "description": "Apollo group asteroid with highly eccentric orbit",
-        "diameter_km": 1.4,
-        "mass_kg": 3.6e12,
-        "orbit_distance_au": 1.1,
-        "velocity_kms": 34.0,
-        "threat_level": "Low",
-        "discovery_year": 1949,
-        "coordinates": [35.6762, 139.6503]  # Tokyo
-    },
-    "433 Eros": {
-        "description": "Amor group asteroid, first asteroid orbited by a spacecraft",
-        "diameter_km": 16.8,
-        "mass_kg": 6.7e15,
-        "orbit_distance_au": 1.5,
-        "velocity_kms": 24.4,
-        "threat_level": "Very Low",
-        "discovery_year": 1898,
-        "coordinates": [55.7558, 37.6176]  # Moscow
-    },
-    "2101 Adonis": {
-        "description": "Apollo group asteroid, potentially hazardous object",
-        "diameter_km": 1.0,
-        "mass_kg": 1.8e12,
-        "orbit_distance_au": 1.0,
-        "velocity_kms": 31.2,
-        "threat_level": "Medium",
-        "discovery_year": 1936,
-        "coordinates": [50.4501, 30.5234]  # Kyiv
-    }
-}
+class Caption:
+    """Caption HTML collected in order and sent in as few pushes as possible
+
+    Text is buffered and sent as one append_to_caption when a widget is
+    placed (widgets are positioned at the end of the caption) or on flush.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.parts = []
+
+    def add(self, html):
+        self.parts.append(html)
+
+    def flush(self):
+        if self.parts:
+            self.canvas.append_to_caption(''.join(self.parts))
+            self.parts = []
+
+    def widget(self, factory, **options):
+        """Create a widget after the text added so far"""
+        self.flush()
+        return factory(**options)
+
+class Trail:
+    """Decimated, bounded orbit trail drawn as a single curve (see trails.py)"""
+    def __init__(self, trail_color, radius, budget):
+        self.buffer = trails.TrailBuffer(budget, max_spacing=TRAIL_MAX_SPACING)
+        self.curve = vp.curve(color=trail_color, radius=radius)
+
+    def update(self, pos):
+        """Extend the trail to pos, sending only the changed vertices"""
+        committed, dropped = self.buffer.append(pos)
+        if self.curve.npoints == 0:
+            self.curve.append([vp.vector(*point) for point in self.buffer.points()])
+        elif committed:
+            self.curve.append(vp.vector(*self.buffer.tip))
+            if dropped:
+                self.curve.shift()
+        else:
+            self.curve.modify(self.curve.npoints - 1, pos=vp.vector(*self.buffer.tip))
+
+    def clear(self):
+        self.buffer.clear()
+        self.curve.clear()
+
+    def hide(self):
+        self.curve.visible = False
+
+    def show(self):
+        self.curve.visible = True
 
 class CelestialBody:
-    def __init__(self, name, mass, pos, vel, radius, body_color, trail_color):
-        self.name = name
-        self.mass = mass
-        self.pos = vector(pos[0], pos[1], pos[2])
-        self.vel = vector(vel[0], vel[1], vel[2])
-        self.force = vector(0, 0, 0)
+    """Visual representation of a physics.Body"""
+    def __init__(self, body, radius, body_color, trail_color, trail_points=ASTEROID_TRAIL_POINTS):
+        self.body = body
+        self.name = body.name
         self.rotation_angle = 0
         self.original_radius = radius
         self.current_radius = radius
         self.destroyed = False
+        name = self.name
         
         # Create sphere with enhanced visual effects and textures
+        trail_radius = radius * AU * (0.1 if name == "Sun" else 0.01 if name == "Earth" else 0.05)
+        self.trail = Trail(trail_color, trail_radius, trail_points)
         if name == "Sun":
             # Sun with glow effect
-            self.sphere = sphere(
+            self.sphere = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU,
-                color=color.yellow,
-                make_trail=True,
-                trail_color=trail_color,
-                trail_radius=radius * AU * 0.1,
+                color=vp.color.yellow,
                 shininess=1.0,
                 emissive=True
             )
             # Additional glow
-            self.glow = sphere(
+            self.glow = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU * 1.4,
-                color=color.orange,
+                color=vp.color.orange,
                 opacity=0.2
             )
             # Inner glow
-            self.inner_glow = sphere(
+            self.inner_glow = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU * 1.1,
-                color=color.red,
+                color=vp.color.red,
                 opacity=0.1
             )
             
         elif name == "Earth":
             # Earth with texture and atmosphere
-            self.sphere = sphere(
+            self.sphere = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU,
-                color=vector(1, 1, 1),
-                make_trail=True,
-                trail_color=trail_color,
-                trail_radius=radius * AU * 0.01,
+                color=vp.vector(1, 1, 1),
                 shininess=0.7,
-                texture=textures.earth
+                texture=vp.textures.earth
             )
             # Add atmosphere
-            self.atmosphere = sphere(
+            self.atmosphere = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU * 1.05,
-                color=vector(0.4, 0.7, 1.0),
+                color=vp.vector(0.4, 0.7, 1.0),
                 opacity=0.3
             )
             
         else:
             # Asteroid or Moon
-            self.sphere = sphere(
+            self.sphere = vp.sphere(
                 pos=self.pos,
                 radius=radius * AU,
                 color=body_color,
-                make_trail=True,
-                trail_color=trail_color,
-                trail_radius=radius * AU * 0.05,
                 shininess=0.1
             )
+        self.part_colors = [vp.vector(part.color) for part in self.parts()]
+
+    def parts(self):
+        """Scene objects drawn for this body"""
+        return [getattr(self, name) for name in ('sphere', 'glow', 'inner_glow', 'atmosphere') if hasattr(self, name)]
+
+    def hide(self):
+        for part in self.parts():
+            part.visible = False
+        self.trail.hide()
+
+    def attach(self, body):
+        """Reuse these scene objects for body with their original look"""
+        self.body = body
+        self.destroyed = False
+        self.current_radius = self.original_radius
+        self.sphere.radius = self.original_radius * AU
+        for part, part_color in zip(self.parts(), self.part_colors):
+            part.color = part_color
+            part.visible = True
+        self.trail.clear()
+        self.trail.show()
+        self.update_visuals()
+
+    @property
+    def pos(self):
+        return vp.vector(*self.body.pos)
+
+    @property
+    def vel(self):
+        return vp.vector(*self.body.vel)
+
+    @property
+    def mass(self):
+        return self.body.mass
+
+    def update_visuals(self):
+        """Move sphere, trail and attached effects to the body position"""
+        pos = self.pos
+        self.sphere.pos = pos
+        self.trail.update(self.body.pos)
+        if hasattr(self, 'atmosphere'):
+            self.atmosphere.pos = pos
+        if hasattr(self, 'glow'):
+            self.glow.pos = pos
+        if hasattr(self, 'inner_glow'):
+            self.inner_glow.pos = pos
 
     def update_rotation(self, time_step):
         """Update planet rotation"""
@@ -188,12 +222,12 @@ class CelestialBody:
             
             # Visual rotation effect through color change
             rotation_factor = math.sin(self.rotation_angle) * 0.1 + 1.0
-            self.sphere.color = vector(0.2 * rotation_factor, 0.5, 1.0 * rotation_factor)
-            
+            self.sphere.color = vp.vector(0.2 * rotation_factor, 0.5, 1.0 * rotation_factor)
+
             # Rotate atmosphere
             if hasattr(self, 'atmosphere'):
-                self.atmosphere.rotate(angle=rotation_speed * time_step, axis=vector(0, 0, 1))
-        
+                self.atmosphere.rotate(angle=rotation_speed * time_step, axis=vp.vector(0, 0, 1))
+
         elif self.name == "Moon":
             # Moon rotation around its axis (synchronized with orbit)
             rotation_speed = 2 * math.pi / (27.3 * 24 * 3600)  # 27.3 days
@@ -210,21 +244,6 @@ class CelestialBody:
             if hasattr(self, 'atmosphere'):
                 self.atmosphere.radius = self.current_radius * AU * 1.05
 
-def calculate_gravitational_force(body1, body2):
-    """Calculate gravitational force between two bodies"""
-    r_vec = body2.pos - body1.pos
-    r_mag = mag(r_vec)
-    if r_mag == 0:
-        return vector(0, 0, 0)
-    
-    r_unit = r_vec / r_mag
-    force_mag = G * body1.mass * body2.mass / (r_mag ** 2)
-    return force_mag * r_unit
-
-def calculate_moon_orbital_velocity(earth_mass, distance):
-    """Calculate Moon's orbital velocity for circular orbit around Earth"""
-    return math.sqrt(G * earth_mass / distance)
-
 def create_moon_orbit_line(earth_pos, radius):
     """Create a thin Moon orbit line"""
     orbit_points = []
@@ -235,181 +254,77 @@ def create_moon_orbit_line(earth_pos, radius):
         x = earth_pos.x + radius * math.cos(angle)
         y = earth_pos.y + radius * math.sin(angle)
         z = earth_pos.z
-        orbit_points.append(vector(x, y, z))
-    
-    return curve(
+        orbit_points.append(vp.vector(x, y, z))
+
+    return vp.curve(
         pos=orbit_points,
-        color=vector(0.7, 0.7, 0.7),
+        color=vp.vector(0.7, 0.7, 0.7),
         radius=radius * 0.002,  # Very thin line
         opacity=0.6
     )
 
-def create_explosion(pos, size=1.0):
-    """Create explosion effect"""
-    explosion_effects = []
-    
-    # Main explosion
-    explosion_sphere = sphere(
-        pos=pos,
-        radius=size * AU * 0.3,
-        color=color.orange,
-        opacity=0.8,
-        emissive=True
-    )
-    explosion_effects.append(explosion_sphere)
-    
-    # Inner explosion
-    inner_explosion = sphere(
-        pos=pos,
-        radius=size * AU * 0.15,
-        color=color.yellow,
-        opacity=0.9,
-        emissive=True
-    )
-    explosion_effects.append(inner_explosion)
-    
-    # Particles
-    for i in range(20):
-        angle = random() * 2 * math.pi
-        speed = random() * AU * 0.001
-        particle_pos = pos + vector(
-            cos(angle) * speed * 0.1,
-            sin(angle) * speed * 0.1,
-            (random() - 0.5) * speed * 0.1
-        )
-        
-        particle = sphere(
-            pos=particle_pos,
-            radius=size * AU * 0.02,
-            color=vector(1, random() * 0.5, 0),
-            emissive=True
-        )
-        explosion_effects.append(particle)
-    
-    return explosion_effects
-
-def animate_explosion(explosion_effects, frame_count):
-    """Animate explosion effect"""
-    if frame_count > 100:
-        # Remove effects after 100 frames
-        for effect in explosion_effects:
-            if effect.visible:
-                effect.visible = False
-                del effect
-        return []
-    
-    # Increase explosion size
-    opacity = max(0, 1 - frame_count * 0.01)
-    
-    if explosion_effects:  # Check if list is not empty
-        for i, effect in enumerate(explosion_effects):
-            if effect.visible:
-                if i < 2:  # Main explosion spheres
-                    effect.radius *= 1.02
-                    effect.opacity = opacity
-                else:  # Particles
-                    # Move particles outward
-                    if len(explosion_effects) > 0:
-                        direction = effect.pos - explosion_effects[0].pos
-                        if mag(direction) > 0:
-                            effect.pos += direction * 0.001
-                    effect.opacity = opacity
-    
-    return explosion_effects
+class ExplosionPool:
+    """Fixed set of explosion spheres reused for every impact"""
+    PARTICLES = 20
+    FRAMES = 100
 
-def create_impact_map(lat, lon, mass, velocity, angle_deg):
-    """Create 2D impact map for asteroid"""
-    print(f"Creating impact map for coordinates: {lat}, {lon}")
-    
-    # Calculate energy
-    total_energy = 0.5 * mass * velocity**2
-    angle_radians = math.radians(angle_deg)
-    effective_energy = total_energy * math.sin(angle_radians)
-    
-    # Classify asteroid
-    if effective_energy < 1e15:
-        category = "Small"
-        consequences = "Local damage, minor atmospheric effects."
-        scale_factor = 3
-    elif effective_energy < 1e18:
-        category = "Medium"
-        consequences = "Significant destruction, strong shockwave."
-        scale_factor = 8
-    else:
-        category = "Large"
-        consequences = "Global consequences, significant climate impact."
-        scale_factor = 20
-    
-    # Calculate impact radius
-    base_radius = (effective_energy ** (1/3.85)) * scale_factor / 1000  # km
-    if base_radius > 20000:
-        base_radius = 20000  # Limit to Earth's size
-    
-    print(f"Asteroid category: {category}")
-    print(f"Effective energy: {effective_energy:.2e} J")
-    print(f"Impact radius: {base_radius:.1f} km")
-    
-    # Risk zones
-    zones = [
-        (base_radius * 0.3, 'red', 'High-risk zone'),
-        (base_radius * 0.6, 'orange', 'Medium-risk zone'),
-        (base_radius, 'yellow', 'Low-risk zone')
-    ]
-    
-    # Create map
-    zoom = 6 if base_radius < 200 else 4 if base_radius < 800 else 3
+    def __init__(self):
+        # Main and inner explosion, then particles; all hidden until an impact
+        self.core = [
+            vp.sphere(radius=1, color=vp.color.orange, opacity=0.8, emissive=True, visible=False),
+            vp.sphere(radius=1, color=vp.color.yellow, opacity=0.9, emissive=True, visible=False)
+        ]
+        self.particles = [vp.sphere(radius=1, emissive=True, visible=False) for i in range(self.PARTICLES)]
+        self.center = vp.vector(0, 0, 0)
+        self.frame_count = 0
+        self.active = False
 
-    bounds = [
-        [lat - 90, lon - 180],
-        [lat + 90, lon + 180]
-    ]
+    def start(self, pos, size=1.0):
+        """Show the explosion effect at pos"""
+        self.center = pos
+        self.frame_count = 0
+        self.active = True
+        for effect, radius, opacity in zip(self.core, (0.3, 0.15), (0.8, 0.9)):
+            effect.pos = pos
+            effect.radius = size * AU * radius
+            effect.opacity = opacity
+            effect.visible = True
+        
+        for particle in self.particles:
+            angle = random.random() * 2 * math.pi
+            speed = random.random() * AU * 0.001
+            particle.pos = pos + vp.vector(
+                math.cos(angle) * speed * 0.1,
+                math.sin(angle) * speed * 0.1,
+                (random.random() - 0.5) * speed * 0.1
+            )
+            particle.radius = size * AU * 0.02
+            particle.color = vp.vector(1, random.random() * 0.5, 0)
+            particle.opacity = 1
+            particle.visible = True
 
-    m = folium.Map(
-        location=[lat, lon],
-        zoom_start=zoom,
-        min_zoom=2,
-        max_zoom=8,
-        max_bounds=True
-    )
-    m.fit_bounds(bounds)
-    
-    # Impact point marker
-    folium.Marker(
-        location=[lat, lon],
-        popup=(f"Asteroid impact\n"
-               f"Mass: {mass:.2e} kg\n"
-               f"Velocity: {velocity:.2e} m/s\n"
-               f"Angle: {angle_deg}°\n"
-               f"Energy: {effective_energy:.2e} J\n"
-               f"Category: {category}\n"
-               f"Consequences: {consequences}"),
-        icon=folium.Icon(color="red", icon="star")
-    ).add_to(m)
-    
-    # Colored risk zones
-    for radius_km, color, label in zones:
-        folium.Circle(
-            location=[lat, lon],
-            radius=radius_km * 1000,
-            color=color,
-            fill=True,
-            fill_opacity=0.3,
-            popup=f"{label} ({radius_km:.1f} km)"
-        ).add_to(m)
-    
-    # Save and open map
-    output_file = "asteroid_impact_map.html"
-    m.save(output_file)
-    print(f"Map saved as '{output_file}'")
-    
-    # Automatically open in browser
-    try:
-        webbrowser.open(f'file://{os.path.abspath(output_file)}')
-        print("Map opened in browser!")
-    except Exception as e:
-        print(f"Failed to open browser: {e}")
-    
-    return output_file
+    def animate(self):
+        """Advance the explosion by one frame and hide it when it has faded"""
+        if not self.active:
+            return
+        self.frame_count += 1
+        if self.frame_count > self.FRAMES:
+            self.hide()
+            return
+        
+        # Grow the core and move particles outward while fading
+        opacity = max(0, 1 - self.frame_count * 0.01)
+        for effect in self.core:
+            effect.radius *= 1.02
+            effect.opacity = opacity
+        for particle in self.particles:
+            particle.pos += (particle.pos - self.center) * 0.001
+            particle.opacity = opacity
+
+    def hide(self):
+        for effect in self.core + self.particles:
+            effect.visible = False
+        self.active = False
 
 def limit_camera_zoom():
     """Limit camera zoom"""
@@ -420,49 +335,32 @@ def limit_camera_zoom():
 
 def set_camera_center_to_sun():
     """Set camera center to Sun"""
-    scene.center = vector(0, 0, 0)
-
-# Create scene with enhanced design
-scene = canvas(
-    title="Asteroid Simulation",
-    width=1920,
-    height=800,
-    center=vector(0,0,0),
-    background=color.black
-)
-scene.width = 2000
-scene.height = 800
-
-# Add background stars
-for i in range(100):
-    star_pos = vector(
-        random() * 10 * AU - 5 * AU,
-        random() * 10 * AU - 5 * AU, 
-        random() * 10 * AU - 5 * AU
-    )
-    sphere(
-        pos=star_pos,
-        radius=AU * 0.002,
-        color=color.white,
-        emissive=True
-    )
+    scene.center = vp.vector(0, 0, 0)
 
-# Global variables
+# Global variables; the scene objects and widgets are created by main()
+scene = None
+caption = None
 bodies = []
+physics_state = None
+integrator = integrators.SemiImplicitEuler()
 running = False
 pre_simulation_running = True  # For initial motion
 time_step = 86400 * 0.1  # 0.1 days
 moon_orbit_curve = None
 auto_zoom_enabled = True
 impact_occurred = False
-explosion_effects = []
-explosion_frame_count = 0
+explosion_pool = None
+body_visuals = {}  # Scene objects by body name, reused across resets
 default_camera_range = 2.8 * AU
 zoomed_in = False
 map_created = False
+map_worker = None
+map_future = None  # Impact map being generated in the background
+show_moon_orbit = False
+profiler = profiling.PhaseTimer()
 
-# User interface and styles
-scene.append_to_caption("""
+# User interface styles
+CAPTION_STYLE = """
 <style>
     body {
         font-family: 'SF Pro Display', -apple-system, BlinkMacSystemFont, sans-serif;
@@ -531,129 +429,65 @@ scene.append_to_caption("""
         100% { opacity: 0.7; }
     }
 </style>
-""")
-
-# Header
-scene.append_to_caption('<div class="section">')
-scene.append_to_caption('<h1>Integrated Asteroid Simulation</h1>')
-scene.append_to_caption('<p>3D orbital simulation + 2D impact map after collision</p>')
-scene.append_to_caption('<p>Earth orbits the Sun from the start!</p>')
-scene.append_to_caption('</div>')
-
-# Asteroid settings
-scene.append_to_caption('<div class="section">')
-scene.append_to_caption('<h2>Asteroid Settings</h2>')
-scene.append_to_caption('Mass (kg): ')
-asteroid_mass_input = winput(bind=lambda: None, type="numeric", text="1e15")
-scene.append_to_caption('<br>Position X (AU): ')
-asteroid_x_input = winput(bind=lambda: None, type="numeric", text="2.0")
-scene.append_to_caption(' Y (AU): ')
-asteroid_y_input = winput(bind=lambda: None, type="numeric", text="0")
-scene.append_to_caption(' Z (AU): ')
-asteroid_z_input = winput(bind=lambda: None, type="numeric", text="0")
-scene.append_to_caption('<br>Velocity X (km/s): ')
-asteroid_vx_input = winput(bind=lambda: None, type="numeric", text="0")
-scene.append_to_caption(' Y (km/s): ')
-asteroid_vy_input = winput(bind=lambda: None, type="numeric", text="21.0")
-scene.append_to_caption(' Z (km/s): ')
-asteroid_vz_input = winput(bind=lambda: None, type="numeric", text="0")
-
-# Impact map parameters
-scene.append_to_caption('<br><h3>Impact Map Parameters</h3>')
-scene.append_to_caption('Impact Latitude: ')
-impact_lat_input = winput(bind=lambda: None, type="numeric", text="50.45")
-scene.append_to_caption(' Impact Longitude: ')
-impact_lon_input = winput(bind=lambda: None, type="numeric", text="30.52")
-scene.append_to_caption('<br>Entry Angle (°): ')
-impact_angle_input = winput(bind=lambda: None, type="numeric", text="45")
+"""
+
+# Input parameters, validated once when typed (see parameters.py)
+params = parameters.ParameterStore([
+    parameters.Parameter('mass', 1e15, "Mass", minimum=0, exclusive_minimum=True, number_format='.2e'),
+    parameters.Parameter('x', 2.0, "Position X"),
+    parameters.Parameter('y', 0, "Position Y"),
+    parameters.Parameter('z', 0, "Position Z"),
+    parameters.Parameter('vx', 0, "Velocity X"),
+    parameters.Parameter('vy', 21.0, "Velocity Y"),
+    parameters.Parameter('vz', 0, "Velocity Z"),
+    parameters.Parameter('lat', 50.45, "Impact Latitude", minimum=-90, maximum=90),
+    parameters.Parameter('lon', 30.52, "Impact Longitude", minimum=-180, maximum=180),
+    parameters.Parameter('angle', 45, "Entry Angle", minimum=0, maximum=90, exclusive_minimum=True),
+    parameters.Parameter('time_step', 0.1, "Time Step", minimum=0, exclusive_minimum=True),
+    parameters.Parameter('animation_speed', 200, "Animation Speed", minimum=0)
+])
+
+def parameter_input(name):
+    """winput bound to a parameter: typing validates it, store changes refresh the text"""
+    parameter = params.parameters[name]
+    
+    def on_edit(widget):
+        error = params.set_text(name, widget.text)
+        parameter_error_text.text = f" {error}" if error else ""
+        if error:
+            print(f"Invalid input - {error}")
+
+    widget = caption.widget(vp.winput, bind=on_edit, type="numeric", text=parameter.format(params[name]))
+    params.subscribe(name, lambda value: setattr(widget, 'text', parameter.format(value)))
+    return widget
 
 # Quick presets
+def apply_scenario(scenario):
+    """Set the input parameters from a scenario dict (see scenarios.py)"""
+    params.update(scenario)
+
 def preset_comet():
-    asteroid_x_input.text = "5.0"
-    asteroid_y_input.text = "0"
-    asteroid_z_input.text = "0"
-    asteroid_vx_input.text = "0"
-    asteroid_vy_input.text = "8.0"
-    asteroid_vz_input.text = "0"
-    asteroid_mass_input.text = "1e14"
-    impact_lat_input.text = "48.86"  # Paris
-    impact_lon_input.text = "2.35"
-    impact_angle_input.text = "30"
+    apply_scenario(PRESETS['Comet'])
 
 def preset_near_earth():
-    asteroid_x_input.text = "1.2"
-    asteroid_y_input.text = "0"
-    asteroid_z_input.text = "0"
-    asteroid_vx_input.text = "0"
-    asteroid_vy_input.text = "25.0"
-    asteroid_vz_input.text = "0"
-    asteroid_mass_input.text = "1e16"
-    impact_lat_input.text = "40.71"  # New York
-    impact_lon_input.text = "-74.01"
-    impact_angle_input.text = "60"
+    apply_scenario(PRESETS['Near Earth'])
 
 def preset_impact():
-    asteroid_x_input.text = "1.5"
-    asteroid_y_input.text = "0"
-    asteroid_z_input.text = "0"
-    asteroid_vx_input.text = "-15.0"
-    asteroid_vy_input.text = "20.0"
-    asteroid_vz_input.text = "0"
-    asteroid_mass_input.text = "5e16"
-    impact_lat_input.text = "50.45"  # Kyiv
-    impact_lon_input.text = "30.52"
-    impact_angle_input.text = "45"
+    apply_scenario(PRESETS['Impact'])
 
 def preset_belt():
-    asteroid_x_input.text = "2.8"
-    asteroid_y_input.text = "0"
-    asteroid_z_input.text = "0"
-    asteroid_vx_input.text = "0"
-    asteroid_vy_input.text = "18.0"
-    asteroid_vz_input.text = "0"
-    asteroid_mass_input.text = "5e15"
-    impact_lat_input.text = "35.68"  # Tokyo
-    impact_lon_input.text = "139.69"
-    impact_angle_input.text = "35"
+    apply_scenario(PRESETS['Asteroid Belt'])
 
 def apply_real_asteroid(asteroid_name):
     """Apply parameters of a real asteroid"""
     if asteroid_name in REAL_ASTEROIDS:
         data = REAL_ASTEROIDS[asteroid_name]
-        
-        # Calculate mass based on diameter if needed
-        if 'mass_kg' in data:
-            mass = data['mass_kg']
-        else:
-            # Approximate asteroid density 2000 kg/m³
-            radius_m = (data['diameter_km'] * 1000) / 2
-            volume = (4/3) * math.pi * (radius_m ** 3)
-            mass = volume * 2000
-        
-        # Set parameters
-        asteroid_x_input.text = str(data['orbit_distance_au'])
-        asteroid_y_input.text = "0"
-        asteroid_z_input.text = "0"
-        asteroid_vx_input.text = "0"
-        asteroid_vy_input.text = str(data['velocity_kms'])
-        asteroid_vz_input.text = "0"
-        asteroid_mass_input.text = f"{mass:.2e}"
-        
-        # Coordinates for impact map
-        impact_lat_input.text = str(data['coordinates'][0])
-        impact_lon_input.text = str(data['coordinates'][1])
-        
-        # Angle based on threat level
-        if data['threat_level'] == "High":
-            impact_angle_input.text = "30"
-        elif data['threat_level'] == "Medium":
-            impact_angle_input.text = "45"
-        else:
-            impact_angle_input.text = "60"
+        scenario = real_asteroid_scenario(asteroid_name)
+        apply_scenario(scenario)
         
         print(f"Loaded parameters for asteroid: {asteroid_name}")
         print(f"Diameter: {data['diameter_km']} km")
-        print(f"Mass: {mass:.2e} kg")
+        print(f"Mass: {scenario['mass']:.2e} kg")
         print(f"Threat level: {data['threat_level']}")
 
 def show_asteroid_examples():
@@ -690,39 +524,20 @@ Click an asteroid button below to apply its parameters:
     # Update info text
     info_text.text = example_text
 
-scene.append_to_caption('<br>')
-button(text="Comet", bind=preset_comet)
-button(text="Near Earth", bind=preset_near_earth)
-button(text="Impact", bind=preset_impact)
-button(text="Asteroid Belt", bind=preset_belt)
-button(text="Examples", bind=show_asteroid_examples)
-
-# Add buttons for real asteroids
-scene.append_to_caption('<div class="real-asteroids-section">')
-scene.append_to_caption('<h3>Apply Real Asteroid Parameters</h3>')
-
-# Create buttons for each asteroid
-for asteroid_name in REAL_ASTEROIDS.keys():
-    def make_asteroid_handler(name):
-        return lambda: apply_real_asteroid(name)
-    
-    button_text = f"{asteroid_name.split()[1] if len(asteroid_name.split()) > 1 else asteroid_name}"
-    button(text=button_text, bind=make_asteroid_handler(asteroid_name))
-
-scene.append_to_caption('</div>')
-scene.append_to_caption('</div>')
+# Integrator selection
+INTEGRATOR_CHOICES = {
+    "Semi-implicit Euler": "euler",
+    "Adaptive RK45": "rk45",
+    "Wisdom-Holman": "wh",
+    "Bulirsch-Stoer": "bs"
+}
 
-# Simulation settings
-scene.append_to_caption('<div class="section">')
-scene.append_to_caption('<h2>Simulation Parameters</h2>')
-scene.append_to_caption('Time Step (days): ')
-timestep_input = winput(bind=lambda: None, type="numeric", text="0.1")
-scene.append_to_caption(' Animation Speed: ')
-animation_speed_input = winput(bind=lambda: None, type="numeric", text="200")
+def select_integrator(menu_widget):
+    """Switch integrator, keeping the current physical state"""
+    global integrator
+    integrator = integrators.create_integrator(INTEGRATOR_CHOICES[menu_widget.selected])
 
 # Toggle Moon orbit display
-show_moon_orbit = False
-
 def toggle_moon_orbit():
     global show_moon_orbit, moon_orbit_curve
     show_moon_orbit = not show_moon_orbit
@@ -749,76 +564,50 @@ def toggle_auto_zoom():
     auto_zoom_enabled = not auto_zoom_enabled
     if not auto_zoom_enabled:
         scene.range = default_camera_range
-        scene.center = vector(0, 0, 0)
+        scene.center = vp.vector(0, 0, 0)
     zoom_button.text = f"{'Disable' if auto_zoom_enabled else 'Enable'} Zoom"
 
-scene.append_to_caption('<br>')
-orbit_button = button(text="Show Orbit", bind=toggle_moon_orbit)
-zoom_button = button(text="Disable Zoom", bind=toggle_auto_zoom)
-scene.append_to_caption('</div>')
+def hide_bodies():
+    """Hide and forget the visuals of all bodies"""
+    for body in bodies:
+        body.hide()
+    bodies.clear()
+
+def show_body(name):
+    """Add the visuals of a physics_state body, reusing its hidden scene objects"""
+    if name == "Asteroid":
+        style = {'radius': 0.06, 'body_color': vp.color.red, 'trail_color': vp.color.orange}
+    else:
+        style = {
+            'radius': PLANET_DATA[name]['radius'],
+            'body_color': vp.vector(*PLANET_DATA[name]['color']),
+            'trail_color': vp.vector(*PLANET_DATA[name]['trail']),
+            'trail_points': PLANET_DATA[name]['trail_points']
+        }
+    
+    visual = body_visuals.get(name)
+    if visual is None:
+        visual = body_visuals[name] = CelestialBody(physics_state.get(name), **style)
+    else:
+        visual.attach(physics_state.get(name))
+    bodies.append(visual)
+    return visual
 
 def create_initial_system():
     """Create initial Sun-Earth-Moon system"""
-    global bodies, time_step, moon_orbit_curve
+    global bodies, physics_state, time_step, moon_orbit_curve
     
     # Clear previous objects
-    for body in bodies:
-        if hasattr(body, 'sphere') and body.sphere:
-            body.sphere.visible = False
-        if hasattr(body, 'glow') and body.glow:
-            body.glow.visible = False
-        if hasattr(body, 'inner_glow') and body.inner_glow:
-            body.inner_glow.visible = False
-        if hasattr(body, 'atmosphere') and body.atmosphere:
-            body.atmosphere.visible = False
-    bodies.clear()
+    hide_bodies()
     
     # Read time parameters
-    try:
-        time_step = float(timestep_input.text) * 86400
-    except ValueError:
-        time_step = 86400 * 0.1
-    
-    # Create Sun
-    sun = CelestialBody(
-        name="Sun",
-        mass=PLANET_DATA['Sun']['mass'],
-        pos=[0, 0, 0],
-        vel=[0, 0, 0],
-        radius=PLANET_DATA['Sun']['radius'],
-        body_color=PLANET_DATA['Sun']['color'],
-        trail_color=PLANET_DATA['Sun']['trail']
-    )
-    bodies.append(sun)
-    
-    # Create Earth
-    earth_distance = PLANET_DATA['Earth']['distance'] * AU
-    earth_velocity = PLANET_DATA['Earth']['velocity'] * 1000
-    
-    earth = CelestialBody(
-        name="Earth",
-        mass=PLANET_DATA['Earth']['mass'],
-        pos=[earth_distance, 0, 0],
-        vel=[0, earth_velocity, 0],
-        radius=PLANET_DATA['Earth']['radius'],
-        body_color=PLANET_DATA['Earth']['color'],
-        trail_color=PLANET_DATA['Earth']['trail']
-    )
-    bodies.append(earth)
+    time_step = params['time_step'] * 86400
     
-    # Create Moon with correct orbital velocity
-    moon_orbital_velocity = calculate_moon_orbital_velocity(PLANET_DATA['Earth']['mass'], MOON_DISTANCE)
-    
-    moon = CelestialBody(
-        name="Moon",
-        mass=PLANET_DATA['Moon']['mass'],
-        pos=[earth_distance + MOON_DISTANCE, 0, 0],
-        vel=[0, earth_velocity + moon_orbital_velocity, 0],
-        radius=PLANET_DATA['Moon']['radius'],
-        body_color=PLANET_DATA['Moon']['color'],
-        trail_color=PLANET_DATA['Moon']['trail']
-    )
-    bodies.append(moon)
+    # Create physical state and matching visuals
+    physics_state = physics.create_initial_state()
+    integrator.next_step = None
+    for name in ['Sun', 'Earth', 'Moon']:
+        show_body(name)
     
     # Set camera center to Sun
     set_camera_center_to_sun()
@@ -830,41 +619,17 @@ def add_asteroid_to_system():
     # Remove previous asteroid if exists
     for body in bodies[:]:  # Create copy for safe removal
         if body.name == "Asteroid":
-            # Remove asteroid visual objects
-            if hasattr(body, 'sphere') and body.sphere:
-                body.sphere.visible = False
-                del body.sphere
+            # Hide asteroid visual objects for reuse
+            body.hide()
             bodies.remove(body)
     
     # Create new asteroid
-    try:
-        asteroid_pos = [
-            float(asteroid_x_input.text) * AU,
-            float(asteroid_y_input.text) * AU,
-            float(asteroid_z_input.text) * AU
-        ]
-        asteroid_vel = [
-            float(asteroid_vx_input.text) * 1000,
-            float(asteroid_vy_input.text) * 1000,
-            float(asteroid_vz_input.text) * 1000
-        ]
-        asteroid_mass = float(asteroid_mass_input.text)
-    except ValueError:
-        # Default values on error
-        asteroid_pos = [2.0 * AU, 0, 0]
-        asteroid_vel = [0, 21000, 0]
-        asteroid_mass = 1e15
+    asteroid_pos = [params['x'] * AU, params['y'] * AU, params['z'] * AU]
+    asteroid_vel = [params['vx'] * 1000, params['vy'] * 1000, params['vz'] * 1000]
+    asteroid_mass = params['mass']
     
-    asteroid = CelestialBody(
-        name="Asteroid",
-        mass=asteroid_mass,
-        pos=asteroid_pos,
-        vel=asteroid_vel,
-        radius=0.06,
-        body_color=color.red,
-        trail_color=color.orange
-    )
-    bodies.append(asteroid)
+    physics.add_asteroid(physics_state, asteroid_pos, asteroid_vel, asteroid_mass)
+    show_body("Asteroid")
 
 def start_simulation():
     global running, pre_simulation_running
@@ -879,14 +644,14 @@ def start_simulation():
         start_button.text = "Start"
 
 def reset_simulation():
-    global running, impact_occurred, explosion_effects, explosion_frame_count, zoomed_in, map_created, pre_simulation_running
+    global running, impact_occurred, zoomed_in, map_created, map_future, pre_simulation_running
     running = False
     pre_simulation_running = True  # Restore initial motion
     impact_occurred = False
-    explosion_effects = []
-    explosion_frame_count = 0
+    explosion_pool.hide()
     zoomed_in = False
     map_created = False
+    map_future = None
     scene.range = default_camera_range
     set_camera_center_to_sun()  # Set camera center to Sun
     start_button.text = "Start"
@@ -896,290 +661,490 @@ def reset_simulation():
     
     # Clear trails
     for body in bodies:
-        if hasattr(body, 'sphere') and hasattr(body.sphere, 'clear_trail'):
-            body.sphere.clear_trail()
+        body.trail.clear()
 
 def clear_trails():
     """Clear all orbital trails and remove asteroids"""
     global bodies
     
     # Clear trails for all bodies
-    for body in bodies[:]:  # Create copy for safe removal
-        if hasattr(body, 'sphere') and body.sphere:
-            # Save current trail parameters
-            original_trail_color = body.sphere.trail_color if hasattr(body.sphere, 'trail_color') else color.white
-            original_trail_radius = body.sphere.trail_radius if hasattr(body.sphere, 'trail_radius') else None
-            
-            # Disable and re-enable trail to clear it
-            body.sphere.make_trail = False
-            body.sphere.make_trail = True
-            
-            # Restore trail parameters
-            if hasattr(body.sphere, 'trail_color'):
-                body.sphere.trail_color = original_trail_color
-            if original_trail_radius and hasattr(body.sphere, 'trail_radius'):
-                body.sphere.trail_radius = original_trail_radius
+    for body in bodies:
+        body.trail.clear()
     
     # Remove all asteroids from system
     for body in bodies[:]:  # Create copy for safe removal
         if body.name == "Asteroid":
-            # Remove asteroid visual objects
-            if hasattr(body, 'sphere') and body.sphere:
-                body.sphere.visible = False
-                del body.sphere
+            # Hide asteroid visual objects for reuse
+            body.hide()
             bodies.remove(body)
+    physics_state.remove_body("Asteroid")
     
     print("Trails cleared and asteroids removed!")
 
-# Controls
-scene.append_to_caption('<div class="section">')
-scene.append_to_caption('<h2>Controls</h2>')
-start_button = button(text="Start", bind=start_simulation)
-reset_button = button(text="Reset", bind=reset_simulation)
-clear_button = button(text="Clear Trails", bind=clear_trails)
-scene.append_to_caption('</div>')
+def snapshot_progress():
+    """Scene state stored alongside the physics in a snapshot"""
+    return {'time_counter': time_counter, 'impact_occurred': impact_occurred, 'map_created': map_created}
+
+def write_snapshot(path):
+    """Write the complete physical state to path"""
+    checkpoint.save_checkpoint(path, physics_state, integrator, progress=snapshot_progress())
+
+def save_snapshot():
+    """Write the complete physical state to CHECKPOINT_FILE"""
+    write_snapshot(CHECKPOINT_FILE)
+    print(f"Snapshot saved to {CHECKPOINT_FILE} at day {physics_state.time / 86400:.1f}")
 
-# Status
-scene.append_to_caption('<div class="section">')
-scene.append_to_caption('<h3>Simulation Status</h3>')
-info_text = wtext(text="Earth is already orbiting the Sun! Press 'Start' to add an asteroid...")
-scene.append_to_caption('</div>')
+def restore_snapshot():
+    """Continue from the state stored in CHECKPOINT_FILE"""
+    global physics_state, integrator, time_counter, impact_occurred, map_created, map_future, running, pre_simulation_running
+    try:
+        snapshot = checkpoint.load_checkpoint(CHECKPOINT_FILE)
+    except (OSError, ValueError) as e:
+        print(f"Cannot restore snapshot: {e}")
+        return
+    
+    hide_bodies()
+    physics_state = snapshot['state']
+    integrator = snapshot['integrator'] or integrators.SemiImplicitEuler()
+    integrator_menu.index = list(INTEGRATOR_CHOICES.values()).index(integrator.name)
+    for name in physics_state.names:
+        if name == "Asteroid" or name in PLANET_DATA:
+            show_body(name)
+    
+    progress = snapshot['progress'] or {}
+    time_counter = progress.get('time_counter', physics_state.time)
+    impact_occurred = progress.get('impact_occurred', False)
+    map_created = progress.get('map_created', False)
+    map_future = None
+    
+    # Resume straight away; a snapshot without asteroid continues the initial motion
+    pre_simulation_running = "Asteroid" not in physics_state.names
+    running = not pre_simulation_running
+    start_button.text = "Pause" if running else "Start"
+    print(f"Snapshot restored from {CHECKPOINT_FILE} at day {physics_state.time / 86400:.1f}")
 
-# Set initial values
-preset_impact()
+def toggle_profiling():
+    """Switch the per-phase frame timers and their overlay on or off"""
+    profiler.enable(not profiler.enabled)
+    if profiler.enabled:
+        # Forces are evaluated inside the integrator steps; time them separately
+        profiler.instrument(physics, 'state_accelerations', 'forces')
+        profiler.instrument(physics, 'particle_accelerations', 'forces')
+        profile_text.text = "\nTimings (ms per frame): collecting..."
+    else:
+        profiler.restore()
+        profile_text.text = ""
+    profile_button.text = "Stop Profiling" if profiler.enabled else "Profile"
 
-# Create initial system
-create_initial_system()
+def export_timings():
+    """Write the recorded frame timings to TIMING_LOG"""
+    if not profiler.frames:
+        print("No frame timings recorded; press 'Profile' first")
+        return
+    profiler.export(TIMING_LOG)
+    print(f"{len(profiler.frames)} frame timings written to {TIMING_LOG}")
 
-# Main simulation loop
-time_counter = 0
-while True:
-    rate(100)
+class Hud:
+    """Status fields in separate wtexts, refreshed at HUD_RATE and sent only when changed"""
+    LAYOUT = [
+        ('\nDay: ', 'day'), (' | Earth Rotation: ', 'rotation'),
+        ('\nEarth ↔ Sun: ', 'earth_sun'),
+        ('\nMode: ', 'mode'),
+        ('\n\nAsteroid ↔ Earth: ', 'asteroid_earth'),
+        ('\nStatus: ', 'danger'),
+        ('\n', 'zoom_status'), (' | ', 'camera'), (' | ', 'map'),
+        ('\n\nZoom: ', 'zoom'),
+        ('\nCamera Center: Sun (0, 0, 0)', None)
+    ]
+
+    def __init__(self):
+        self.fields = {}
+        self.shown = {}
+        self.next_update = 0.0
+        for label, key in self.LAYOUT:
+            caption.add(label)
+            if key is not None:
+                self.fields[key] = caption.widget(vp.wtext, text="")
+                self.shown[key] = ""
+
+    def due(self):
+        """True at most HUD_RATE times per second"""
+        now = time.perf_counter()
+        if now < self.next_update:
+            return False
+        self.next_update = now + 1.0 / HUD_RATE
+        return True
+
+    def update(self, values):
+        """Send the fields whose text differs from what is displayed"""
+        for key, text in values.items():
+            if text != self.shown[key]:
+                self.fields[key].text = text
+                self.shown[key] = text
+
+def report_map(future):
+    """Print the outcome of a background impact map"""
+    if future.exception() is not None:
+        print(f"Error creating map: {future.exception()}")
+    else:
+        print(f"Impact map created: {future.result()}")
+
+def map_status():
+    """HUD text for the impact map"""
+    if map_future is None:
+        return "Map Created" if map_created else "Awaiting Collision"
+    if not map_future.done():
+        return "Generating Map..."
+    if map_future.exception() is not None:
+        return "Map Failed"
+    return "Map Ready"
+
+def hud_values():
+    """Current text of every HUD field, computed from the physics arrays"""
+    days = time_counter / 86400
+    names = physics_state.names
+    earth_sun_distance = physics_state.distance("Earth", "Sun") / AU
     
-    # Set camera center to Sun each frame
-    set_camera_center_to_sun()
+    asteroid_earth_distance = 0
+    danger_status = "Safe"
+    if impact_occurred:
+        danger_status = "COLLISION!"
+    elif "Asteroid" in names:
+        asteroid_earth_distance = physics_state.distance("Asteroid", "Earth") / AU
+        
+        # Check for dangerous proximity
+        danger_distance = 0.001  # AU
+        if asteroid_earth_distance < danger_distance:
+            danger_status = "DANGER!"
+        elif asteroid_earth_distance < 0.2:
+            danger_status = "Close"
+    
+    # Calculate Earth's rotation speed
+    earth_rotation_days = (time_counter / EARTH_ROTATION_PERIOD) % 1
     
-    # Limit camera zoom
-    limit_camera_zoom()
+    return {
+        'day': f"{days:.1f}",
+        'rotation': f"{earth_rotation_days:.2f}",
+        'earth_sun': f"{earth_sun_distance:.3f} AU",
+        'mode': "Earth Orbiting" if pre_simulation_running else "Asteroid Active",
+        'asteroid_earth': f"{asteroid_earth_distance:.4f} AU",
+        'danger': danger_status,
+        'zoom_status': "Zoom Enabled" if auto_zoom_enabled else "Zoom Disabled",
+        'camera': "Zoomed" if zoomed_in else "Normal",
+        'map': map_status(),
+        'zoom': f"{scene.range/AU:.2f} AU (limits: {MIN_ZOOM_RANGE/AU:.1f}-{MAX_ZOOM_RANGE/AU:.0f} AU)"
+    }
+
+def build_scene():
+    """Create the canvas, star field and reusable scene objects"""
+    global scene, caption, explosion_pool, map_worker
+
+    # Create scene with enhanced design
+    scene = vp.canvas(
+        title="Asteroid Simulation",
+        width=1920,
+        height=800,
+        center=vp.vector(0,0,0),
+        background=vp.color.black
+    )
+    scene.width = 2000
+    scene.height = 800
+    caption = Caption(scene)
+
+    # Add background stars as one batched primitive
+    vp.points(
+        pos=[
+            vp.vector(
+                random.random() * 10 * AU - 5 * AU,
+                random.random() * 10 * AU - 5 * AU,
+                random.random() * 10 * AU - 5 * AU
+            )
+            for i in range(100)
+        ],
+        radius=AU * 0.002,
+        size_units="world",
+        color=vp.color.white
+    )
+
+    explosion_pool = ExplosionPool()
+    map_worker = ImpactMapWorker(cache=MapCache())
+
+def build_controls():
+    """Assemble the caption: styles, inputs, buttons and status display"""
+    global parameter_error_text, info_text, integrator_menu, orbit_button, zoom_button
+    global start_button, reset_button, clear_button, save_button, restore_button, profile_button, export_button
+    global hud, profile_text
+
+    caption.add(CAPTION_STYLE)
+
+    # Header
+    caption.add('<div class="section">'
+                '<h1>Integrated Asteroid Simulation</h1>'
+                '<p>3D orbital simulation + 2D impact map after collision</p>'
+                '<p>Earth orbits the Sun from the start!</p>'
+                '</div>')
+
+    # Asteroid settings
+    caption.add('<div class="section"><h2>Asteroid Settings</h2>Mass (kg): ')
+    parameter_input('mass')
+    caption.add('<br>Position X (AU): ')
+    parameter_input('x')
+    caption.add(' Y (AU): ')
+    parameter_input('y')
+    caption.add(' Z (AU): ')
+    parameter_input('z')
+    caption.add('<br>Velocity X (km/s): ')
+    parameter_input('vx')
+    caption.add(' Y (km/s): ')
+    parameter_input('vy')
+    caption.add(' Z (km/s): ')
+    parameter_input('vz')
+
+    # Impact map parameters
+    caption.add('<br><h3>Impact Map Parameters</h3>Impact Latitude: ')
+    parameter_input('lat')
+    caption.add(' Impact Longitude: ')
+    parameter_input('lon')
+    caption.add('<br>Entry Angle (°): ')
+    parameter_input('angle')
+    parameter_error_text = caption.widget(vp.wtext, text="")
+
+    caption.add('<br>')
+    caption.widget(vp.button, text="Comet", bind=preset_comet)
+    caption.widget(vp.button, text="Near Earth", bind=preset_near_earth)
+    caption.widget(vp.button, text="Impact", bind=preset_impact)
+    caption.widget(vp.button, text="Asteroid Belt", bind=preset_belt)
+    caption.widget(vp.button, text="Examples", bind=show_asteroid_examples)
+
+    # Add buttons for real asteroids
+    caption.add('<div class="real-asteroids-section"><h3>Apply Real Asteroid Parameters</h3>')
+
+    # Create buttons for each asteroid
+    for asteroid_name in REAL_ASTEROIDS.keys():
+        def make_asteroid_handler(name):
+            return lambda: apply_real_asteroid(name)
     
-    # Initial Earth motion around Sun (before main simulation)
-    if pre_simulation_running and len(bodies) >= 2:
-        try:
-            animation_rate = float(animation_speed_input.text)
-            rate(animation_rate)
-        except (ValueError, AttributeError):
-            rate(200)
+        button_text = f"{asteroid_name.split()[1] if len(asteroid_name.split()) > 1 else asteroid_name}"
+        caption.widget(vp.button, text=button_text, bind=make_asteroid_handler(asteroid_name))
+
+    caption.add('</div></div>')
+
+    # Simulation settings
+    caption.add('<div class="section"><h2>Simulation Parameters</h2>Time Step (days): ')
+    parameter_input('time_step')
+    caption.add(' Animation Speed (steps/s): ')
+    parameter_input('animation_speed')
+    caption.add('<br>Integrator: ')
+    integrator_menu = caption.widget(vp.menu, choices=list(INTEGRATOR_CHOICES), index=0, bind=select_integrator)
+    caption.add('<br>')
+    orbit_button = caption.widget(vp.button, text="Show Orbit", bind=toggle_moon_orbit)
+    zoom_button = caption.widget(vp.button, text="Disable Zoom", bind=toggle_auto_zoom)
+    caption.add('</div>')
+
+    # Controls
+    caption.add('<div class="section"><h2>Controls</h2>')
+    start_button = caption.widget(vp.button, text="Start", bind=start_simulation)
+    reset_button = caption.widget(vp.button, text="Reset", bind=reset_simulation)
+    clear_button = caption.widget(vp.button, text="Clear Trails", bind=clear_trails)
+    save_button = caption.widget(vp.button, text="Save Snapshot", bind=save_snapshot)
+    restore_button = caption.widget(vp.button, text="Restore Snapshot", bind=restore_snapshot)
+    profile_button = caption.widget(vp.button, text="Profile", bind=toggle_profiling)
+    export_button = caption.widget(vp.button, text="Export Timings", bind=export_timings)
+    caption.add('</div>')
+
+    # Status
+    caption.add('<div class="section"><h3>Simulation Status</h3>')
+    info_text = caption.widget(vp.wtext, text="Earth is already orbiting the Sun! Press 'Start' to add an asteroid...")
+    hud = Hud()
+    profile_text = caption.widget(vp.wtext, text="")
+    caption.add('</div>')
+    caption.flush()
+
+def frame_substeps():
+    """Number of physics steps owed this frame at the animation speed (steps per second)"""
+    global step_accumulator
+    step_accumulator += params['animation_speed'] / FRAME_RATE
+    substeps = int(step_accumulator)
+    step_accumulator -= substeps
+    return substeps
+
+def run_substeps(substeps, deadline, asteroid_active):
+    """Advance the physics by up to substeps steps before the wall-clock deadline
+
+    Steps that do not fit in the frame budget are dropped rather than
+    carried over, so a slow machine runs slower instead of falling behind.
+    While the asteroid is active every step is searched for contact with
+    the Earth surface and the substeps stop at the step that hits it.
+    Returns the number of steps taken and that step's encounter, or None.
+    """
+    global time_counter, steps_since_snapshot
+    for taken in range(1, substeps + 1):
+        # Asteroid state relative to Earth at the start of the step
+        has_asteroid = asteroid_active and "Asteroid" in physics_state.names
+        if has_asteroid:
+            asteroid_index = physics_state.index("Asteroid")
+            earth_index = physics_state.index("Earth")
+            rel_pos = physics_state.pos[asteroid_index] - physics_state.pos[earth_index]
+            rel_vel = physics_state.vel[asteroid_index] - physics_state.vel[earth_index]
+            mu = G * (physics_state.mass[asteroid_index] + physics_state.mass[earth_index])
         
-        # Reset forces
-        for body in bodies:
-            if body.name != "Asteroid":  # Exclude asteroid from initial simulation
-                body.force = vector(0, 0, 0)
+        with profiler.phase('integration'):
+            integrators.advance(integrator, physics_state, time_step)
+        time_counter += time_step
+        
+        if asteroid_active:
+            steps_since_snapshot += 1
+            if steps_since_snapshot >= CHECKPOINT_EVERY:
+                with profiler.phase('snapshot'):
+                    write_snapshot(AUTOSAVE_FILE)
+                steps_since_snapshot = 0
         
-        # Calculate gravitational forces (only between Sun, Earth, and Moon)
-        for i in range(len(bodies) - (1 if len(bodies) > 3 else 0)):  # Exclude asteroid
-            for j in range(i + 1, len(bodies) - (1 if len(bodies) > 3 else 0)):
-                if bodies[i].name != "Asteroid" and bodies[j].name != "Asteroid":
-                    force = calculate_gravitational_force(bodies[i], bodies[j])
-                    bodies[i].force += force
-                    bodies[j].force -= force
+        # Search the step for contact with the physical Earth surface
+        if has_asteroid:
+            with profiler.phase('encounters'):
+                encounter = events.find_encounters([rel_pos], [rel_vel], mu, time_step, EARTH_RADIUS)
+            if encounter['contact'][0]:
+                return taken, encounter
         
-        # Update positions (only for Earth and Moon)
+        if time.perf_counter() > deadline:
+            return taken, None
+    return substeps, None
+
+def push_frame(steps_taken):
+    """Send body positions and planet rotation to the scene once per frame"""
+    with profiler.phase('render'):
         for body in bodies:
-            if body.name != "Sun" and body.name != "Asteroid":
-                acceleration = body.force / body.mass
-                body.vel += acceleration * time_step
-                body.pos += body.vel * time_step
-                body.sphere.pos = body.pos
-                
-                # Update additional effects
-                if hasattr(body, 'atmosphere'):
-                    body.atmosphere.pos = body.pos
-            elif body.name == "Sun":
-                # Update Sun's glow effects
-                if hasattr(body, 'glow'):
-                    body.glow.pos = body.pos
-                if hasattr(body, 'inner_glow'):
-                    body.inner_glow.pos = body.pos
-            
-            # Update planet rotation
-            if body.name != "Asteroid":
-                body.update_rotation(time_step)
+            body.update_visuals()
+            body.update_rotation(time_step * steps_taken)
+
+def check_collision(encounter):
+    """Auto-zoom towards a close asteroid and handle an impact found in this frame's steps"""
+    global impact_occurred, zoomed_in, map_created, map_future
+    # Find Earth and asteroid
+    earth_body = body_visuals.get("Earth")
+    asteroid_body = body_visuals.get("Asteroid") if "Asteroid" in physics_state.names else None
+    earth_pos = earth_body.pos if earth_body else None
+    asteroid_pos = asteroid_body.pos if asteroid_body else None
     
-    # Main simulation with asteroid
-    if running and len(bodies) > 0:
-        try:
-            animation_rate = float(animation_speed_input.text)
-            rate(animation_rate)
-        except (ValueError, AttributeError):
-            rate(200)
+    # Check for collision and auto-zoom
+    if earth_pos and asteroid_pos and not impact_occurred:
+        distance = vp.mag(asteroid_pos - earth_pos)
+        distance_au = distance / AU
         
-        # Animate explosion
-        if explosion_effects:
-            explosion_frame_count += 1
-            explosion_effects = animate_explosion(explosion_effects, explosion_frame_count)
+        # Auto-zoom with limits
+        if auto_zoom_enabled:
+            zoom_threshold = 0.3 * AU  # Start zooming
+            close_threshold = 0.05 * AU  # Strong zoom
+            
+            if distance < zoom_threshold:
+                zoomed_in = True
+                # Center camera between Earth and asteroid, but keep Sun as center
+                calculated_range = max(MIN_ZOOM_RANGE, min(distance * 3, MAX_ZOOM_RANGE))
+                scene.range = calculated_range
+            elif zoomed_in:
+                # Return to normal view
+                scene.range = min(default_camera_range, MAX_ZOOM_RANGE)
+                zoomed_in = False
         
-        if not impact_occurred:
-            # Reset forces
-            for body in bodies:
-                body.force = vector(0, 0, 0)
+        # Check for collision with the physical Earth radius, found inside the step
+        if encounter is not None and encounter['contact'][0]:
+            impact_occurred = True
+            impact_time = time_counter - time_step + encounter['contact_time'][0]  # Clock is at the step end
+            impact_speed = vp.mag(vp.vector(*encounter['contact_vel'][0]))
+            print(f"Impact at day {impact_time / 86400:.3f}, relative speed {impact_speed / 1000:.2f} km/s")
             
-            # Calculate gravitational forces
-            for i in range(len(bodies)):
-                for j in range(i + 1, len(bodies)):
-                    force = calculate_gravitational_force(bodies[i], bodies[j])
-                    bodies[i].force += force
-                    bodies[j].force -= force
+            # Create explosion effect
+            impact_pos = earth_pos + vp.vector(*encounter['contact_pos'][0])
+            explosion_pool.start(impact_pos, 2.0)
             
-            # Update positions and rotation
-            for body in bodies:
-                if body.name != "Sun":
-                    acceleration = body.force / body.mass
-                    body.vel += acceleration * time_step
-                    body.pos += body.vel * time_step
-                    body.sphere.pos = body.pos
-                    
-                    # Update additional effects
-                    if hasattr(body, 'atmosphere'):
-                        body.atmosphere.pos = body.pos
-                        
-                else:
-                    # Update Sun's glow effects
-                    if hasattr(body, 'glow'):
-                        body.glow.pos = body.pos
-                    if hasattr(body, 'inner_glow'):
-                        body.inner_glow.pos = body.pos
-                
-                # Update planet rotation
-                body.update_rotation(time_step)
-        
-        # Find Earth and asteroid
-        earth_pos = None
-        moon_pos = None
-        asteroid_pos = None
-        earth_body = None
-        asteroid_body = None
-        
-        for body in bodies:
-            if body.name == "Earth":
-                earth_pos = body.pos
-                earth_body = body
-            elif body.name == "Moon":
-                moon_pos = body.pos
-            elif body.name == "Asteroid":
-                asteroid_pos = body.pos
-                asteroid_body = body
-        
-        # Check for collision and auto-zoom
-        if earth_pos and asteroid_pos and not impact_occurred:
-            distance = mag(asteroid_pos - earth_pos)
-            distance_au = distance / AU
+            # Change Earth's color (impact effect)
+            earth_body.sphere.color = vp.color.red
+            if hasattr(earth_body, 'atmosphere'):
+                earth_body.atmosphere.color = vp.color.orange
             
-            # Auto-zoom with limits
-            if auto_zoom_enabled:
-                zoom_threshold = 0.3 * AU  # Start zooming
-                close_threshold = 0.05 * AU  # Strong zoom
-                
-                if distance < zoom_threshold:
-                    zoomed_in = True
-                    # Center camera between Earth and asteroid, but keep Sun as center
-                    calculated_range = max(MIN_ZOOM_RANGE, min(distance * 3, MAX_ZOOM_RANGE))
-                    scene.range = calculated_range
-                elif zoomed_in:
-                    # Return to normal view
-                    scene.range = min(default_camera_range, MAX_ZOOM_RANGE)
-                    zoomed_in = False
+            # Stop asteroid
+            asteroid_body.sphere.visible = False
             
-            # Check for collision (considering real sizes)
-            collision_distance = (earth_body.current_radius + asteroid_body.current_radius) * AU
-            if distance < collision_distance:
-                impact_occurred = True
-                
-                # Create explosion effect
-                impact_pos = (earth_pos + asteroid_pos) / 2
-                explosion_effects = create_explosion(impact_pos, 2.0)
-                explosion_frame_count = 0 
-                
-                # Change Earth's color (impact effect)
-                earth_body.sphere.color = color.red
-                if hasattr(earth_body, 'atmosphere'):
-                    earth_body.atmosphere.color = color.orange
-                
-                # Stop asteroid
-                asteroid_body.sphere.visible = False
+            # Create impact map after collision, in the background
+            if not map_created:
+                # Get parameters for map
+                lat = params['lat']
+                lon = params['lon']
+                mass = params['mass']
+                velocity = impact_speed
+                angle = params['angle']
                 
-                # Create impact map after collision
-                if not map_created:
-                    try:
-                        # Get parameters for map
-                        lat = float(impact_lat_input.text)
-                        lon = float(impact_lon_input.text)
-                        mass = float(asteroid_mass_input.text)
-                        velocity = mag(asteroid_body.vel)
-                        angle = float(impact_angle_input.text)
-                        
-                        # Create map
-                        map_file = create_impact_map(lat, lon, mass, velocity, angle)
-                        map_created = True
-                        
-                        print(f"COLLISION! Impact map created: {map_file}")
-                        
-                    except Exception as e:
-                        print(f"Error creating map: {e}")
-    
-    # Update information
-    if pre_simulation_running or running:
-        time_counter += time_step
-        days = time_counter / 86400
-        
-        earth_sun_distance = 0
-        earth_moon_distance = 0
-        asteroid_earth_distance = 0
-        danger_status = "Safe"
-        
-        # Find body positions
-        earth_pos = None
-        asteroid_pos = None
-        
-        for body in bodies:
-            if body.name == "Earth":
-                earth_pos = body.pos
-                earth_sun_distance = mag(earth_pos) / AU
-            elif body.name == "Asteroid":
-                asteroid_pos = body.pos
+                map_future = map_worker.submit(lat, lon, mass, velocity, angle)
+                map_future.add_done_callback(report_map)
+                map_created = True
+                print("COLLISION! Generating impact map...")
+
+# Simulation clock
+time_counter = 0
+steps_since_snapshot = 0
+step_accumulator = 0.0
+
+def run():
+    """Main simulation loop"""
+    while True:
+        # Waiting for the frame slot and sending the scene to the browser
+        with profiler.phase('rate'):
+            vp.rate(FRAME_RATE)
+        frame_deadline = time.perf_counter() + FRAME_BUDGET
         
-        if earth_pos and asteroid_pos and not impact_occurred:
-            asteroid_earth_distance = mag(asteroid_pos - earth_pos) / AU
+        with profiler.phase('render'):
+            # Set camera center to Sun each frame
+            set_camera_center_to_sun()
             
-            # Check for dangerous proximity
-            danger_distance = 0.001  # AU
-            if asteroid_earth_distance < danger_distance:
-                danger_status = "DANGER!"
-            elif asteroid_earth_distance < 0.2:
-                danger_status = "Close"
-            else:
-                danger_status = "Safe"
-        elif impact_occurred:
-            asteroid_earth_distance = 0
-            danger_status = "COLLISION! Map created!"
+            # Limit camera zoom
+            limit_camera_zoom()
         
-        # Calculate Earth's rotation speed
-        earth_rotation_days = (time_counter / EARTH_ROTATION_PERIOD) % 1
+        # Initial Earth motion around Sun (before main simulation)
+        if pre_simulation_running and len(bodies) >= 2:
+            # Advance Sun, Earth and Moon (asteroid is added on start)
+            steps_taken, _ = run_substeps(frame_substeps(), frame_deadline, asteroid_active=False)
+            push_frame(steps_taken)
         
-        zoom_status = "Zoom Enabled" if auto_zoom_enabled else "Zoom Disabled"
-        camera_status = "Zoomed" if zoomed_in else "Normal"
-        map_status = "Map Created" if map_created else "Awaiting Collision"
+        # Main simulation with asteroid
+        if running and len(bodies) > 0:
+            # Animate explosion
+            with profiler.phase('explosion'):
+                explosion_pool.animate()
+            
+            encounter = None
+            if not impact_occurred:
+                steps_taken, encounter = run_substeps(frame_substeps(), frame_deadline, asteroid_active=True)
+                push_frame(steps_taken)
+            
+            with profiler.phase('collision'):
+                check_collision(encounter)
         
-        simulation_status = "Earth Orbiting" if pre_simulation_running else "Asteroid Active"
+        # Update information
+        if (pre_simulation_running or running) and hud.due():
+            with profiler.phase('hud'):
+                if info_text.text:
+                    info_text.text = ""  # Startup hint gives way to the live status
+                hud.update(hud_values())
+                if profiler.enabled:
+                    profile_text.text = f"\nTimings (ms per frame): {profiler.summary(TIMING_WINDOW)}"
         
-        info_text.text = f"""
-Day: {days:.1f} | Earth Rotation: {earth_rotation_days:.2f}
-Earth ↔ Sun: {earth_sun_distance:.3f} AU
-Mode: {simulation_status}
-
-Asteroid ↔ Earth: {asteroid_earth_distance:.4f} AU
-Status: {danger_status}
-{zoom_status} | {camera_status} | {map_status}
-
-Zoom: {scene.range/AU:.2f} AU (limits: {MIN_ZOOM_RANGE/AU:.1f}-{MAX_ZOOM_RANGE/AU:.0f} AU)
-Camera Center: Sun (0, 0, 0)
-        """
+        profiler.end_frame()
+
+def main():
+    """Import vpython, build the scene and controls, and run the simulation"""
+    global vp
+    import vpython as vp
+
+    build_scene()
+    build_controls()
+
+    # Set initial values
+    preset_impact()
+
+    # Create initial system
+    create_initial_system()
+
+    run()
+
+if __name__ == '__main__':
+    main()
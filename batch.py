@@ -0,0 +1,237 @@
+"""Headless batch runs driven by scenario files.
+
+Runs scenarios without a display and writes one JSON object per scenario
+(JSON Lines) to --output or stdout:
+
+    python batch.py jobs.toml --output results.jsonl
+    python batch.py a.json b.json --workers 8
+
+A scenario file is JSON or TOML. It holds a single scenario, or a table of
+shared `defaults` and a list of `scenarios`:
+
+    [defaults]
+    duration_days = 365
+    time_step_days = 0.1
+    integrator = "rk45"
+
+    [[scenarios]]
+    name = "Impact, faster"
+    preset = "Impact"            # start from a preset or real asteroid
+    asteroid = { vy = 22.0 }     # scenario fields (scenarios.py units)
+
+    [[scenarios]]
+    name = "Custom"
+    asteroid = { x = 1.5, vx = -15.0, vy = 20.0, mass = 5e16, lat = 50.45, lon = 30.52, angle = 45 }
+    planets = ["Jupiter"]        # extra planets (see ephemeris.PLANET_DATA)
+    bodies = [{ name = "Probe", mass = 1e3, pos = [1.1, 0, 0], vel = [0, 28, 0] }]   # AU, km/s
+    map = { output = "custom.html" }   # impact map on impact; true uses the map cache
+
+Other scenario keys: `ephemeris` (directory built by ephemeris.py, used
+instead of planets) and `stop_on_impact`. folium is only loaded by
+scenarios that ask for a map.
+
+The exit status is 0 when every scenario ran, 1 when any failed (its
+result line has status "error") and 2 when a file cannot be read.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ephemeris
+import impact_map
+import integrators
+import physics
+import scenarios
+import sweep
+from physics import AU, DAY
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+DEFAULTS = {
+    'duration_days': 365.0,
+    'time_step_days': 0.1,
+    'integrator': 'euler',
+    'ephemeris': None,
+    'planets': [],
+    'bodies': [],
+    'stop_on_impact': True,
+    'map': False
+}
+SCENARIO_KEYS = set(DEFAULTS) | {'name', 'preset', 'asteroid'}
+ASTEROID_KEYS = ('x', 'y', 'z', 'vx', 'vy', 'vz', 'mass', 'lat', 'lon', 'angle')
+
+
+class ScenarioFileError(ValueError):
+    """Raised for a scenario file that cannot be read or has an invalid layout"""
+
+
+def load_scenario_file(path):
+    """Scenario dicts of a JSON or TOML file, with the file's defaults applied"""
+    toml = path.endswith('.toml')
+    if toml and tomllib is None:
+        raise ScenarioFileError(f"{path}: TOML needs Python 3.11 or later")
+    try:
+        if toml:
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        else:
+            with open(path) as f:
+                data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ScenarioFileError(f"{path}: {e}") from None
+
+    if isinstance(data, list):
+        data = {'scenarios': data}
+    if not isinstance(data, dict):
+        raise ScenarioFileError(f"{path}: expected a table or a list of scenarios")
+    if 'scenarios' not in data:
+        data = {'scenarios': [data]}
+
+    defaults = dict(DEFAULTS)
+    defaults.update(data.get('defaults', {}))
+    jobs = []
+    for index, scenario in enumerate(data['scenarios']):
+        if not isinstance(scenario, dict):
+            raise ScenarioFileError(f"{path}: scenario {index} is not a table")
+        job = dict(defaults)
+        job.update(scenario)
+        job.setdefault('name', scenario.get('preset') or f"{os.path.basename(path)}[{index}]")
+        jobs.append(job)
+    return jobs
+
+
+def scenario_of(job):
+    """Full scenario dict (scenarios.py units) of a job; raises ValueError if invalid"""
+    unknown = set(job) - SCENARIO_KEYS
+    if unknown:
+        raise ValueError(f"unknown keys {', '.join(sorted(unknown))}")
+
+    scenario = {key: 0.0 for key in ASTEROID_KEYS}
+    if job.get('preset') is not None:
+        catalog = scenarios.catalog_scenarios()
+        if job['preset'] not in catalog:
+            raise ValueError(f"unknown preset '{job['preset']}'")
+        scenario.update(catalog[job['preset']])
+    asteroid = job.get('asteroid', {})
+    unknown = set(asteroid) - set(ASTEROID_KEYS)
+    if unknown:
+        raise ValueError(f"unknown asteroid fields {', '.join(sorted(unknown))}")
+    scenario.update({key: float(value) for key, value in asteroid.items()})
+
+    if scenario['mass'] <= 0:
+        raise ValueError("asteroid mass must be positive")
+    if not -90 <= scenario['lat'] <= 90 or not -180 <= scenario['lon'] <= 180:
+        raise ValueError("impact latitude/longitude out of range")
+    if not 0 < scenario['angle'] <= 90:
+        raise ValueError("entry angle must be in (0, 90] degrees")
+    if job['integrator'] not in integrators.INTEGRATORS:
+        raise ValueError(f"unknown integrator '{job['integrator']}'")
+    if job['duration_days'] <= 0 or job['time_step_days'] <= 0:
+        raise ValueError("duration_days and time_step_days must be positive")
+    return scenario
+
+
+def create_state(job, scenario):
+    """SystemState for a job: the massive bodies plus the asteroid"""
+    if job['ephemeris']:
+        state = sweep.load_ephemeris(job['ephemeris']).create_state()
+    else:
+        state = ephemeris.create_planetary_state(job['planets'])
+    bodies = job['bodies']
+    state.add_bodies(
+        [body['name'] for body in bodies], [body['mass'] for body in bodies],
+        np.array([body['pos'] for body in bodies], dtype=float).reshape(-1, 3) * AU,
+        np.array([body['vel'] for body in bodies], dtype=float).reshape(-1, 3) * 1000,
+        [body.get('fixed', False) for body in bodies]
+    )
+    pos, vel, mass = scenarios.scenario_state(scenario)
+    physics.add_asteroid(state, pos, vel, mass)
+    return state
+
+
+def create_map(job, scenario, velocity):
+    """Impact map file for a job that asked for one"""
+    options = job['map'] if isinstance(job['map'], dict) else {}
+    impact = (scenario['lat'], scenario['lon'], scenario['mass'], velocity, scenario['angle'])
+    # The map code reports on stdout, which may be carrying the results
+    with contextlib.redirect_stdout(sys.stderr):
+        if 'output' in options:
+            return impact_map.create_impact_map(*impact, output_file=options['output'], open_browser=False)
+        cache = impact_map.MapCache(options.get('cache', "impact_map_cache"))
+        return cache.impact_map(*impact, open_browser=False)
+
+
+def run_job(job):
+    """Run one scenario and return its result record
+
+    Errors are caught and reported in the record, so one bad scenario does
+    not stop the batch.
+    """
+    try:
+        scenario = scenario_of(job)
+        state = create_state(job, scenario)
+        result = physics.propagate(
+            state, job['duration_days'] * DAY, job['time_step_days'] * DAY,
+            stop_on_impact=job['stop_on_impact'],
+            integrator=None if job['integrator'] == 'euler' else integrators.create_integrator(job['integrator'])
+        )
+        record = {'status': 'ok', **sweep.summarize(job['name'], scenario, result), 'map_file': None}
+        record['events'] = len(result['events'])
+        if result['impact'] and job['map']:
+            record['map_file'] = create_map(job, scenario, result['impact_velocity'])
+        return record
+    except Exception as e:
+        return {'status': 'error', 'name': job.get('name'), 'error': f"{type(e).__name__}: {e}"}
+
+
+def run_batch(jobs, workers=1):
+    """Yield result records in job order, on a process pool when workers > 1"""
+    if workers == 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run_job, jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run asteroid scenario files without a display")
+    parser.add_argument('files', nargs='+', help="JSON or TOML scenario files")
+    parser.add_argument('--output', default=None, help="JSON Lines file for the results (default: stdout)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes; 0 for one per CPU")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for path in args.files:
+        try:
+            jobs.extend(load_scenario_file(path))
+        except ScenarioFileError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+
+    failed = 0
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in run_batch(jobs, args.workers or os.cpu_count()):
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            if record['status'] != 'ok':
+                failed += 1
+                print(f"{record['name']}: {record['error']}", file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+    print(f"{len(jobs) - failed} of {len(jobs)} scenarios completed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
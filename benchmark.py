@@ -0,0 +1,238 @@
+"""Throughput benchmarks for the force evaluation, the step loop and ensembles.
+
+Every case is timed for at least --min-time seconds, best of --repeats,
+and reported as a rate (force evaluations or steps per second):
+
+    python benchmark.py                              # all cases
+    python benchmark.py --quick --only 'step/*'      # small sizes, one family
+    python benchmark.py --save baseline.json         # store a baseline
+    python benchmark.py --baseline baseline.json     # exit 1 on a regression
+
+Families:
+
+- force/direct, force/octree: one acceleration evaluation for N bodies
+  (all-pairs sum up to N = 2000, Barnes-Hut from 1000 to 10^5)
+- step/direct, step/octree: one semi-implicit Euler step of N bodies
+- integrator/<name>: one step of the scene's Sun-Earth-Moon-asteroid system
+- ensemble: run_ensemble steps for a batch of clones, encounter search
+  and setup included
+
+For each family run at several sizes the table also shows the time per
+call against N and the local scaling exponent d log(time) / d log(N) between successive sizes.
+Baselines are JSON files of the same shape as --save writes; a case
+regresses when its rate falls more than --threshold below the baseline.
+"""
+import argparse
+import fnmatch
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+
+import ensemble
+import integrators
+import octree
+import physics
+from physics import AU, DAY, G
+
+DIRECT_SIZES = [3, 10, 100, 1000, 2000]
+OCTREE_SIZES = [1000, 10000, 100000]
+ENSEMBLE_SIZES = [10, 1000, 100000]
+ENSEMBLE_STEPS = 10  # Steps per timed run_ensemble call
+QUICK_LIMIT = 10000  # Largest size run with --quick
+
+
+def population_state(n, force_solver=None, seed=0):
+    """The fixed Sun and n - 1 light bodies on circular orbits between 0.5 and 5 AU"""
+    rng = np.random.default_rng(seed)
+    sun_mass = physics.BODY_DATA['Sun']['mass']
+    radius = rng.uniform(0.5, 5.0, n - 1) * AU
+    angle = rng.uniform(0, 2 * np.pi, n - 1)
+    speed = np.sqrt(G * sun_mass / radius)
+
+    mass = np.concatenate([[sun_mass], rng.uniform(1e15, 1e20, n - 1)])
+    pos = np.zeros((n, 3))
+    pos[1:, 0] = radius * np.cos(angle)
+    pos[1:, 1] = radius * np.sin(angle)
+    pos[1:, 2] = rng.normal(0, 0.01 * AU, n - 1)
+    vel = np.zeros((n, 3))
+    vel[1:, 0] = -speed * np.sin(angle)
+    vel[1:, 1] = speed * np.cos(angle)
+    fixed = np.zeros(n, dtype=bool)
+    fixed[0] = True
+
+    state = physics.SystemState(softening=1e6, force_solver=force_solver)
+    state.add_bodies(['Sun'] + [f'Body {i}' for i in range(1, n)], mass, pos, vel, fixed)
+    return state
+
+
+def scene_state():
+    """Sun, Earth, Moon and the default asteroid, as in the scene"""
+    state = physics.create_initial_state()
+    physics.add_asteroid(state, **physics.DEFAULT_ASTEROID)
+    return state
+
+
+def measure(run, min_time=0.2, repeats=3):
+    """Best rate of run() in calls per second, each repeat lasting at least min_time"""
+    run()  # Warm up caches and solver trees
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def benchmark_cases(quick=False):
+    """(name, family, n, unit, per_call, setup) for every case
+
+    setup() returns the callable to time, which does per_call units of work.
+    """
+    def sizes(values):
+        return [n for n in values if not quick or n <= QUICK_LIMIT]
+
+    def force_case(n, solver):
+        def setup():
+            state = population_state(n, solver() if solver else None)
+            return lambda: physics.state_accelerations(state)
+        return setup
+
+    def step_case(n, solver):
+        def setup():
+            state = population_state(n, solver() if solver else None)
+            return lambda: physics.step(state, 0.1 * DAY)
+        return setup
+
+    def integrator_case(name):
+        def setup():
+            state = scene_state()
+            integrator = integrators.create_integrator(name)
+            return lambda: integrator.step(state, integrator.next_step or 0.1 * DAY)
+        return setup
+
+    def ensemble_case(n):
+        def setup():
+            nominal = physics.DEFAULT_ASTEROID
+            pos, vel = ensemble.sample_clones(nominal['pos'], nominal['vel'], n, pos_sigma=1e7, vel_sigma=10, seed=1)
+            return lambda: ensemble.run_ensemble(pos, vel, ENSEMBLE_STEPS * DAY, DAY)
+        return setup
+
+    cases = []
+    for n in sizes(DIRECT_SIZES):
+        cases.append((f'force/direct/{n}', 'force/direct', n, 'evaluations/s', 1, force_case(n, None)))
+    for n in sizes(OCTREE_SIZES):
+        cases.append((f'force/octree/{n}', 'force/octree', n, 'evaluations/s', 1, force_case(n, octree.BarnesHutSolver)))
+    for n in sizes(DIRECT_SIZES):
+        cases.append((f'step/direct/{n}', 'step/direct', n, 'steps/s', 1, step_case(n, None)))
+    for n in sizes(OCTREE_SIZES):
+        cases.append((f'step/octree/{n}', 'step/octree', n, 'steps/s', 1, step_case(n, octree.BarnesHutSolver)))
+    for name in integrators.INTEGRATORS:
+        cases.append((f'integrator/{name}', 'integrator', 4, 'steps/s', 1, integrator_case(name)))
+    for n in sizes(ENSEMBLE_SIZES):
+        cases.append((f'ensemble/{n}', 'ensemble', n, 'steps/s', ENSEMBLE_STEPS, ensemble_case(n)))
+    return cases
+
+
+def run_benchmarks(patterns=None, quick=False, min_time=0.2, repeats=3):
+    """Time the cases whose names match any of patterns and return the results document"""
+    results = {}
+    for name, family, n, unit, per_call, setup in benchmark_cases(quick):
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        rate = measure(setup(), min_time, repeats) * per_call
+        results[name] = {'family': family, 'n': n, 'unit': unit, 'rate': rate}
+        print(f"{name:<24} {rate:>14.4g} {unit}", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cases': results
+    }
+
+
+def scaling(results):
+    """Per family, (n, seconds per call, exponent from the previous size) sorted by n
+
+    Families run at a single size (the integrators) have no curve.
+    """
+    families = {}
+    for case in results['cases'].values():
+        families.setdefault(case['family'], []).append((case['n'], 1.0 / case['rate']))
+    curves = {}
+    for family, points in families.items():
+        if len({n for n, _ in points}) < 2:
+            continue
+        points.sort()
+        curve = []
+        for i, (n, seconds) in enumerate(points):
+            exponent = None
+            if i > 0 and n != points[i - 1][0]:
+                exponent = math.log(seconds / points[i - 1][1]) / math.log(n / points[i - 1][0])
+            curve.append((n, seconds, exponent))
+        curves[family] = curve
+    return curves
+
+
+def compare(results, baseline, threshold):
+    """Names and rate ratios of the cases that are more than threshold slower than baseline"""
+    regressions = []
+    for name, case in results['cases'].items():
+        reference = baseline['cases'].get(name)
+        if reference is None:
+            continue
+        ratio = case['rate'] / reference['rate']
+        if ratio < 1 - threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark force evaluation, integrators and ensembles")
+    parser.add_argument('--only', action='append', default=[], metavar='PATTERN',
+                        help="Run only cases matching a glob such as 'step/*'; repeatable")
+    parser.add_argument('--quick', action='store_true', help=f"Skip sizes above {QUICK_LIMIT}")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds per timing repeat")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', default=None, help="Write the results as a JSON baseline")
+    parser.add_argument('--baseline', default=None, help="Compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed fractional throughput loss against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only, args.quick, args.min_time, args.repeats)
+
+    print(f"{'Family':<14} {'N':>8} {'Time/call (s)':>14} {'Exponent':>9}")
+    for family, curve in scaling(results).items():
+        for n, seconds, exponent in curve:
+            print(f"{family:<14} {n:>8} {seconds:>14.3e} {'' if exponent is None else f'{exponent:.2f}':>9}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline rate")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Binary checkpoints of the complete simulation state.
+
+A checkpoint is a single .npz file: the body and test particle arrays are
+stored as raw NumPy arrays and everything else (time, integrator settings
+and suggested step, force solver, absolute ephemeris path, random
+generator state and seed, progress of the run that wrote it) as a JSON
+header. Files are written to a temporary name and renamed, so an
+interrupted save never destroys the previous checkpoint.
+
+Long runs resume from the last checkpoint, and what-if branches fork by
+loading the same file several times:
+
+    saver = checkpoint.Checkpointer('run.npz', every=1000)
+    physics.propagate(state, duration, time_step, integrator=integrator, checkpoint=saver)
+
+    snapshot = checkpoint.load_checkpoint('run.npz')
+    progress = snapshot['progress']
+    physics.propagate(snapshot['state'], progress['end_time'] - snapshot['state'].time, time_step,
+                      integrator=snapshot['integrator'], checkpoint=saver, progress=progress)
+"""
+import json
+import os
+
+import numpy as np
+
+import ephemeris
+import integrators
+import octree
+import physics
+
+FORMAT_VERSION = 1
+
+# Constructor arguments of octree.BarnesHutSolver
+SOLVER_OPTIONS = ('theta', 'leaf_size', 'group_size', 'rebuild_fraction', 'chunk_size')
+
+
+def save_checkpoint(path, state, integrator=None, rng=None, seed=None, progress=None):
+    """Write the state, integrator and random generator to path
+
+    rng is a numpy Generator whose exact position is stored; seed is the
+    seed the run started from. progress is any JSON-serialisable dict, for
+    example the running summary of physics.propagate.
+    """
+    header = {
+        'version': FORMAT_VERSION,
+        'names': state.names,
+        'time': state.time,
+        'softening': state.softening,
+        'next_particle_id': state.next_particle_id,
+        'force_solver': None,
+        # Absolute, so the checkpoint loads from any working directory
+        'ephemeris': os.path.abspath(state.ephemeris.path) if state.ephemeris is not None else None,
+        'integrator': None,
+        'seed': seed,
+        'rng': rng.bit_generator.state if rng is not None else None,
+        'progress': progress
+    }
+    if state.force_solver is not None:
+        header['force_solver'] = {name: getattr(state.force_solver, name) for name in SOLVER_OPTIONS}
+    if integrator is not None:
+        header['integrator'] = {'name': integrator.name, 'settings': vars(integrator)}
+
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        np.savez(
+            f,
+            header=np.array(json.dumps(header)),
+            mass=state.mass,
+            pos=state.pos,
+            vel=state.vel,
+            fixed=state.fixed,
+            particle_pos=state.particle_pos,
+            particle_vel=state.particle_vel,
+            particle_ids=state.particle_ids
+        )
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    """Read a checkpoint written by save_checkpoint
+
+    Returns a dict with the restored 'state', 'integrator' (None if none
+    was saved), 'rng' (a numpy Generator or None), 'seed' and 'progress'.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data['header']))
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {header['version']} in {path}")
+
+        force_solver = None
+        if header['force_solver'] is not None:
+            force_solver = octree.BarnesHutSolver(**header['force_solver'])
+        ephemeris_table = None
+        if header['ephemeris'] is not None:
+            ephemeris_table = ephemeris.Ephemeris(header['ephemeris'])
+
+        state = physics.SystemState(header['softening'], force_solver, ephemeris_table)
+        state.add_bodies(list(header['names']), data['mass'], data['pos'], data['vel'], data['fixed'])
+        state.particle_pos = data['particle_pos'].copy()
+        state.particle_vel = data['particle_vel'].copy()
+        state.particle_ids = data['particle_ids'].copy()
+        state.next_particle_id = header['next_particle_id']
+        state.time = header['time']
+
+    integrator = None
+    if header['integrator'] is not None:
+        integrator = integrators.create_integrator(header['integrator']['name'])
+        vars(integrator).update(header['integrator']['settings'])
+
+    rng = None
+    if header['rng'] is not None:
+        rng = np.random.default_rng()
+        rng.bit_generator.state = header['rng']
+
+    return {
+        'state': state,
+        'integrator': integrator,
+        'rng': rng,
+        'seed': header['seed'],
+        'progress': header['progress']
+    }
+
+
+class Checkpointer:
+    """Step callback that saves a checkpoint every `every` steps
+
+    Pass it as checkpoint= to physics.propagate, which calls it with the
+    state, integrator and running summary after each step.
+    """
+    def __init__(self, path, every=1000, rng=None, seed=None):
+        self.path = path
+        self.every = every
+        self.rng = rng
+        self.seed = seed
+        self.calls = 0
+
+    def __call__(self, state, integrator, progress):
+        self.calls += 1
+        if self.calls % self.every == 0:
+            save_checkpoint(self.path, state, integrator, self.rng, self.seed, progress)
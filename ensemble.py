@@ -0,0 +1,134 @@
+"""Monte Carlo ensembles of asteroid clones.
+
+All clones are integrated together as the (N, 3) test-particle block of a
+SystemState under the shared field of the massive bodies. Clones are
+massless: they feel the Sun, Earth and Moon but do not perturb them or
+each other.
+"""
+import math
+
+import numpy as np
+
+import events
+import physics
+from physics import EARTH_RADIUS, EARTH_ROTATION_PERIOD
+
+
+def sample_clones(nominal_pos, nominal_vel, n, covariance=None, pos_sigma=0.0, vel_sigma=0.0, seed=None):
+    """Sample n clone state vectors around a nominal state
+
+    Either pass a 6x6 covariance for (x, y, z, vx, vy, vz) in m and m/s, or
+    per-axis standard deviations pos_sigma (m) and vel_sigma (m/s), each a
+    scalar or a 3-sequence. Returns (pos, vel) arrays of shape (n, 3).
+    """
+    rng = np.random.default_rng(seed)
+    nominal = np.concatenate([np.asarray(nominal_pos, dtype=float), np.asarray(nominal_vel, dtype=float)])
+
+    if covariance is not None:
+        states = rng.multivariate_normal(nominal, np.asarray(covariance, dtype=float), size=n)
+    else:
+        sigma = np.concatenate([
+            np.broadcast_to(np.asarray(pos_sigma, dtype=float), 3),
+            np.broadcast_to(np.asarray(vel_sigma, dtype=float), 3)
+        ])
+        states = nominal + rng.standard_normal((n, 6)) * sigma
+
+    return states[:, :3].copy(), states[:, 3:].copy()
+
+
+def run_ensemble(clone_pos, clone_vel, duration, time_step, state=None, impact_distance=EARTH_RADIUS, target='Earth',
+                 integrator=None):
+    """Propagate a batch of clones and report per-clone encounter outcomes
+
+    state holds the massive bodies (a fresh Sun-Earth-Moon system by default;
+    any 'Asteroid' or test particles in it are ignored). The clones are
+    added as test particles and advanced with integrator (semi-implicit
+    Euler by default). Closest approach and surface contact at
+    impact_distance are located inside each step (see events.py), and
+    clones that hit the target are removed from the integration.
+    Returns a dict of per-clone arrays plus the impact fraction and
+    percentiles of the closest-approach distance. impact_pos is the contact
+    point relative to the target (see impact_coordinates).
+    """
+    if state is None:
+        state = physics.create_initial_state()
+    else:
+        state = state.copy()
+        state.remove_body('Asteroid')
+        state.remove_particles(np.ones(len(state.particle_pos), dtype=bool))
+
+    ids = state.add_particles(clone_pos, clone_vel)
+    n = len(ids)
+    first_id = ids[0] if n else 0
+    target_index = state.index(target)
+
+    min_distance = np.full(n, np.inf)
+    min_distance_time = np.zeros(n)
+    impact = np.zeros(n, dtype=bool)
+    impact_time = np.full(n, np.nan)
+    impact_velocity = np.full(n, np.nan)
+    impact_pos = np.full((n, 3), np.nan)
+
+    mu = physics.G * state.mass[target_index]
+    steps = 0
+    end_time = state.time + duration
+    while state.time < end_time and len(state.particle_ids):
+        clones = state.particle_ids - first_id
+        start_time = state.time
+        rel_pos = state.particle_pos - state.pos[target_index]
+        rel_vel = state.particle_vel - state.vel[target_index]
+
+        if integrator is None:
+            physics.step(state, time_step)
+        else:
+            integrator.step(state, min(integrator.next_step or time_step, end_time - state.time))
+        step_size = state.time - start_time
+        steps += 1
+
+        # Search the step for closest approach and contact
+        encounter = events.find_encounters(rel_pos, rel_vel, mu, step_size, impact_distance)
+        step_min_distance = encounter['min_distance']
+        step_min_time = start_time + encounter['min_time']
+        hit = encounter['contact']
+        impact[clones[hit]] = True
+        impact_time[clones[hit]] = start_time + encounter['contact_time'][hit]
+        impact_velocity[clones[hit]] = np.linalg.norm(encounter['contact_vel'][hit], axis=1)
+        impact_pos[clones[hit]] = encounter['contact_pos'][hit]
+
+        # Track approach to the target
+        closer = step_min_distance < min_distance[clones]
+        min_distance[clones[closer]] = step_min_distance[closer]
+        min_distance_time[clones[closer]] = step_min_time[closer]
+        state.remove_particles(hit)
+
+    return {
+        'steps': steps,
+        'time': state.time,
+        'impact_fraction': float(impact.mean()) if n else 0.0,
+        'impact': impact,
+        'impact_time': impact_time,
+        'impact_velocity': impact_velocity,
+        'impact_pos': impact_pos,
+        'min_distance': min_distance,
+        'min_distance_time': min_distance_time,
+        'min_distance_percentiles': dict(zip(
+            (5, 25, 50, 75, 95),
+            np.percentile(min_distance, (5, 25, 50, 75, 95)) if n else [math.nan] * 5
+        )),
+        'outcome': np.where(impact, 'impact', 'miss')
+    }
+
+
+def impact_coordinates(impact_pos, impact_time):
+    """Latitude and longitude in degrees of contact points on the rotating Earth
+
+    impact_pos are (N, 3) contact positions relative to Earth and
+    impact_time their times. As in the scene, Earth spins about the z axis
+    once per EARTH_ROTATION_PERIOD and longitude 0 faces +x at time 0.
+    """
+    impact_pos = np.asarray(impact_pos, dtype=float).reshape(-1, 3)
+    distance = np.linalg.norm(impact_pos, axis=1)
+    lat = np.degrees(np.arcsin(np.clip(impact_pos[:, 2] / distance, -1.0, 1.0)))
+    rotation = 2 * np.pi * np.asarray(impact_time, dtype=float) / EARTH_ROTATION_PERIOD
+    lon = np.degrees(np.arctan2(impact_pos[:, 1], impact_pos[:, 0]) - rotation)
+    return lat, (lon + 180.0) % 360.0 - 180.0
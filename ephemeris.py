@@ -0,0 +1,197 @@
+"""Precomputed Chebyshev ephemerides for the massive bodies.
+
+The massive bodies are integrated once and every body's position is fitted
+over consecutive segments of equal length with Chebyshev polynomials,
+interpolating at the Chebyshev nodes of each segment. A table is a
+directory with two files:
+
+    coefficients.npy  (segments, degree + 1, bodies, 3) float64, memory-mapped
+    ephemeris.json    names, masses, fixed flags, start time, segment length
+
+Attach a loaded Ephemeris to a SystemState and its bodies are looked up
+instead of integrated, so extra perturbers such as Jupiter cost one
+polynomial evaluation per stage:
+
+    python ephemeris.py --output ephemeris --years 20 --planet Jupiter
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from numpy.polynomial import chebyshev
+
+import integrators
+import physics
+from physics import G, AU, DAY
+
+COEFFICIENTS_FILE = 'coefficients.npy'
+METADATA_FILE = 'ephemeris.json'
+
+# Planets that can be added as extra perturbers (distance in AU, velocity in km/s)
+PLANET_DATA = {
+    'Venus': {'mass': 4.867e24, 'distance': 0.723, 'velocity': 35.02},
+    'Mars': {'mass': 6.417e23, 'distance': 1.524, 'velocity': 24.07},
+    'Jupiter': {'mass': 1.898e27, 'distance': 5.204, 'velocity': 13.07},
+    'Saturn': {'mass': 5.683e26, 'distance': 9.583, 'velocity': 9.68}
+}
+
+
+def create_planetary_state(planets=()):
+    """Sun-Earth-Moon system with extra planets on circular orbits
+
+    Planets start on the +x axis like Earth, with the circular speed for
+    their distance from the fixed Sun.
+    """
+    state = physics.create_initial_state()
+    sun_mass = physics.BODY_DATA['Sun']['mass']
+    for name in planets:
+        if name not in PLANET_DATA:
+            raise ValueError(f"Unknown planet '{name}', expected one of {', '.join(PLANET_DATA)}")
+        distance = PLANET_DATA[name]['distance'] * AU
+        state.add_body(name, PLANET_DATA[name]['mass'], [distance, 0, 0], [0, math.sqrt(G * sun_mass / distance), 0])
+    return state
+
+
+def chebyshev_nodes(degree):
+    """Chebyshev points of the first kind on [-1, 1] in increasing order"""
+    return np.cos(np.pi * (np.arange(degree + 1)[::-1] + 0.5) / (degree + 1))
+
+
+def chebyshev_basis(x, degree):
+    """Values T_k(x) and derivatives T_k'(x) for k = 0..degree at a scalar x
+
+    Uses the recurrences for T_k and for U_k, with T_k' = k U_(k-1).
+    """
+    basis = np.empty(degree + 1)
+    derivative = np.empty(degree + 1)
+    t_prev, t = 1.0, x
+    u_prev, u = 0.0, 1.0
+    basis[0], derivative[0] = 1.0, 0.0
+    for k in range(1, degree + 1):
+        basis[k] = t
+        derivative[k] = k * u
+        t_prev, t = t, 2 * x * t - t_prev
+        u_prev, u = u, 2 * x * u - u_prev
+    return basis, derivative
+
+
+def build_ephemeris(path, duration, state=None, segment_length=8 * DAY, degree=16, integrator=None):
+    """Integrate the bodies of state and write their ephemeris to path
+
+    state defaults to the Sun-Earth-Moon system and is not modified; every
+    body in it is tabulated, test particles are ignored. Segments are
+    written straight into the memory-mapped file, so tables longer than
+    memory can be built. Returns the loaded Ephemeris.
+    """
+    state = (state or physics.create_initial_state()).copy()
+    state.remove_particles(np.ones(len(state.particle_pos), dtype=bool))
+    state.ephemeris = None
+    integrator = integrator or integrators.DormandPrince45(rtol=1e-12, atol_pos=1e-3, atol_vel=1e-9)
+    segments = int(math.ceil(duration / segment_length))
+    nodes = chebyshev_nodes(degree)
+    start_time = state.time
+
+    os.makedirs(path, exist_ok=True)
+    coefficients = np.lib.format.open_memmap(
+        os.path.join(path, COEFFICIENTS_FILE), mode='w+', dtype=np.float64,
+        shape=(segments, degree + 1, len(state.mass), 3)
+    )
+    samples = np.empty((degree + 1, len(state.mass), 3))
+    for segment in range(segments):
+        segment_start = start_time + segment * segment_length
+        for k, node in enumerate(nodes):
+            integrators.advance(integrator, state, segment_start + 0.5 * (node + 1) * segment_length - state.time)
+            samples[k] = state.pos
+        fit = chebyshev.chebfit(nodes, samples.reshape(degree + 1, -1), degree)
+        coefficients[segment] = fit.reshape(degree + 1, len(state.mass), 3)
+    coefficients.flush()
+    del coefficients
+
+    with open(os.path.join(path, METADATA_FILE), 'w') as f:
+        json.dump({
+            'names': state.names,
+            'mass': state.mass.tolist(),
+            'fixed': state.fixed.tolist(),
+            'start_time': start_time,
+            'segment_length': segment_length,
+            'degree': degree
+        }, f, indent=2)
+    return Ephemeris(path)
+
+
+class Ephemeris:
+    """Memory-mapped Chebyshev ephemeris written by build_ephemeris
+
+    Only the segments that are evaluated are read from disk, and the table
+    can be shared by any number of processes.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        self.names = metadata['names']
+        self.mass = np.array(metadata['mass'])
+        self.fixed = np.array(metadata['fixed'], dtype=bool)
+        self.start_time = metadata['start_time']
+        self.segment_length = metadata['segment_length']
+        self.degree = metadata['degree']
+        self.coefficients = np.load(os.path.join(path, COEFFICIENTS_FILE), mmap_mode='r')
+
+    @property
+    def end_time(self):
+        return self.start_time + len(self.coefficients) * self.segment_length
+
+    def _segment(self, time):
+        """Coefficients (degree + 1, bodies * 3) of the segment holding time and the scaled time in [-1, 1]"""
+        if not self.start_time <= time <= self.end_time:
+            raise ValueError(f"Time {time:.1f} s is outside the ephemeris "
+                             f"({self.start_time:.1f} s to {self.end_time:.1f} s)")
+        segment = min(int((time - self.start_time) // self.segment_length), len(self.coefficients) - 1)
+        x = 2 * (time - self.start_time - segment * self.segment_length) / self.segment_length - 1
+        return np.asarray(self.coefficients[segment]).reshape(self.degree + 1, -1), x
+
+    def positions(self, time):
+        """(bodies, 3) positions at time"""
+        coefficients, x = self._segment(time)
+        return (chebyshev_basis(x, self.degree)[0] @ coefficients).reshape(-1, 3)
+
+    def state_at(self, time):
+        """(bodies, 3) positions and velocities at time"""
+        coefficients, x = self._segment(time)
+        basis, derivative = chebyshev_basis(x, self.degree)
+        pos = (basis @ coefficients).reshape(-1, 3)
+        vel = (derivative @ coefficients).reshape(-1, 3) * (2 / self.segment_length)
+        return pos, vel
+
+    def create_state(self, time=None, softening=0.0, force_solver=None):
+        """SystemState at time with every tabulated body driven by this ephemeris"""
+        time = self.start_time if time is None else time
+        state = physics.SystemState(softening, force_solver, ephemeris=self)
+        pos, vel = self.state_at(time)
+        state.add_bodies(list(self.names), self.mass, pos, vel, self.fixed)
+        state.time = time
+        return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Chebyshev ephemeris for the massive bodies")
+    parser.add_argument('--output', default='ephemeris', help="Directory for the table")
+    parser.add_argument('--years', type=float, default=10.0)
+    parser.add_argument('--segment-days', type=float, default=8.0)
+    parser.add_argument('--degree', type=int, default=16)
+    parser.add_argument('--planet', action='append', default=[], choices=list(PLANET_DATA),
+                        help="Add a planet as an extra perturber; repeat for several")
+    args = parser.parse_args(argv)
+
+    table = build_ephemeris(args.output, args.years * 365.25 * DAY, create_planetary_state(args.planet),
+                            args.segment_days * DAY, args.degree)
+    print(f"{', '.join(table.names)}: {len(table.coefficients)} segments of {args.segment_days:g} days "
+          f"in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Continuous detection of close approaches and impacts inside a step.
+
+Within one step the motion of a body relative to the target is modelled as
+a two-body Kepler arc about the target, started from the relative state at
+the beginning of the step. The time of minimum distance and of surface
+contact are bracketed on that arc and refined by bisection, so encounters
+are caught even when a single step carries the body straight past, or
+through, the target. Bodies too far away to reach the target within the
+step, even when falling towards it from rest, are treated as moving in
+straight lines, which is much cheaper.
+"""
+import numpy as np
+
+from kepler import kepler_drift
+
+
+def _radial_speed(pos, vel):
+    """r . v for arrays of (N, 3) states"""
+    return np.einsum('ij,ij->i', pos, vel)
+
+
+def find_encounters(rel_pos, rel_vel, mu, time_step, contact_distance, iterations=50):
+    """Locate closest approach and surface contact within one step
+
+    rel_pos and rel_vel are (N, 3) states relative to the target at the start
+    of the step, mu is G * (target mass + body mass) as a scalar or (N,)
+    array. Times in the result are offsets from the start of the step.
+    local_minimum marks bodies whose distance reached a true minimum inside
+    the step; contact marks bodies that crossed contact_distance, or were
+    already inside it at the start of the step (contact time 0).
+    """
+    rel_pos = np.asarray(rel_pos, dtype=float)
+    rel_vel = np.asarray(rel_vel, dtype=float)
+    n = len(rel_pos)
+    mu = np.broadcast_to(np.asarray(mu, dtype=float), (n,))
+
+    start_distance = np.linalg.norm(rel_pos, axis=1)
+    speed = np.linalg.norm(rel_vel, axis=1)
+    started_inside = start_distance <= contact_distance
+    # Outside contact_distance energy conservation caps the speed at this, so beyond
+    # twice the reach the target cannot be reached and its pull barely bends the path
+    max_speed = np.sqrt(speed ** 2 + 2 * mu / contact_distance)
+    far = start_distance > 2 * max_speed * time_step + contact_distance
+    near = ~started_inside & ~far
+    if near.all():
+        return _find_encounters_outside(rel_pos, rel_vel, mu, time_step, contact_distance, iterations)
+
+    # Bodies already inside are in contact at the start; far ones move in straight lines
+    closest_time = np.clip(-_radial_speed(rel_pos, rel_vel) / np.maximum(speed ** 2, 1e-300), 0.0, time_step)
+    result = {
+        'local_minimum': far & (closest_time > 0) & (closest_time < time_step),
+        'min_time': np.where(far, closest_time, 0.0),
+        'min_distance': np.where(far, np.linalg.norm(rel_pos + rel_vel * closest_time[:, np.newaxis], axis=1),
+                                 start_distance),
+        'min_pos': rel_pos + rel_vel * np.where(far, closest_time, 0.0)[:, np.newaxis],
+        'min_vel': rel_vel.copy(),
+        'contact': started_inside.copy(),
+        'contact_time': np.where(started_inside, 0.0, np.nan),
+        'contact_pos': np.where(started_inside[:, np.newaxis], rel_pos, np.nan),
+        'contact_vel': np.where(started_inside[:, np.newaxis], rel_vel, np.nan)
+    }
+    if near.any():
+        found = _find_encounters_outside(rel_pos[near], rel_vel[near], mu[near], time_step,
+                                         contact_distance, iterations)
+        for key, values in found.items():
+            result[key][near] = values
+    return result
+
+
+def _find_encounters_outside(rel_pos, rel_vel, mu, time_step, contact_distance, iterations):
+    """find_encounters on Kepler arcs for bodies near, but outside, contact_distance"""
+    n = len(rel_pos)
+
+    start_radial = _radial_speed(rel_pos, rel_vel)
+    end_pos, end_vel = kepler_drift(rel_pos, rel_vel, mu, time_step)
+    end_radial = _radial_speed(end_pos, end_vel)
+
+    # A bound body receding at the start may turn round at apoapsis inside the
+    # step and fall back; its approach then starts at the apoapsis
+    apoapsis_time = _time_to_apoapsis(rel_pos, rel_vel, mu)
+    turning = (start_radial >= 0) & (apoapsis_time < time_step)
+    approach_start = np.where(turning, apoapsis_time, 0.0)
+    falling = (start_radial < 0) | turning
+
+    # Distance minimum: at the start if receding, at the end if still approaching,
+    # unless a turning body ends the step farther out than it started
+    min_time = np.where(falling, float(time_step), 0.0)
+    min_time[turning & (end_radial < 0) &
+             (np.linalg.norm(end_pos, axis=1) > np.linalg.norm(rel_pos, axis=1))] = 0.0
+    local_minimum = falling & (end_radial >= 0)
+    if local_minimum.any():
+        low = approach_start[local_minimum]
+        high = np.full(local_minimum.sum(), float(time_step))
+        for _ in range(iterations):
+            middle = 0.5 * (low + high)
+            pos, vel = kepler_drift(rel_pos[local_minimum], rel_vel[local_minimum], mu[local_minimum], middle)
+            approaching = _radial_speed(pos, vel) < 0
+            low = np.where(approaching, middle, low)
+            high = np.where(approaching, high, middle)
+        min_time[local_minimum] = 0.5 * (low + high)
+
+    min_pos, min_vel = kepler_drift(rel_pos, rel_vel, mu, min_time)
+    min_distance = np.linalg.norm(min_pos, axis=1)
+
+    # Surface contact: distance decreases monotonically up to the minimum
+    contact = (np.linalg.norm(rel_pos, axis=1) > contact_distance) & (min_distance <= contact_distance)
+    contact_time = np.full(n, np.nan)
+    contact_pos = np.full((n, 3), np.nan)
+    contact_vel = np.full((n, 3), np.nan)
+    if contact.any():
+        low = approach_start[contact]
+        high = min_time[contact].copy()
+        for _ in range(iterations):
+            middle = 0.5 * (low + high)
+            pos, _vel = kepler_drift(rel_pos[contact], rel_vel[contact], mu[contact], middle)
+            outside = np.linalg.norm(pos, axis=1) > contact_distance
+            low = np.where(outside, middle, low)
+            high = np.where(outside, high, middle)
+        contact_time[contact] = high
+        contact_pos[contact], contact_vel[contact] = kepler_drift(
+            rel_pos[contact], rel_vel[contact], mu[contact], high
+        )
+
+    return {
+        'local_minimum': local_minimum,
+        'min_time': min_time,
+        'min_distance': min_distance,
+        'min_pos': min_pos,
+        'min_vel': min_vel,
+        'contact': contact,
+        'contact_time': contact_time,
+        'contact_pos': contact_pos,
+        'contact_vel': contact_vel
+    }
+
+
+def _time_to_apoapsis(rel_pos, rel_vel, mu):
+    """Time until the next apoapsis of (N, 3) relative states, inf for unbound orbits"""
+    distance = np.linalg.norm(rel_pos, axis=1)
+    inverse_a = 2 / distance - np.einsum('ij,ij->i', rel_vel, rel_vel) / mu
+    bound = inverse_a > 0
+    semi_major = 1 / np.where(bound, inverse_a, 1.0)
+    # Eccentric anomaly from e cos E and e sin E, then the mean anomaly left to pi
+    e_cos = 1 - distance / semi_major
+    e_sin = _radial_speed(rel_pos, rel_vel) / np.sqrt(mu * semi_major)
+    mean_anomaly = np.arctan2(e_sin, e_cos) - e_sin
+    return np.where(bound, (np.pi - mean_anomaly) * np.sqrt(semi_major ** 3 / mu), np.inf)
+
+
+def approach_geometry(rel_pos, rel_vel, mu):
+    """Geometry of a single encounter from its relative state
+
+    Returns the distance, relative speed, hyperbolic excess speed, impact
+    parameter (None for bound orbits) and the angle of the relative velocity
+    below the local horizontal in degrees.
+    """
+    rel_pos = np.asarray(rel_pos, dtype=float)
+    rel_vel = np.asarray(rel_vel, dtype=float)
+    distance = float(np.linalg.norm(rel_pos))
+    speed = float(np.linalg.norm(rel_vel))
+    excess_speed_sq = speed ** 2 - 2 * mu / distance if distance > 0 else 0.0
+    excess_speed = float(np.sqrt(excess_speed_sq)) if excess_speed_sq > 0 else 0.0
+    angular_momentum = float(np.linalg.norm(np.cross(rel_pos, rel_vel)))
+    sin_angle = -float(np.dot(rel_pos, rel_vel)) / (distance * speed) if distance * speed > 0 else 0.0
+
+    return {
+        'distance': distance,
+        'relative_speed': speed,
+        'excess_speed': excess_speed,
+        'impact_parameter': angular_momentum / excess_speed if excess_speed > 0 else None,
+        'entry_angle': float(np.degrees(np.arcsin(np.clip(sin_angle, -1.0, 1.0))))
+    }
+
+
+def hermite_interpolate(pos0, vel0, pos1, vel1, time_step, t):
+    """Cubic Hermite position and velocity at offset t inside a step"""
+    s = t / time_step
+    h00 = 2 * s ** 3 - 3 * s ** 2 + 1
+    h10 = s ** 3 - 2 * s ** 2 + s
+    h01 = -2 * s ** 3 + 3 * s ** 2
+    h11 = s ** 3 - s ** 2
+    pos = h00 * pos0 + h10 * time_step * vel0 + h01 * pos1 + h11 * time_step * vel1
+
+    d00 = (6 * s ** 2 - 6 * s) / time_step
+    d10 = 3 * s ** 2 - 4 * s + 1
+    d01 = (-6 * s ** 2 + 6 * s) / time_step
+    d11 = 3 * s ** 2 - 2 * s
+    vel = d00 * pos0 + d10 * vel0 + d01 * pos1 + d11 * vel1
+    return pos, vel
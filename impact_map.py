@@ -0,0 +1,315 @@
+"""Folium impact maps, generated off the simulation thread.
+
+create_impact_map builds the map and writes the HTML file. Rendering
+takes long enough to stall an animation, so the scene hands it to an
+ImpactMapWorker instead, which returns a concurrent.futures.Future and
+lets the simulation keep running. Ensembles can queue many maps at once
+on a process pool.
+
+create_impact_heatmap aggregates any number of impacts into one map: the
+points are binned on a latitude/longitude grid that is coarsened until
+at most max_cells cells are occupied, so the HTML stays bounded.
+
+MapCache keeps generated maps on disk under a hash of their quantized
+parameters, so a repeated impact returns the existing file at once. The
+least recently used maps are deleted when the cache outgrows max_bytes.
+
+folium and webbrowser are imported on first use, so importing this module
+costs nothing for processes that never draw a map.
+"""
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+MAP_FILE = "asteroid_impact_map.html"
+HEATMAP_FILE = "asteroid_impact_heatmap.html"
+
+
+def open_in_browser(path):
+    """Show an HTML file in the default browser"""
+    import webbrowser
+
+    webbrowser.open(f'file://{os.path.abspath(path)}')
+
+
+def create_impact_map(lat, lon, mass, velocity, angle_deg, output_file=MAP_FILE, open_browser=True):
+    """Create 2D impact map for asteroid and return the HTML file name"""
+    import folium
+
+    print(f"Creating impact map for coordinates: {lat}, {lon}")
+    
+    # Calculate energy
+    total_energy = 0.5 * mass * velocity**2
+    angle_radians = math.radians(angle_deg)
+    effective_energy = total_energy * math.sin(angle_radians)
+    
+    # Classify asteroid
+    if effective_energy < 1e15:
+        category = "Small"
+        consequences = "Local damage, minor atmospheric effects."
+        scale_factor = 3
+    elif effective_energy < 1e18:
+        category = "Medium"
+        consequences = "Significant destruction, strong shockwave."
+        scale_factor = 8
+    else:
+        category = "Large"
+        consequences = "Global consequences, significant climate impact."
+        scale_factor = 20
+    
+    # Calculate impact radius
+    base_radius = (effective_energy ** (1/3.85)) * scale_factor / 1000  # km
+    if base_radius > 20000:
+        base_radius = 20000  # Limit to Earth's size
+    
+    print(f"Asteroid category: {category}")
+    print(f"Effective energy: {effective_energy:.2e} J")
+    print(f"Impact radius: {base_radius:.1f} km")
+    
+    # Risk zones
+    zones = [
+        (base_radius * 0.3, 'red', 'High-risk zone'),
+        (base_radius * 0.6, 'orange', 'Medium-risk zone'),
+        (base_radius, 'yellow', 'Low-risk zone')
+    ]
+    
+    # Create map
+    zoom = 6 if base_radius < 200 else 4 if base_radius < 800 else 3
+
+    bounds = [
+        [lat - 90, lon - 180],
+        [lat + 90, lon + 180]
+    ]
+
+    m = folium.Map(
+        location=[lat, lon],
+        zoom_start=zoom,
+        min_zoom=2,
+        max_zoom=8,
+        max_bounds=True
+    )
+    m.fit_bounds(bounds)
+    
+    # Impact point marker
+    folium.Marker(
+        location=[lat, lon],
+        popup=(f"Asteroid impact\n"
+               f"Mass: {mass:.2e} kg\n"
+               f"Velocity: {velocity:.2e} m/s\n"
+               f"Angle: {angle_deg}°\n"
+               f"Energy: {effective_energy:.2e} J\n"
+               f"Category: {category}\n"
+               f"Consequences: {consequences}"),
+        icon=folium.Icon(color="red", icon="star")
+    ).add_to(m)
+    
+    # Colored risk zones
+    for radius_km, color, label in zones:
+        folium.Circle(
+            location=[lat, lon],
+            radius=radius_km * 1000,
+            color=color,
+            fill=True,
+            fill_opacity=0.3,
+            popup=f"{label} ({radius_km:.1f} km)"
+        ).add_to(m)
+    
+    # Save and open map
+    m.save(output_file)
+    print(f"Map saved as '{output_file}'")
+    
+    # Automatically open in browser
+    if not open_browser:
+        return output_file
+    try:
+        open_in_browser(output_file)
+        print("Map opened in browser!")
+    except Exception as e:
+        print(f"Failed to open browser: {e}")
+    
+    return output_file
+
+
+def bin_impacts(lat, lon, weight=None, radius_km=None, cell_degrees=1.0):
+    """Aggregate impacts into occupied latitude/longitude cells
+
+    Returns a dict of per-cell arrays: centre lat and lon, summed weight
+    (impact count when weight is None), impact count and the largest risk
+    radius in km.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = (np.asarray(lon, dtype=float) + 180.0) % 360.0 - 180.0
+    weight = np.ones(len(lat)) if weight is None else np.asarray(weight, dtype=float)
+    radius_km = np.zeros(len(lat)) if radius_km is None else np.asarray(radius_km, dtype=float)
+
+    lat_cells = int(math.ceil(180.0 / cell_degrees))
+    lon_cells = int(math.ceil(360.0 / cell_degrees))
+    lat_index = np.clip(((lat + 90.0) / cell_degrees).astype(int), 0, lat_cells - 1)
+    lon_index = np.clip(((lon + 180.0) / cell_degrees).astype(int), 0, lon_cells - 1)
+    cells, inverse = np.unique(lat_index * lon_cells + lon_index, return_inverse=True)
+
+    max_radius = np.zeros(len(cells))
+    np.maximum.at(max_radius, inverse, radius_km)
+    return {
+        'lat': np.minimum((cells // lon_cells + 0.5) * cell_degrees - 90.0, 90.0),
+        'lon': np.minimum((cells % lon_cells + 0.5) * cell_degrees - 180.0, 180.0),
+        'weight': np.bincount(inverse, weights=weight, minlength=len(cells)),
+        'count': np.bincount(inverse, minlength=len(cells)),
+        'radius_km': max_radius
+    }
+
+
+def create_impact_heatmap(lat, lon, weight=None, radius_km=None, cell_degrees=0.5, max_cells=5000,
+                          max_circles=100, output_file=HEATMAP_FILE, open_browser=False):
+    """Render many impacts as one binned heatmap layer and return the HTML file name
+
+    weight (for example impact energy) scales each impact's heat; the cells
+    with the largest weight also get a circle of their largest risk
+    radius_km, up to max_circles of them.
+    """
+    import folium
+    from folium.plugins import HeatMap
+
+    while True:
+        cells = bin_impacts(lat, lon, weight, radius_km, cell_degrees)
+        if len(cells['lat']) <= max_cells:
+            break
+        cell_degrees *= 2
+    print(f"Aggregated {len(lat)} impacts into {len(cells['lat'])} cells of {cell_degrees:g}°")
+
+    m = folium.Map(location=[0, 0], zoom_start=2, min_zoom=2, max_zoom=8, max_bounds=True)
+    peak = cells['weight'].max() if len(cells['weight']) else 1.0
+    HeatMap(
+        np.column_stack([cells['lat'], cells['lon'], cells['weight'] / peak]).tolist(),
+        radius=12,
+        blur=8
+    ).add_to(m)
+
+    # Risk circles for the heaviest cells
+    for i in np.argsort(cells['weight'])[::-1][:max_circles]:
+        if cells['radius_km'][i] <= 0:
+            continue
+        folium.Circle(
+            location=[float(cells['lat'][i]), float(cells['lon'][i])],
+            radius=float(cells['radius_km'][i]) * 1000,
+            color='red',
+            fill=True,
+            fill_opacity=0.15,
+            popup=f"{int(cells['count'][i])} impacts, risk radius {cells['radius_km'][i]:.1f} km"
+        ).add_to(m)
+
+    m.save(output_file)
+    print(f"Heatmap saved as '{output_file}'")
+    if open_browser:
+        open_in_browser(output_file)
+    return output_file
+
+
+class MapCache:
+    """Size-bounded, content-addressed disk cache of impact maps
+
+    Latitude and longitude are rounded to `places` decimal places (1e-4
+    degrees is about 11 m) and mass, velocity and angle to `digits`
+    significant figures; the map is drawn from the rounded values, so a
+    hit returns exactly the map a miss would have produced. Recency is
+    the file modification time, refreshed on every hit.
+    """
+    def __init__(self, directory="impact_map_cache", max_bytes=50 * 2**20, places=4, digits=4):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.places = places
+        self.digits = digits
+        os.makedirs(directory, exist_ok=True)
+
+    def quantize(self, lat, lon, mass, velocity, angle_deg):
+        return (
+            round(float(lat), self.places),
+            round(float(lon), self.places),
+            *(float(f"{float(value):.{self.digits}g}") for value in (mass, velocity, angle_deg))
+        )
+
+    def path(self, lat, lon, mass, velocity, angle_deg):
+        """Cache file for an impact, whether or not it exists yet"""
+        key = repr(self.quantize(lat, lon, mass, velocity, angle_deg)).encode()
+        return os.path.join(self.directory, hashlib.sha256(key).hexdigest()[:32] + ".html")
+
+    def impact_map(self, lat, lon, mass, velocity, angle_deg, open_browser=True):
+        """Return the cached map for an impact, creating it on a miss"""
+        path = self.path(lat, lon, mass, velocity, angle_deg)
+        if os.path.exists(path):
+            os.utime(path)
+            print(f"Impact map found in cache: '{path}'")
+            if open_browser:
+                open_in_browser(path)
+            return path
+
+        # Write under a unique name and rename, so concurrent workers never see half a file
+        temporary_path = f"{path[:-len('.html')]}.{os.getpid()}.{id(self)}.tmp.html"
+        create_impact_map(*self.quantize(lat, lon, mass, velocity, angle_deg), temporary_path, open_browser=False)
+        os.replace(temporary_path, path)
+        self.evict(keep=path)
+        if open_browser:
+            open_in_browser(path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used maps until the cache fits in max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".html") and not entry.name.endswith(".tmp.html"):
+                info = entry.stat()
+                entries.append((info.st_mtime, info.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class ImpactMapWorker:
+    """Background queue of impact maps
+
+    Maps run on a thread pool by default, which is enough to keep the scene
+    responsive; processes=True renders many maps in parallel on all cores.
+    With a MapCache, maps without an explicit output_file come from the
+    cache.
+    """
+    def __init__(self, max_workers=None, processes=False, cache=None):
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor(max_workers=max_workers or (None if processes else 1))
+        self.cache = cache
+
+    def submit(self, lat, lon, mass, velocity, angle_deg, output_file=None, open_browser=True):
+        """Queue a map; the future's result is the HTML file name"""
+        if output_file is None and self.cache is not None:
+            return self.executor.submit(self.cache.impact_map, lat, lon, mass, velocity, angle_deg, open_browser)
+        return self.executor.submit(create_impact_map, lat, lon, mass, velocity, angle_deg,
+                                    output_file or MAP_FILE, open_browser)
+
+    def map_many(self, impacts, output_pattern="impact_map_{index}.html"):
+        """Queue one map per (lat, lon, mass, velocity, angle_deg) tuple without opening them
+
+        With a cache the maps are the cache files and output_pattern is
+        ignored.
+        """
+        return [
+            self.submit(*impact, output_file=None if self.cache is not None else output_pattern.format(index=index),
+                        open_browser=False)
+            for index, impact in enumerate(impacts)
+        ]
+
+    def submit_heatmap(self, lat, lon, weight=None, radius_km=None, **options):
+        """Queue an aggregated heatmap (see create_impact_heatmap)"""
+        return self.executor.submit(create_impact_heatmap, lat, lon, weight, radius_km, **options)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
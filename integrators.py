@@ -0,0 +1,260 @@
+"""Pluggable integrators for physics.SystemState.
+
+Every integrator exposes step(state, time_step), which advances the state
+and returns the step size actually taken, and next_step, the step size it
+suggests for the following call (None for fixed-step integrators).
+"""
+import numpy as np
+
+import physics
+from kepler import kepler_drift
+from physics import G
+
+
+class Integrator:
+    """Base class for all integrators"""
+    name = None
+    adaptive = False
+
+    def __init__(self):
+        self.next_step = None
+
+    def step(self, state, time_step):
+        """Advance state by at most time_step and return the step taken"""
+        raise NotImplementedError
+
+
+def _derivatives(state, pos, vel, fixed, time):
+    """Time derivatives of stacked body and particle states at time (fixed bodies stay put)"""
+    acceleration = physics.stacked_accelerations(state, physics.ephemeris_positions(state, pos, time))
+    dpos = vel.copy()
+    dpos[fixed] = 0
+    acceleration[fixed] = 0
+    return dpos, acceleration
+
+
+def _error_norm(error_pos, error_vel, pos, vel, new_pos, new_vel, rtol, atol_pos, atol_vel):
+    """Largest local error of any body or particle scaled by its tolerance
+
+    The maximum rather than an RMS, so one body in a close encounter
+    shrinks the step however many quiet bodies and particles surround it.
+    """
+    scale_pos = atol_pos + rtol * np.maximum(np.linalg.norm(pos, axis=1), np.linalg.norm(new_pos, axis=1))
+    scale_vel = atol_vel + rtol * np.maximum(np.linalg.norm(vel, axis=1), np.linalg.norm(new_vel, axis=1))
+    ratio = np.concatenate([
+        np.linalg.norm(error_pos, axis=1) / scale_pos,
+        np.linalg.norm(error_vel, axis=1) / scale_vel
+    ])
+    return float(ratio.max()) if len(ratio) else 0.0
+
+
+class SemiImplicitEuler(Integrator):
+    """Fixed-step semi-implicit Euler (the original scheme)"""
+    name = 'euler'
+
+    def step(self, state, time_step):
+        physics.step(state, time_step)
+        return time_step
+
+
+class DormandPrince45(Integrator):
+    """Adaptive embedded Runge-Kutta 5(4) with Dormand-Prince coefficients"""
+    name = 'rk45'
+    adaptive = True
+
+    C = [0, 1/5, 3/10, 4/5, 8/9, 1, 1]
+    A = [
+        [],
+        [1/5],
+        [3/40, 9/40],
+        [44/45, -56/15, 32/9],
+        [19372/6561, -25360/2187, 64448/6561, -212/729],
+        [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+        [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84]
+    ]
+    B5 = [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]
+    B4 = [5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40]
+
+    def __init__(self, rtol=1e-10, atol_pos=1.0, atol_vel=1e-6, min_step=1.0):
+        super().__init__()
+        self.rtol = rtol
+        self.atol_pos = atol_pos
+        self.atol_vel = atol_vel
+        self.min_step = min_step
+
+    def step(self, state, time_step):
+        h = time_step
+        pos0, vel0, fixed = state.stacked()
+
+        while True:
+            k_pos = []
+            k_vel = []
+            for stage in range(7):
+                pos = pos0.copy()
+                vel = vel0.copy()
+                for coefficient, dpos, dvel in zip(self.A[stage], k_pos, k_vel):
+                    if coefficient:
+                        pos += h * coefficient * dpos
+                        vel += h * coefficient * dvel
+                dpos, dvel = _derivatives(state, pos, vel, fixed, state.time + self.C[stage] * h)
+                k_pos.append(dpos)
+                k_vel.append(dvel)
+
+            # Stage 7 is evaluated at the 5th order solution
+            new_pos, new_vel = pos, vel
+            error_pos = h * sum((b5 - b4) * k for b5, b4, k in zip(self.B5, self.B4, k_pos))
+            error_vel = h * sum((b5 - b4) * k for b5, b4, k in zip(self.B5, self.B4, k_vel))
+            error = _error_norm(error_pos, error_vel, pos0, vel0, new_pos, new_vel,
+                                self.rtol, self.atol_pos, self.atol_vel)
+
+            factor = 5.0 if error == 0 else min(5.0, max(0.2, 0.9 * error ** -0.2))
+            if error <= 1.0 or h <= self.min_step:
+                state.set_stacked(new_pos, new_vel)
+                state.advance_time(h)
+                self.next_step = h * factor
+                return h
+
+            h = max(h * factor, self.min_step)
+
+
+class BulirschStoer(Integrator):
+    """Adaptive Gragg-Bulirsch-Stoer extrapolation integrator
+
+    High-order scheme for close encounters: modified midpoint steps with
+    2, 4, 6, ... substeps are extrapolated to zero step size until the
+    estimated error meets the tolerance, and the step is shrunk otherwise.
+    """
+    name = 'bs'
+    adaptive = True
+
+    def __init__(self, rtol=1e-12, atol_pos=1e-3, atol_vel=1e-9, max_levels=8, min_step=1.0):
+        super().__init__()
+        self.rtol = rtol
+        self.atol_pos = atol_pos
+        self.atol_vel = atol_vel
+        self.max_levels = max_levels
+        self.min_step = min_step
+        self.substeps = [2 * (level + 1) for level in range(max_levels)]
+
+    def _modified_midpoint(self, state, pos0, vel0, fixed, h, n):
+        """Gragg's modified midpoint rule with n substeps"""
+        sub = h / n
+        dpos, dvel = _derivatives(state, pos0, vel0, fixed, state.time)
+        prev_pos, prev_vel = pos0, vel0
+        pos = pos0 + sub * dpos
+        vel = vel0 + sub * dvel
+        for i in range(1, n):
+            dpos, dvel = _derivatives(state, pos, vel, fixed, state.time + i * sub)
+            prev_pos, pos = pos, prev_pos + 2 * sub * dpos
+            prev_vel, vel = vel, prev_vel + 2 * sub * dvel
+        dpos, dvel = _derivatives(state, pos, vel, fixed, state.time + h)
+        return 0.5 * (pos + prev_pos + sub * dpos), 0.5 * (vel + prev_vel + sub * dvel)
+
+    def step(self, state, time_step):
+        h = time_step
+        pos0, vel0, fixed = state.stacked()
+
+        while True:
+            table = []
+            for level, n in enumerate(self.substeps):
+                row = [self._modified_midpoint(state, pos0, vel0, fixed, h, n)]
+                for j in range(1, level + 1):
+                    ratio = (n / self.substeps[level - j]) ** 2 - 1
+                    upper_pos, upper_vel = row[j - 1]
+                    lower_pos, lower_vel = table[level - 1][j - 1]
+                    row.append((
+                        upper_pos + (upper_pos - lower_pos) / ratio,
+                        upper_vel + (upper_vel - lower_vel) / ratio
+                    ))
+                table.append(row)
+
+                if level < 2:
+                    continue
+
+                new_pos, new_vel = row[level]
+                error = _error_norm(new_pos - row[level - 1][0], new_vel - row[level - 1][1],
+                                    pos0, vel0, new_pos, new_vel, self.rtol, self.atol_pos, self.atol_vel)
+                if error <= 1.0:
+                    state.set_stacked(new_pos, new_vel)
+                    state.advance_time(h)
+
+                    # Grow the step when convergence came early, shrink it when late
+                    if level < self.max_levels // 2:
+                        self.next_step = h * 2.0
+                    elif level == self.max_levels - 1:
+                        self.next_step = h * 0.6
+                    else:
+                        self.next_step = h
+                    return h
+
+            if h <= self.min_step:
+                state.set_stacked(new_pos, new_vel)
+                state.advance_time(h)
+                self.next_step = h
+                return h
+            h = max(h * 0.5, self.min_step)
+
+
+class WisdomHolman(Integrator):
+    """Symplectic Wisdom-Holman map for long heliocentric arcs
+
+    The motion of bodies and test particles is split into Kepler orbits
+    around the first fixed body (the Sun) and kicks from all other bodies,
+    combined drift-kick-drift. It is
+    fixed-step and should not be used through close encounters.
+    """
+    name = 'wh'
+
+    def step(self, state, time_step):
+        fixed_indices = np.flatnonzero(state.fixed)
+        if len(fixed_indices) == 0:
+            raise ValueError("Wisdom-Holman needs a fixed central body")
+        central = fixed_indices[0]
+        mu = G * state.mass[central]
+        center = state.pos[central].copy()
+        pos, vel, fixed = state.stacked()
+        moving = ~fixed
+
+        # Interaction masses exclude the central body
+        interaction_mass = state.mass.copy()
+        interaction_mass[central] = 0
+
+        def drift(dt):
+            pos[moving], vel[moving] = kepler_drift(pos[moving] - center, vel[moving], mu, dt)
+            pos[moving] += center
+
+        drift(time_step / 2)
+        kick_pos = physics.ephemeris_positions(state, pos, state.time + time_step / 2)
+        acceleration = physics.stacked_accelerations(state, kick_pos, mass=interaction_mass)
+        vel[moving] += acceleration[moving] * time_step
+        drift(time_step / 2)
+        state.set_stacked(pos, vel)
+
+        state.advance_time(time_step)
+        return time_step
+
+
+INTEGRATORS = {
+    SemiImplicitEuler.name: SemiImplicitEuler,
+    DormandPrince45.name: DormandPrince45,
+    WisdomHolman.name: WisdomHolman,
+    BulirschStoer.name: BulirschStoer
+}
+
+
+def create_integrator(name, **options):
+    """Create an integrator by name ('euler', 'rk45', 'wh' or 'bs')"""
+    if name not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator '{name}', expected one of {', '.join(INTEGRATORS)}")
+    return INTEGRATORS[name](**options)
+
+
+def advance(integrator, state, duration):
+    """Advance state by exactly duration, taking as many steps as needed"""
+    end_time = state.time + duration
+    while state.time < end_time:
+        remaining = end_time - state.time
+        if remaining <= 1e-9 * duration:
+            break
+        time_step = min(integrator.next_step or duration, remaining)
+        integrator.step(state, time_step)
@@ -0,0 +1,79 @@
+"""Two-body (Kepler) propagation in universal variables."""
+import numpy as np
+
+
+def _stumpff(z):
+    """Stumpff functions C(z) and S(z) for arrays of z"""
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+    positive = z > 1e-8
+    negative = z < -1e-8
+    small = ~(positive | negative)
+
+    sqrt_z = np.sqrt(z[positive])
+    c[positive] = (1 - np.cos(sqrt_z)) / z[positive]
+    s[positive] = (sqrt_z - np.sin(sqrt_z)) / sqrt_z ** 3
+
+    sqrt_z = np.sqrt(-z[negative])
+    c[negative] = (np.cosh(sqrt_z) - 1) / -z[negative]
+    s[negative] = (np.sinh(sqrt_z) - sqrt_z) / sqrt_z ** 3
+
+    c[small] = 1/2 - z[small] / 24
+    s[small] = 1/6 - z[small] / 120
+    return c, s
+
+
+def kepler_drift(pos, vel, mu, time_step, tolerance=1e-12, max_iterations=50):
+    """Advance (N, 3) states relative to a central mass along Kepler orbits
+
+    Uses universal variables so elliptic and hyperbolic orbits are handled
+    the same way. mu and time_step may be scalars or (N,) arrays. Returns
+    new (pos, vel) arrays.
+    """
+    r0 = np.linalg.norm(pos, axis=1)
+    r_dot_v = np.einsum('ij,ij->i', pos, vel)
+    alpha = 2 / r0 - np.einsum('ij,ij->i', vel, vel) / mu
+    sqrt_mu = np.sqrt(mu)
+    time_step = np.broadcast_to(np.asarray(time_step, dtype=float), r0.shape)
+    a_coef = r_dot_v / sqrt_mu
+    b_coef = 1 - alpha * r0
+
+    # Starting guess: elliptic for bound orbits, logarithmic for hyperbolic ones
+    chi = sqrt_mu * np.abs(alpha) * time_step
+    hyperbolic = alpha < 0
+    if hyperbolic.any():
+        semi_major = 1 / alpha[hyperbolic]
+        dt = time_step[hyperbolic]
+        mu_h = np.broadcast_to(mu, r0.shape)[hyperbolic]
+        direction = np.sign(dt)
+        numerator = -2 * mu_h * alpha[hyperbolic] * dt
+        denominator = r_dot_v[hyperbolic] + direction * np.sqrt(-mu_h * semi_major) * (1 - r0[hyperbolic] * alpha[hyperbolic])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            guess = direction * np.sqrt(-semi_major) * np.log(numerator / denominator)
+        straight_line = np.broadcast_to(sqrt_mu, r0.shape)[hyperbolic] * dt / r0[hyperbolic]
+        chi[hyperbolic] = np.where(np.isfinite(guess) & (numerator != 0), guess, straight_line)
+
+    # Laguerre-Conway iteration on the universal anomaly
+    order = 5
+    for _ in range(max_iterations):
+        z = alpha * chi ** 2
+        c, s = _stumpff(z)
+        f = a_coef * chi ** 2 * c + b_coef * chi ** 3 * s + r0 * chi - sqrt_mu * time_step
+        df = a_coef * chi * (1 - z * s) + b_coef * chi ** 2 * c + r0
+        ddf = a_coef * (1 - z * c) + b_coef * chi * (1 - z * s)
+        root = np.sqrt(np.abs((order - 1) ** 2 * df ** 2 - order * (order - 1) * f * ddf))
+        delta = order * f / (df + np.where(df >= 0, root, -root))
+        chi = chi - delta
+        if np.all(np.abs(delta) <= tolerance * np.maximum(np.abs(chi), 1.0)):
+            break
+
+    z = alpha * chi ** 2
+    c, s = _stumpff(z)
+    f = 1 - chi ** 2 / r0 * c
+    g = time_step - chi ** 3 / sqrt_mu * s
+    new_pos = f[:, np.newaxis] * pos + g[:, np.newaxis] * vel
+    r = np.linalg.norm(new_pos, axis=1)
+    fdot = sqrt_mu / (r * r0) * (alpha * chi ** 3 * s - chi)
+    gdot = 1 - chi ** 2 / r * c
+    new_vel = fdot[:, np.newaxis] * pos + gdot[:, np.newaxis] * vel
+    return new_pos, new_vel
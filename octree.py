@@ -0,0 +1,328 @@
+"""Barnes-Hut octree gravity solver.
+
+Bodies are sorted along a Morton (Z-order) curve so every octree node owns a
+contiguous range of the sorted arrays. The tree is built level by level and
+walked for all targets at once as a frontier of (target, node) pairs: a
+node far enough away (size / distance < theta) acts as a point mass at its
+centre of mass, otherwise it is opened into its children, or summed
+directly when it is a leaf. The cost is O(N log N) instead of O(N^2).
+
+The tree topology is kept between calls and only the node masses and
+centres of mass are refreshed, until bodies have moved a sizeable fraction
+of a leaf; this lets the substeps of one integrator step share one build.
+"""
+import numpy as np
+
+from physics import G
+
+MAX_DEPTH = 21  # Bits per axis in the 63-bit Morton code
+
+
+def _spread_bits(x):
+    """Insert two zero bits between each of the low 21 bits of x"""
+    x = x.astype(np.uint64) & np.uint64(0x1fffff)
+    x = (x | x << np.uint64(32)) & np.uint64(0x1f00000000ffff)
+    x = (x | x << np.uint64(16)) & np.uint64(0x1f0000ff0000ff)
+    x = (x | x << np.uint64(8)) & np.uint64(0x100f00f00f00f00f)
+    x = (x | x << np.uint64(4)) & np.uint64(0x10c30c30c30c30c3)
+    x = (x | x << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_codes(cells):
+    """63-bit Morton codes of (N, 3) integer cell coordinates"""
+    return (_spread_bits(cells[:, 0])
+            | _spread_bits(cells[:, 1]) << np.uint64(1)
+            | _spread_bits(cells[:, 2]) << np.uint64(2))
+
+
+def _expand_ranges(starts, counts):
+    """Concatenate arange(start, start + count) for every range"""
+    total = int(counts.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+def _range_sums(values, starts, ends):
+    """Sums of values[start:end] for sorted, non-overlapping ranges"""
+    padded = np.concatenate([values, np.zeros((1,) + values.shape[1:])])
+    bounds = np.column_stack([starts, ends]).ravel()
+    return np.add.reduceat(padded, bounds, axis=0)[::2]
+
+
+class BarnesHutSolver:
+    """Octree force solver usable as SystemState.force_solver
+
+    theta is the opening angle, leaf_size the largest number of bodies kept
+    in a leaf and group_size the largest subtree whose bodies share one
+    walk of the tree. The tree is rebuilt when any body has moved more than
+    rebuild_fraction of the median leaf size since the last build.
+    """
+    def __init__(self, theta=0.5, leaf_size=8, group_size=16, rebuild_fraction=0.25, chunk_size=8192):
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.group_size = group_size
+        self.rebuild_fraction = rebuild_fraction
+        self.chunk_size = chunk_size
+        self.build_pos = None
+        self.builds = 0
+
+    def build(self, pos):
+        """Build the tree topology for the given (N, 3) positions"""
+        n = len(pos)
+        low = pos.min(axis=0)
+        high = pos.max(axis=0)
+        root_size = max(float((high - low).max()), 1.0) * (1 + 1e-9)
+        root_min = (low + high) / 2 - root_size / 2
+
+        cells = np.floor((pos - root_min) / root_size * 2 ** MAX_DEPTH).astype(np.int64)
+        cells = np.clip(cells, 0, 2 ** MAX_DEPTH - 1)
+        codes = morton_codes(cells)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        cells = cells[order]
+
+        level_starts = []
+        level_ends = []
+        level_leaf = []
+        level_centers = []
+        level_sizes = []
+        level_children = []
+
+        starts = np.array([0])
+        ends = np.array([n])
+        level = 0
+        while True:
+            counts = ends - starts
+            leaf = (counts <= self.leaf_size) | (level == MAX_DEPTH)
+            size = root_size / 2 ** level
+            cube = cells[starts] >> (MAX_DEPTH - level)
+
+            level_starts.append(starts)
+            level_ends.append(ends)
+            level_leaf.append(leaf)
+            level_centers.append(root_min + (cube + 0.5) * size)
+            level_sizes.append(np.full(len(starts), size))
+
+            if leaf.all():
+                level_children.append((np.zeros(len(starts), dtype=np.int64), np.zeros(len(starts), dtype=np.int64)))
+                break
+
+            # Split the bodies of internal nodes by their next-level prefix
+            parents = ~leaf
+            members = _expand_ranges(starts[parents], counts[parents])
+            shift = np.uint64(3 * (MAX_DEPTH - level - 1))
+            prefix = codes[members] >> shift
+            first = np.flatnonzero(np.concatenate([[True], prefix[1:] != prefix[:-1]]))
+            child_starts = members[first]
+            child_ends = members[np.concatenate([first[1:], [len(members)]]) - 1] + 1
+
+            # Children of consecutive parents are consecutive
+            child_parent_prefix = prefix[first] >> np.uint64(3)
+            parent_prefix = codes[starts[parents]] >> (shift + np.uint64(3))
+            child_first = np.zeros(len(starts), dtype=np.int64)
+            child_count = np.zeros(len(starts), dtype=np.int64)
+            child_first[parents] = np.searchsorted(child_parent_prefix, parent_prefix, side='left')
+            child_count[parents] = np.searchsorted(child_parent_prefix, parent_prefix, side='right') - child_first[parents]
+            level_children.append((child_first, child_count))
+
+            starts = child_starts
+            ends = child_ends
+            level += 1
+
+        # Flatten all levels into global node arrays
+        offsets = np.cumsum([0] + [len(s) for s in level_starts])
+        self.level_offsets = offsets
+        self.order = order
+        self.node_start = np.concatenate(level_starts)
+        self.node_end = np.concatenate(level_ends)
+        self.node_leaf = np.concatenate(level_leaf)
+        self.node_center = np.concatenate(level_centers)
+        self.node_size = np.concatenate(level_sizes)
+        self.node_child_first = np.concatenate([first + offsets[i + 1] for i, (first, _) in enumerate(level_children)])
+        self.node_child_count = np.concatenate([count for _, count in level_children])
+
+        # Target groups: the largest nodes holding at most group_size bodies
+        counts = self.node_end - self.node_start
+        small = (counts <= self.group_size) | self.node_leaf
+        big = np.flatnonzero(~small)
+        children = _expand_ranges(self.node_child_first[big], self.node_child_count[big])
+        groups = children[small[children]] if len(big) else np.array([0])
+        self.target_groups = groups[np.argsort(self.node_start[groups])]
+
+        leaf_sizes = self.node_size[self.node_leaf]
+        self.rebuild_distance = self.rebuild_fraction * float(np.median(leaf_sizes))
+        self.build_pos = pos.copy()
+        self.builds += 1
+
+    def _needs_rebuild(self, pos):
+        """Whether the stored topology no longer fits the positions"""
+        if self.build_pos is None or len(self.build_pos) != len(pos):
+            return True
+        displacement = np.sqrt(np.max(np.einsum('ij,ij->i', pos - self.build_pos, pos - self.build_pos)))
+        return displacement > self.rebuild_distance
+
+    def refit(self, pos, mass):
+        """Refresh node masses and centres of mass for the current state"""
+        sorted_pos = pos[self.order]
+        sorted_mass = mass[self.order]
+        weighted = sorted_pos * sorted_mass[:, np.newaxis]
+
+        node_mass = np.empty(len(self.node_start))
+        node_moment = np.empty((len(self.node_start), 3))
+        for level in range(len(self.level_offsets) - 1):
+            nodes = slice(self.level_offsets[level], self.level_offsets[level + 1])
+            node_mass[nodes] = _range_sums(sorted_mass, self.node_start[nodes], self.node_end[nodes])
+            node_moment[nodes] = _range_sums(weighted, self.node_start[nodes], self.node_end[nodes])
+
+        # Massless nodes keep their geometric centre (they exert nothing anyway)
+        has_mass = node_mass > 0
+        node_com = self.node_center.copy()
+        node_com[has_mass] = node_moment[has_mass] / node_mass[has_mass, np.newaxis]
+
+        self.sorted_pos = sorted_pos
+        self.sorted_mass = sorted_mass
+        self.node_mass = node_mass
+        self.node_com = node_com
+
+        # Packed per-node rows so the walk gathers each node only once
+        self.node_data = np.column_stack([node_com, self.node_center, self.node_size, node_mass])
+
+    def accelerations(self, pos, mass, softening=0.0):
+        """Accelerations of all bodies, same contract as physics.calculate_accelerations"""
+        if len(pos) == 0:
+            return np.zeros((0, 3))
+        if self._needs_rebuild(pos):
+            self.build(pos)
+        self.refit(pos, mass)
+
+        # Small subtrees act as target groups sharing one interaction list
+        sorted_acceleration = np.zeros((len(pos), 3))
+        groups = self.target_groups
+        groups_per_chunk = max(1, self.chunk_size // self.group_size)
+        for chunk_start in range(0, len(groups), groups_per_chunk):
+            self._walk_groups(sorted_acceleration, groups[chunk_start:chunk_start + groups_per_chunk], softening)
+
+        acceleration = np.empty_like(sorted_acceleration)
+        acceleration[self.order] = sorted_acceleration
+        return acceleration
+
+    def accelerations_at(self, target_pos, softening=0.0):
+        """Acceleration at arbitrary (P, 3) points from the current tree"""
+        result = np.zeros((len(target_pos), 3))
+        for chunk_start in range(0, len(target_pos), self.chunk_size):
+            chunk = target_pos[chunk_start:chunk_start + self.chunk_size]
+            result[chunk_start:chunk_start + len(chunk)] = self._walk(chunk, softening)
+        return result
+
+    def _accumulate(self, acceleration, targets, r_vec, r_sq, source_mass, softening):
+        """Add point-mass contributions to the per-target accelerations"""
+        r_sq = r_sq + softening ** 2
+        with np.errstate(divide='ignore'):
+            weight = np.where(r_sq > 0, G * source_mass * r_sq ** -1.5, 0.0)
+        for axis in range(3):
+            acceleration[:, axis] += np.bincount(targets, weights=r_vec[:, axis] * weight, minlength=len(acceleration))
+
+    def _walk_groups(self, acceleration, group_nodes, softening):
+        """Traverse the tree for a chunk of target groups of the tree's own bodies"""
+        starts = self.node_start[group_nodes]
+        counts = self.node_end[group_nodes] - starts
+        group_min = np.minimum.reduceat(self.sorted_pos[starts[0]:starts[-1] + counts[-1]], starts - starts[0], axis=0)
+        group_max = np.maximum.reduceat(self.sorted_pos[starts[0]:starts[-1] + counts[-1]], starts - starts[0], axis=0)
+        group_center = (group_min + group_max) / 2
+        group_half = (group_max - group_min) / 2
+        group_radius = np.linalg.norm(group_half, axis=1)
+        theta = self.theta
+
+        far_groups = []
+        far_nodes = []
+        near_groups = []
+        near_nodes = []
+        groups = np.arange(len(group_nodes))
+        nodes = np.zeros(len(group_nodes), dtype=np.int64)
+        while len(groups):
+            node = self.node_data[nodes]
+            center = group_center[groups]
+            distance = np.sqrt(np.einsum('ij,ij->i', node[:, 0:3] - center, node[:, 0:3] - center)) - group_radius[groups]
+            size = node[:, 6]
+            overlap = np.all(np.abs(center - node[:, 3:6]) <= size[:, np.newaxis] / 2 + group_half[groups], axis=1)
+            opened = overlap | (size > theta * distance)
+
+            far = ~opened
+            far_groups.append(groups[far])
+            far_nodes.append(nodes[far])
+
+            leaf = opened & self.node_leaf[nodes]
+            near_groups.append(groups[leaf])
+            near_nodes.append(nodes[leaf])
+
+            internal = opened & ~self.node_leaf[nodes]
+            child_counts = self.node_child_count[nodes[internal]]
+            next_groups = np.repeat(groups[internal], child_counts)
+            nodes = _expand_ranges(self.node_child_first[nodes[internal]], child_counts)
+            groups = next_groups
+
+        # Far nodes act as point masses on every body of the group
+        far_groups = np.concatenate(far_groups)
+        far_nodes = np.concatenate(far_nodes)
+        targets = _expand_ranges(starts[far_groups], counts[far_groups])
+        sources = np.repeat(far_nodes, counts[far_groups])
+        r_vec = self.node_data[sources, 0:3] - self.sorted_pos[targets]
+        r_sq = np.einsum('ij,ij->i', r_vec, r_vec)
+        self._accumulate(acceleration, targets, r_vec, r_sq, self.node_data[sources, 7], softening)
+
+        # Neighbouring leaves are summed body by body
+        near_groups = np.concatenate(near_groups)
+        near_nodes = np.concatenate(near_nodes)
+        targets = _expand_ranges(starts[near_groups], counts[near_groups])
+        leaf_nodes = np.repeat(near_nodes, counts[near_groups])
+        leaf_counts = self.node_end[leaf_nodes] - self.node_start[leaf_nodes]
+        bodies = _expand_ranges(self.node_start[leaf_nodes], leaf_counts)
+        targets = np.repeat(targets, leaf_counts)
+        r_vec = self.sorted_pos[bodies] - self.sorted_pos[targets]
+        r_sq = np.einsum('ij,ij->i', r_vec, r_vec)
+        distinct = bodies != targets
+        self._accumulate(acceleration, targets[distinct], r_vec[distinct], r_sq[distinct],
+                         self.sorted_mass[bodies[distinct]], softening)
+
+    def _walk(self, target_pos, softening):
+        """Traverse the tree for one chunk of targets"""
+        acceleration = np.zeros((len(target_pos), 3))
+        targets = np.arange(len(target_pos))
+        nodes = np.zeros(len(target_pos), dtype=np.int64)
+        theta_sq = self.theta ** 2
+
+        while len(targets):
+            node = self.node_data[nodes]
+            target = target_pos[targets]
+            r_vec = node[:, 0:3] - target
+            r_sq = np.einsum('ij,ij->i', r_vec, r_vec)
+            size = node[:, 6]
+            offset = np.abs(target - node[:, 3:6]).max(axis=1)
+            opened = (offset <= size / 2) | (size ** 2 > theta_sq * r_sq)
+
+            # Far nodes act as point masses
+            far = ~opened
+            self._accumulate(acceleration, targets[far], r_vec[far], r_sq[far], node[far, 7], softening)
+
+            # Opened leaves are summed body by body
+            leaves = opened & self.node_leaf[nodes]
+            if leaves.any():
+                leaf_nodes = nodes[leaves]
+                counts = self.node_end[leaf_nodes] - self.node_start[leaf_nodes]
+                leaf_targets = np.repeat(targets[leaves], counts)
+                bodies = _expand_ranges(self.node_start[leaf_nodes], counts)
+                body_vec = self.sorted_pos[bodies] - target_pos[leaf_targets]
+                body_sq = np.einsum('ij,ij->i', body_vec, body_vec)
+                distinct = body_sq > 0  # Skip the target itself
+                self._accumulate(acceleration, leaf_targets[distinct], body_vec[distinct], body_sq[distinct],
+                                 self.sorted_mass[bodies[distinct]], softening)
+
+            # Opened internal nodes are replaced by their children
+            internal = opened & ~self.node_leaf[nodes]
+            counts = self.node_child_count[nodes[internal]]
+            next_targets = np.repeat(targets[internal], counts)
+            nodes = _expand_ranges(self.node_child_first[nodes[internal]], counts)
+            targets = next_targets
+
+        return acceleration
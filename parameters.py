@@ -0,0 +1,91 @@
+"""Typed, validated parameters for the interactive scene.
+
+The scene's input fields write their text into a ParameterStore when the
+user edits them. The text is parsed and checked once, there, and the
+simulation loop only ever reads the cached numbers. Invalid input keeps
+the last good value and returns a message for the user.
+
+Parameter names follow the scenario keys of scenarios.py (x, vy, mass,
+lat, ...), so a scenario can be applied with ParameterStore.update.
+"""
+import math
+
+
+class ParameterError(ValueError):
+    """Raised for a value outside a parameter's allowed range"""
+
+
+class Parameter:
+    """A named float with an allowed range
+
+    minimum and maximum are inclusive unless exclusive_minimum is set;
+    number_format is the format spec used to display the value.
+    """
+    def __init__(self, name, default, label=None, minimum=None, maximum=None, exclusive_minimum=False,
+                 number_format='g'):
+        self.name = name
+        self.default = float(default)
+        self.label = label or name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.exclusive_minimum = exclusive_minimum
+        self.number_format = number_format
+
+    def format(self, value):
+        return format(value, self.number_format)
+
+    def validate(self, value):
+        """Return value as a float or raise ParameterError"""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ParameterError(f"{self.label}: '{value}' is not a number") from None
+        if not math.isfinite(value):
+            raise ParameterError(f"{self.label}: {value} is not a finite number")
+        if self.minimum is not None:
+            if value < self.minimum or (self.exclusive_minimum and value == self.minimum):
+                bound = "greater than" if self.exclusive_minimum else "at least"
+                raise ParameterError(f"{self.label}: must be {bound} {self.minimum:g}")
+        if self.maximum is not None and value > self.maximum:
+            raise ParameterError(f"{self.label}: must be at most {self.maximum:g}")
+        return value
+
+
+class ParameterStore:
+    """Current values of a set of parameters, updated only through validation
+
+    Listeners registered with subscribe(name, callback) are called with the
+    new value whenever that parameter changes.
+    """
+    def __init__(self, parameters):
+        self.parameters = {parameter.name: parameter for parameter in parameters}
+        self.values = {parameter.name: parameter.default for parameter in parameters}
+        self.listeners = {}
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def subscribe(self, name, callback):
+        self.listeners.setdefault(name, []).append(callback)
+
+    def set(self, name, value):
+        """Validate and store a value; raises ParameterError and keeps the old value if invalid"""
+        value = self.parameters[name].validate(value)
+        if value != self.values[name]:
+            self.values[name] = value
+            for callback in self.listeners.get(name, []):
+                callback(value)
+
+    def set_text(self, name, text):
+        """Store text typed by the user; returns an error message or None"""
+        try:
+            self.set(name, text)
+        except ParameterError as e:
+            return str(e)
+        return None
+
+    def update(self, values):
+        """Set every known parameter present in values, e.g. a scenario dict"""
+        for name, value in values.items():
+            if name in self.parameters:
+                self.set(name, value)
@@ -0,0 +1,464 @@
+"""Headless physics engine for the Sun-Earth-Moon-asteroid system.
+
+This module has no VPython or folium dependency, so trajectories can be
+propagated on machines without a display. The interactive scene in
+AsteroidTrajectory.py is a client of the state objects defined here.
+"""
+import copy
+import math
+
+import numpy as np
+
+import events
+
+# Constants
+G = 6.67430e-11  # Gravitational constant
+AU = 1.496e11    # Astronomical unit in meters
+DAY = 86400      # Seconds in a day
+EARTH_ROTATION_PERIOD = 86400  # Earth's rotation period in seconds (1 day)
+MOON_DISTANCE = 384400 * 1000  # Distance to Moon in meters
+EARTH_RADIUS = 6.371e6  # Earth's radius in meters
+APPROACH_DISTANCE = 0.05 * AU  # Closest approaches inside this distance are reported as events
+
+# Physical data for the massive bodies (distance in AU, velocity in km/s)
+BODY_DATA = {
+    'Sun': {'mass': 1.989e30, 'distance': 0, 'velocity': 0},
+    'Earth': {'mass': 5.972e24, 'distance': 1.0, 'velocity': 29.78},
+    'Moon': {'mass': 7.347e22, 'distance': 0.00257, 'velocity': 1.022, 'parent': 'Earth'}
+}
+
+# Default asteroid state (the "Impact" preset)
+DEFAULT_ASTEROID = {
+    'pos': [1.5 * AU, 0, 0],
+    'vel': [-15000, 20000, 0],
+    'mass': 5e16
+}
+
+
+class Body:
+    """View of one body stored inside a SystemState"""
+    def __init__(self, state, name):
+        self.state = state
+        self.name = name
+
+    @property
+    def index(self):
+        return self.state.index(self.name)
+
+    @property
+    def mass(self):
+        return self.state.mass[self.index]
+
+    @property
+    def pos(self):
+        return self.state.pos[self.index]
+
+    @property
+    def vel(self):
+        return self.state.vel[self.index]
+
+    @property
+    def fixed(self):
+        return bool(self.state.fixed[self.index])
+
+
+class SystemState:
+    """Complete physical state of the simulated system
+
+    Masses, positions and velocities are stored as contiguous NumPy arrays
+    (N,), (N, 3) and (N, 3) in SI units. Fixed bodies feel forces but never
+    move. softening (meters) is added in quadrature to every pair distance.
+    force_solver replaces the direct all-pairs sum when set, for example an
+    octree.BarnesHutSolver for large populations.
+
+    Test particles are kept in a separate (P, 3) block: they feel the
+    massive bodies but exert nothing, so they cost O(M * P) rather than a
+    share of the all-pairs sum. particle_ids identify them across removals.
+
+    When ephemeris (an ephemeris.Ephemeris) is set, bodies named in it are
+    looked up at the current time instead of being integrated; they still
+    pull on everything else.
+    """
+    def __init__(self, softening=0.0, force_solver=None, ephemeris=None):
+        self.names = []
+        self.mass = np.zeros(0)
+        self.pos = np.zeros((0, 3))
+        self.vel = np.zeros((0, 3))
+        self.fixed = np.zeros(0, dtype=bool)
+        self.particle_pos = np.zeros((0, 3))
+        self.particle_vel = np.zeros((0, 3))
+        self.particle_ids = np.zeros(0, dtype=np.int64)
+        self.next_particle_id = 0
+        self.softening = softening
+        self.force_solver = force_solver
+        self.ephemeris = ephemeris
+        self.time = 0.0
+
+    def add_body(self, name, mass, pos, vel, fixed=False):
+        """Add a body and return a view of it"""
+        self.add_bodies([name], [mass], [pos], [vel], [fixed])
+        return Body(self, name)
+
+    def add_bodies(self, names, mass, pos, vel, fixed=False):
+        """Add many bodies at once: (n,) masses, (n, 3) positions and velocities
+
+        The arrays are concatenated once, so loading n bodies costs O(n)
+        instead of the O(n^2) of n add_body calls. fixed is a scalar or (n,).
+        """
+        count = len(names)
+        self.names.extend(names)
+        self.mass = np.concatenate([self.mass, np.asarray(mass, dtype=float).reshape(count)])
+        self.pos = np.concatenate([self.pos, np.asarray(pos, dtype=float).reshape(count, 3)])
+        self.vel = np.concatenate([self.vel, np.asarray(vel, dtype=float).reshape(count, 3)])
+        self.fixed = np.concatenate([self.fixed, np.broadcast_to(np.asarray(fixed, dtype=bool), (count,))])
+
+    def remove_body(self, name):
+        """Remove every body with the given name"""
+        keep = np.array([body_name != name for body_name in self.names], dtype=bool)
+        self.names = [body_name for body_name in self.names if body_name != name]
+        self.mass = self.mass[keep]
+        self.pos = self.pos[keep]
+        self.vel = self.vel[keep]
+        self.fixed = self.fixed[keep]
+
+    def add_particles(self, pos, vel):
+        """Add massless test particles and return their ids"""
+        pos = np.asarray(pos, dtype=float).reshape(-1, 3)
+        vel = np.asarray(vel, dtype=float).reshape(-1, 3)
+        ids = np.arange(self.next_particle_id, self.next_particle_id + len(pos))
+        self.particle_pos = np.vstack([self.particle_pos, pos])
+        self.particle_vel = np.vstack([self.particle_vel, vel])
+        self.particle_ids = np.concatenate([self.particle_ids, ids])
+        self.next_particle_id += len(pos)
+        return ids
+
+    def remove_particles(self, mask):
+        """Remove the test particles selected by a boolean mask"""
+        keep = ~np.asarray(mask, dtype=bool)
+        self.particle_pos = self.particle_pos[keep]
+        self.particle_vel = self.particle_vel[keep]
+        self.particle_ids = self.particle_ids[keep]
+
+    def ephemeris_indices(self):
+        """Body indices driven by the ephemeris and their columns in it"""
+        if self.ephemeris is None:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        pairs = [(i, self.ephemeris.names.index(name))
+                 for i, name in enumerate(self.names) if name in self.ephemeris.names]
+        return np.array([i for i, _ in pairs], dtype=int), np.array([j for _, j in pairs], dtype=int)
+
+    def update_ephemeris(self):
+        """Set ephemeris bodies to their tabulated state at the current time"""
+        indices, columns = self.ephemeris_indices()
+        if len(indices):
+            pos, vel = self.ephemeris.state_at(self.time)
+            self.pos[indices] = pos[columns]
+            self.vel[indices] = vel[columns]
+
+    def advance_time(self, time_step):
+        """Move the clock forward and bring ephemeris bodies along"""
+        self.time += time_step
+        if self.ephemeris is not None:
+            self.update_ephemeris()
+
+    def moving(self):
+        """Mask of the bodies integrators advance: neither fixed nor from the ephemeris"""
+        moving = ~self.fixed
+        moving[self.ephemeris_indices()[0]] = False
+        return moving
+
+    def stacked(self):
+        """Positions, velocities and fixed flags of bodies followed by particles
+
+        Ephemeris bodies are flagged as fixed, since integrators must not
+        move them.
+        """
+        fixed = np.concatenate([~self.moving(), np.zeros(len(self.particle_pos), dtype=bool)])
+        return np.vstack([self.pos, self.particle_pos]), np.vstack([self.vel, self.particle_vel]), fixed
+
+    def set_stacked(self, pos, vel):
+        """Store stacked arrays produced from stacked()"""
+        n = len(self.mass)
+        self.pos, self.particle_pos = pos[:n], pos[n:]
+        self.vel, self.particle_vel = vel[:n], vel[n:]
+
+    def copy(self):
+        """Independent copy of the state
+
+        The copy gets its own shallow copy of the force solver, so a
+        Barnes-Hut tree rebuilt for one state is never reused for the other.
+        The read-only ephemeris is shared.
+        """
+        state = SystemState(self.softening, copy.copy(self.force_solver), self.ephemeris)
+        state.names = list(self.names)
+        state.mass = self.mass.copy()
+        state.pos = self.pos.copy()
+        state.vel = self.vel.copy()
+        state.fixed = self.fixed.copy()
+        state.particle_pos = self.particle_pos.copy()
+        state.particle_vel = self.particle_vel.copy()
+        state.particle_ids = self.particle_ids.copy()
+        state.next_particle_id = self.next_particle_id
+        state.time = self.time
+        return state
+
+    def index(self, name):
+        """Array index of the body with the given name"""
+        return self.names.index(name)
+
+    def get(self, name):
+        """Return a view of the body with the given name or None"""
+        if name not in self.names:
+            return None
+        return Body(self, name)
+
+    def distance(self, name1, name2):
+        """Distance between two bodies in meters"""
+        return float(np.linalg.norm(self.pos[self.index(name1)] - self.pos[self.index(name2)]))
+
+
+def calculate_moon_orbital_velocity(earth_mass, distance):
+    """Calculate Moon's orbital velocity for circular orbit around Earth"""
+    return math.sqrt(G * earth_mass / distance)
+
+
+def create_initial_state():
+    """Create initial Sun-Earth-Moon system"""
+    state = SystemState()
+
+    # Sun stays at the origin
+    state.add_body('Sun', BODY_DATA['Sun']['mass'], [0, 0, 0], [0, 0, 0], fixed=True)
+
+    # Earth on a circular orbit
+    earth_distance = BODY_DATA['Earth']['distance'] * AU
+    earth_velocity = BODY_DATA['Earth']['velocity'] * 1000
+    state.add_body('Earth', BODY_DATA['Earth']['mass'], [earth_distance, 0, 0], [0, earth_velocity, 0])
+
+    # Moon with correct orbital velocity
+    moon_orbital_velocity = calculate_moon_orbital_velocity(BODY_DATA['Earth']['mass'], MOON_DISTANCE)
+    state.add_body(
+        'Moon',
+        BODY_DATA['Moon']['mass'],
+        [earth_distance + MOON_DISTANCE, 0, 0],
+        [0, earth_velocity + moon_orbital_velocity, 0]
+    )
+    return state
+
+
+def add_asteroid(state, pos, vel, mass):
+    """Replace any existing asteroid with a new one"""
+    state.remove_body('Asteroid')
+    return state.add_body('Asteroid', mass, pos, vel)
+
+
+def calculate_accelerations(pos, mass, softening=0.0):
+    """Gravitational acceleration of every body from all others in one pass
+
+    pos is (N, 3), mass is (N,). Returns an (N, 3) array. Coincident bodies
+    exert no force on each other, as with the original pairwise loop.
+    """
+    r_vec = pos[np.newaxis, :, :] - pos[:, np.newaxis, :]  # r_vec[i, j] = pos[j] - pos[i]
+    r_sq = np.einsum('ijk,ijk->ij', r_vec, r_vec) + softening ** 2
+    np.fill_diagonal(r_sq, np.inf)
+    r_sq[r_sq == 0] = np.inf
+
+    weight = G * mass[np.newaxis, :] * r_sq ** -1.5
+    return np.einsum('ij,ijk->ik', weight, r_vec)
+
+
+def calculate_field_accelerations(target_pos, source_pos, source_mass, softening=0.0):
+    """Acceleration at each target point due to the source bodies
+
+    target_pos is (P, 3), source_pos is (M, 3), source_mass is (M,). The
+    targets exert nothing, so the cost is O(M * P). Returns a (P, 3) array.
+    """
+    r_vec = source_pos[np.newaxis, :, :] - target_pos[:, np.newaxis, :]  # r_vec[p, m] = source[m] - target[p]
+    r_sq = np.einsum('pmk,pmk->pm', r_vec, r_vec) + softening ** 2
+    r_sq[r_sq == 0] = np.inf
+
+    weight = G * source_mass[np.newaxis, :] * r_sq ** -1.5
+    return np.einsum('pm,pmk->pk', weight, r_vec)
+
+
+def state_accelerations(state, pos=None, mass=None):
+    """Accelerations of the bodies of state using its force solver
+
+    pos and mass default to the state's own arrays; integrators pass
+    intermediate positions or modified masses.
+    """
+    pos = state.pos if pos is None else pos
+    mass = state.mass if mass is None else mass
+    if state.force_solver is None:
+        return calculate_accelerations(pos, mass, state.softening)
+    return state.force_solver.accelerations(pos, mass, state.softening)
+
+
+def particle_accelerations(state, particle_pos, pos=None, mass=None):
+    """Accelerations of test particles from the massive bodies of state
+
+    With a force solver the tree refreshed by the preceding
+    state_accelerations call is reused.
+    """
+    pos = state.pos if pos is None else pos
+    mass = state.mass if mass is None else mass
+    if len(particle_pos) == 0:
+        return np.zeros((0, 3))
+    if state.force_solver is None:
+        return calculate_field_accelerations(particle_pos, pos, mass, state.softening)
+    return state.force_solver.accelerations_at(particle_pos, state.softening)
+
+
+def stacked_accelerations(state, pos, mass=None):
+    """Accelerations for stacked positions of bodies followed by particles"""
+    n = len(state.mass)
+    acceleration = state_accelerations(state, pos[:n], mass)
+    if len(pos) == n:
+        return acceleration
+    return np.vstack([acceleration, particle_accelerations(state, pos[n:], pos[:n], mass)])
+
+
+def ephemeris_positions(state, pos, time):
+    """Stacked positions with the ephemeris bodies looked up at time
+
+    Integrators call this for every intermediate stage so that ephemeris
+    bodies sit where they are at the stage time.
+    """
+    indices, columns = state.ephemeris_indices()
+    if len(indices) == 0:
+        return pos
+    pos = pos.copy()
+    pos[indices] = state.ephemeris.positions(time)[columns]
+    return pos
+
+
+def step(state, time_step):
+    """Advance the state by one semi-implicit Euler step"""
+    acceleration = state_accelerations(state)
+    particle_acceleration = particle_accelerations(state, state.particle_pos)
+    moving = state.moving()
+
+    # Update velocities, then positions
+    state.vel[moving] += acceleration[moving] * time_step
+    state.pos[moving] += state.vel[moving] * time_step
+    state.particle_vel += particle_acceleration * time_step
+    state.particle_pos += state.particle_vel * time_step
+
+    state.advance_time(time_step)
+
+
+def _encounter_event(kind, state, start, rel_pos, rel_vel, mu, time, asteroid, earth):
+    """Describe an encounter found inside the step that began with start"""
+    time_step = state.time - start.time
+    earth_pos, earth_vel = events.hermite_interpolate(
+        start.pos[earth], start.vel[earth], state.pos[earth], state.vel[earth], time_step, time - start.time
+    )
+    event = {'type': kind, 'time': time}
+    event.update(events.approach_geometry(rel_pos, rel_vel, mu))
+    event.update({
+        'relative_pos': list(map(float, rel_pos)),
+        'relative_vel': list(map(float, rel_vel)),
+        'earth_pos': list(map(float, earth_pos)),
+        'earth_vel': list(map(float, earth_vel)),
+        'asteroid_pos': list(map(float, earth_pos + rel_pos)),
+        'asteroid_vel': list(map(float, earth_vel + rel_vel))
+    })
+    return event
+
+
+def propagate(state, duration, time_step, impact_distance=EARTH_RADIUS, stop_on_impact=True, integrator=None,
+              approach_distance=APPROACH_DISTANCE, checkpoint=None, progress=None):
+    """Propagate the state for a duration and report the asteroid encounters
+
+    integrator is any object from integrators.py; by default the fixed-step
+    semi-implicit Euler step() is used. For adaptive integrators time_step
+    is only the initial step. Closest approaches and surface contact at
+    impact_distance are located inside each step (see events.py), so large
+    steps do not skip encounters. Returns a dict with the closest Earth
+    approach of the asteroid, the impact time and speed if it hit, and a
+    list of close-approach (within approach_distance) and impact events.
+
+    checkpoint, if given, is called as checkpoint(state, integrator,
+    progress) after every step (see checkpoint.Checkpointer). Passing a
+    saved progress dict back in continues its summary, so a resumed run
+    reports the same result as an uninterrupted one.
+    """
+    has_asteroid = 'Asteroid' in state.names and 'Earth' in state.names
+    if progress is None:
+        progress = {
+            'steps': 0,
+            'end_time': state.time + duration,
+            'min_distance': math.inf,
+            'min_distance_time': None,
+            'impact': False,
+            'impact_time': None,
+            'impact_velocity': None,
+            'events': []
+        }
+    else:
+        progress = dict(progress, events=list(progress['events']))
+    if has_asteroid:
+        asteroid = state.index('Asteroid')
+        earth = state.index('Earth')
+        mu = G * (state.mass[earth] + state.mass[asteroid])
+
+    end_time = state.time + duration
+    while state.time < end_time:
+        if has_asteroid:
+            start = state.copy()
+
+        if integrator is None:
+            step(state, time_step)
+        else:
+            integrator.step(state, min(integrator.next_step or time_step, end_time - state.time))
+        progress['steps'] += 1
+
+        if has_asteroid and _record_encounters(progress, state, start, asteroid, earth, mu, impact_distance,
+                                               approach_distance, stop_on_impact):
+            break
+        if checkpoint is not None:
+            checkpoint(state, integrator, progress)
+
+    return {
+        'steps': progress['steps'],
+        'time': state.time,
+        'min_distance': progress['min_distance'] if has_asteroid else None,
+        'min_distance_time': progress['min_distance_time'],
+        'impact': progress['impact'],
+        'impact_time': progress['impact_time'],
+        'impact_velocity': progress['impact_velocity'],
+        'events': progress['events']
+    }
+
+
+def _record_encounters(progress, state, start, asteroid, earth, mu, impact_distance, approach_distance,
+                       stop_on_impact):
+    """Search the step that began with start and update progress; True if the run should stop"""
+    rel_pos = start.pos[asteroid] - start.pos[earth]
+    rel_vel = start.vel[asteroid] - start.vel[earth]
+    encounter = events.find_encounters(
+        rel_pos[np.newaxis], rel_vel[np.newaxis], mu, state.time - start.time, impact_distance
+    )
+
+    distance = float(encounter['min_distance'][0])
+    if distance < progress['min_distance']:
+        progress['min_distance'] = distance
+        progress['min_distance_time'] = start.time + float(encounter['min_time'][0])
+
+    if encounter['contact'][0] and not progress['impact']:
+        impact_event = _encounter_event(
+            'impact', state, start, encounter['contact_pos'][0], encounter['contact_vel'][0], mu,
+            start.time + float(encounter['contact_time'][0]), asteroid, earth
+        )
+        progress['events'].append(impact_event)
+        progress['impact'] = True
+        progress['impact_time'] = impact_event['time']
+        progress['impact_velocity'] = impact_event['relative_speed']
+        if stop_on_impact:
+            return True
+
+    if encounter['local_minimum'][0] and distance < approach_distance:
+        progress['events'].append(_encounter_event(
+            'close_approach', state, start, encounter['min_pos'][0], encounter['min_vel'][0], mu,
+            start.time + float(encounter['min_time'][0]), asteroid, earth
+        ))
+    return False
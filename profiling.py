@@ -0,0 +1,149 @@
+"""Per-phase wall-clock timers for the frames of a simulation loop.
+
+A PhaseTimer splits each frame into named phases:
+
+    timer = profiling.PhaseTimer(enabled=True)
+    while running:
+        with timer.phase('physics'):
+            ...
+        with timer.phase('render'):
+            ...
+        timer.end_frame()
+    timer.export('timings.csv')
+
+Phases may nest; each phase is charged only its own (exclusive) time, so
+the phases of a frame add up to the frame time minus anything untimed,
+which is reported as 'other'. instrument() times every call of a module
+function as a phase, e.g. physics.state_accelerations as 'forces' inside
+an integrator step.
+
+While disabled, phase() returns one shared no-op context manager and
+end_frame() returns at once, so the timers can stay in the loop.
+"""
+import collections
+import contextlib
+import csv
+import functools
+import json
+import time
+
+_DISABLED = contextlib.nullcontext()
+
+
+class _Phase:
+    """Context manager timing one phase of a PhaseTimer"""
+    __slots__ = ('timer', 'name')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._stack.append([self.name, time.perf_counter(), 0.0])
+
+    def __exit__(self, *exc_info):
+        stack = self.timer._stack
+        name, start, children = stack.pop()
+        elapsed = time.perf_counter() - start
+        frame = self.timer._frame
+        frame[name] = frame.get(name, 0.0) + elapsed - children
+        if stack:
+            stack[-1][2] += elapsed
+
+
+class PhaseTimer:
+    """Exclusive time per phase for every frame, kept for the last max_frames frames"""
+    def __init__(self, enabled=False, max_frames=36000):
+        self.enabled = enabled
+        self.frames = collections.deque(maxlen=max_frames)
+        self.phases = []  # Phase names in order of first use
+        self.frame_count = 0
+        self._stack = []
+        self._frame = {}
+        self._phase_objects = {}
+        self._frame_start = time.perf_counter()
+        self._instrumented = []
+
+    def enable(self, enabled=True):
+        """Switch timing on or off; a newly enabled timer starts a fresh frame"""
+        self.enabled = enabled
+        self._stack.clear()
+        self._frame = {}
+        self._frame_start = time.perf_counter()
+
+    def phase(self, name):
+        """Context manager charging the time of its block to phase name"""
+        if not self.enabled:
+            return _DISABLED
+        phase = self._phase_objects.get(name)
+        if phase is None:
+            phase = self._phase_objects[name] = _Phase(self, name)
+            self.phases.append(name)
+        return phase
+
+    def instrument(self, module, function_name, phase_name):
+        """Time every call of module.function_name as phase_name until restore()
+
+        The function is replaced in the module, so calls made from inside
+        that module are timed as well.
+        """
+        original = getattr(module, function_name)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            with self.phase(phase_name):
+                return original(*args, **kwargs)
+
+        setattr(module, function_name, timed)
+        self._instrumented.append((module, function_name, original))
+
+    def restore(self):
+        """Undo every instrument() call"""
+        for module, function_name, original in reversed(self._instrumented):
+            setattr(module, function_name, original)
+        self._instrumented.clear()
+
+    def end_frame(self):
+        """Close the current frame and store its phase times"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        total = now - self._frame_start
+        self._frame_start = now
+        self.frame_count += 1
+        row = {'frame': self.frame_count, 'time': now, 'total': total}
+        row.update(self._frame)
+        row['other'] = total - sum(self._frame.values())
+        self.frames.append(row)
+        self._frame = {}
+
+    def averages(self, frames=60):
+        """Mean seconds per phase over the last frames frames, plus 'total' and 'other'"""
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return {}
+        names = ['total'] + self.phases + ['other']
+        return {name: sum(row.get(name, 0.0) for row in recent) / len(recent) for name in names}
+
+    def summary(self, frames=60):
+        """One-line text of averages(): frame time and rate, then milliseconds per phase"""
+        averages = self.averages(frames)
+        if not averages:
+            return "no frames timed yet"
+        total = averages.pop('total')
+        parts = [f"frame {total * 1000:.1f} ms ({1 / total if total > 0 else 0:.0f} fps)"]
+        parts += [f"{name} {seconds * 1000:.2f}" for name, seconds in averages.items()]
+        return " | ".join(parts)
+
+    def export(self, path):
+        """Write the stored frames as CSV, or as JSON when path ends in .json"""
+        columns = ['frame', 'time', 'total'] + self.phases + ['other']
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'columns': columns, 'frames': list(self.frames)}, f)
+            return path
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0.0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+        return path
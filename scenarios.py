@@ -0,0 +1,161 @@
+"""Asteroid scenarios shared by the scene, sweeps and batch runs.
+
+A scenario is a dict in the units of the scene's input fields: position
+x, y, z in AU, velocity vx, vy, vz in km/s, mass in kg, and the impact map
+latitude, longitude and entry angle in degrees.
+"""
+import math
+
+from physics import AU
+
+# Real asteroids database
+REAL_ASTEROIDS = {
+    "99942 Apophis": {
+        "description": "Potentially hazardous asteroid, closest approach to Earth in 2029",
+        "diameter_km": 0.34,
+        "mass_kg": 6.1e10,
+        "orbit_distance_au": 1.1,
+        "velocity_kms": 30.7,
+        "threat_level": "Medium",
+        "discovery_year": 2004,
+        "coordinates": [40.7128, -74.0060]  # New York
+    },
+    "101955 Bennu": {
+        "description": "B-type asteroid, target of OSIRIS-REx mission",
+        "diameter_km": 0.49,
+        "mass_kg": 7.8e10,
+        "orbit_distance_au": 1.2,
+        "velocity_kms": 28.0,
+        "threat_level": "Low",
+        "discovery_year": 1999,
+        "coordinates": [51.5074, -0.1278]  # London
+    },
+    "1 Ceres": {
+        "description": "Largest object in the asteroid belt, dwarf planet",
+        "diameter_km": 939.4,
+        "mass_kg": 9.1e20,
+        "orbit_distance_au": 2.8,
+        "velocity_kms": 17.9,
+        "threat_level": "None",
+        "discovery_year": 1801,
+        "coordinates": [41.9028, 12.4964]  # Rome
+    },
+    "4 Vesta": {
+        "description": "Second most massive asteroid in the asteroid belt",
+        "diameter_km": 525.4,
+        "mass_kg": 2.6e20,
+        "orbit_distance_au": 2.4,
+        "velocity_kms": 19.3,
+        "threat_level": "None",
+        "discovery_year": 1807,
+        "coordinates": [48.8566, 2.3522]  # Paris
+    },
+    "1036 Ganymed": {
+        "description": "Large Amor-type asteroid, first discovered of its type",
+        "diameter_km": 31.7,
+        "mass_kg": 3.3e16,
+        "orbit_distance_au": 1.6,
+        "velocity_kms": 23.5,
+        "threat_level": "Very Low",
+        "discovery_year": 1924,
+        "coordinates": [52.5200, 13.4050]  # Berlin
+    },
+    "1566 Icarus": {
+        "description": "Apollo group asteroid with highly eccentric orbit",
+        "diameter_km": 1.4,
+        "mass_kg": 3.6e12,
+        "orbit_distance_au": 1.1,
+        "velocity_kms": 34.0,
+        "threat_level": "Low",
+        "discovery_year": 1949,
+        "coordinates": [35.6762, 139.6503]  # Tokyo
+    },
+    "433 Eros": {
+        "description": "Amor group asteroid, first asteroid orbited by a spacecraft",
+        "diameter_km": 16.8,
+        "mass_kg": 6.7e15,
+        "orbit_distance_au": 1.5,
+        "velocity_kms": 24.4,
+        "threat_level": "Very Low",
+        "discovery_year": 1898,
+        "coordinates": [55.7558, 37.6176]  # Moscow
+    },
+    "2101 Adonis": {
+        "description": "Apollo group asteroid, potentially hazardous object",
+        "diameter_km": 1.0,
+        "mass_kg": 1.8e12,
+        "orbit_distance_au": 1.0,
+        "velocity_kms": 31.2,
+        "threat_level": "Medium",
+        "discovery_year": 1936,
+        "coordinates": [50.4501, 30.5234]  # Kyiv
+    }
+}
+
+# Quick presets
+PRESETS = {
+    "Comet": {
+        "x": 5.0, "y": 0, "z": 0, "vx": 0, "vy": 8.0, "vz": 0,
+        "mass": 1e14,
+        "lat": 48.86, "lon": 2.35, "angle": 30  # Paris
+    },
+    "Near Earth": {
+        "x": 1.2, "y": 0, "z": 0, "vx": 0, "vy": 25.0, "vz": 0,
+        "mass": 1e16,
+        "lat": 40.71, "lon": -74.01, "angle": 60  # New York
+    },
+    "Impact": {
+        "x": 1.5, "y": 0, "z": 0, "vx": -15.0, "vy": 20.0, "vz": 0,
+        "mass": 5e16,
+        "lat": 50.45, "lon": 30.52, "angle": 45  # Kyiv
+    },
+    "Asteroid Belt": {
+        "x": 2.8, "y": 0, "z": 0, "vx": 0, "vy": 18.0, "vz": 0,
+        "mass": 5e15,
+        "lat": 35.68, "lon": 139.69, "angle": 35  # Tokyo
+    }
+}
+
+
+def real_asteroid_scenario(asteroid_name):
+    """Scenario for an entry of REAL_ASTEROIDS"""
+    data = REAL_ASTEROIDS[asteroid_name]
+
+    # Calculate mass based on diameter if needed
+    if 'mass_kg' in data:
+        mass = data['mass_kg']
+    else:
+        # Approximate asteroid density 2000 kg/m³
+        radius_m = (data['diameter_km'] * 1000) / 2
+        volume = (4/3) * math.pi * (radius_m ** 3)
+        mass = volume * 2000
+
+    # Angle based on threat level
+    if data['threat_level'] == "High":
+        angle = 30
+    elif data['threat_level'] == "Medium":
+        angle = 45
+    else:
+        angle = 60
+
+    return {
+        "x": data['orbit_distance_au'], "y": 0, "z": 0,
+        "vx": 0, "vy": data['velocity_kms'], "vz": 0,
+        "mass": mass,
+        "lat": data['coordinates'][0], "lon": data['coordinates'][1], "angle": angle
+    }
+
+
+def catalog_scenarios():
+    """Named scenarios for every preset and every real asteroid"""
+    scenarios = {name: dict(scenario) for name, scenario in PRESETS.items()}
+    for name in REAL_ASTEROIDS:
+        scenarios[name] = real_asteroid_scenario(name)
+    return scenarios
+
+
+def scenario_state(scenario):
+    """Asteroid position (m), velocity (m/s) and mass (kg) for a scenario"""
+    pos = [scenario['x'] * AU, scenario['y'] * AU, scenario['z'] * AU]
+    vel = [scenario['vx'] * 1000, scenario['vy'] * 1000, scenario['vz'] * 1000]
+    return pos, vel, scenario['mass']
@@ -0,0 +1,169 @@
+"""Parallel parameter sweeps over asteroid scenarios.
+
+Runs are fanned out over a ProcessPoolExecutor and their summaries are
+streamed into one CSV table as they complete:
+
+    python sweep.py --output sweep.csv                       # presets + REAL_ASTEROIDS
+    python sweep.py --grid vy=18,20,22 --grid vx=-15,-10     # grid around the Impact preset
+    python sweep.py --ephemeris ephemeris                    # look up Sun, Earth, Moon (see ephemeris.py)
+"""
+import argparse
+import csv
+import functools
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ephemeris
+import impact_effects
+import integrators
+import physics
+import scenarios
+from physics import AU, DAY
+
+SUMMARY_FIELDS = [
+    'name', 'min_distance_au', 'min_distance_day', 'impact', 'impact_day',
+    'impact_velocity_kms', 'impact_energy_j', 'crater_diameter_km', 'airblast_radius_km', 'steps'
+]
+SWEEP_FIELDS = SUMMARY_FIELDS + ['status', 'error']
+
+
+@functools.lru_cache(maxsize=None)
+def load_ephemeris(path):
+    """Open an ephemeris once per worker process"""
+    return ephemeris.Ephemeris(path)
+
+
+def run_scenario(name, scenario, duration, time_step, integrator='euler', ephemeris_path=None):
+    """Propagate one scenario headlessly and summarise the Earth encounter
+
+    With ephemeris_path the massive bodies are looked up in that table
+    instead of being integrated.
+    """
+    if ephemeris_path:
+        state = load_ephemeris(ephemeris_path).create_state()
+    else:
+        state = physics.create_initial_state()
+    pos, vel, mass = scenarios.scenario_state(scenario)
+    physics.add_asteroid(state, pos, vel, mass)
+    result = physics.propagate(
+        state, duration, time_step,
+        integrator=None if integrator == 'euler' else integrators.create_integrator(integrator)
+    )
+    return summarize(name, scenario, result)
+
+
+def summarize(name, scenario, result):
+    """Summary row (SUMMARY_FIELDS) of a physics.propagate result for a scenario"""
+    mass = scenario['mass']
+    impact_energy = 0.5 * mass * result['impact_velocity'] ** 2 if result['impact'] else 0.0
+    effects = impact_effects.effects_for(mass, result['impact_velocity'], scenario['angle']) if result['impact'] else None
+    return {
+        'name': name,
+        'min_distance_au': result['min_distance'] / AU,
+        'min_distance_day': result['min_distance_time'] / DAY,
+        'impact': result['impact'],
+        'impact_day': result['impact_time'] / DAY if result['impact'] else None,
+        'impact_velocity_kms': result['impact_velocity'] / 1000 if result['impact'] else None,
+        'impact_energy_j': impact_energy,
+        'crater_diameter_km': effects['crater_diameter'] / 1000 if effects else None,
+        'airblast_radius_km': effects['airblast_radius_buildings'] / 1000 if effects else None,
+        'steps': result['steps']
+    }
+
+
+def grid_scenarios(base, axes):
+    """Named scenarios for every combination of the axis values
+
+    axes maps scenario keys (x, vy, mass, ...) to lists of values applied
+    on top of the base scenario.
+    """
+    keys = list(axes)
+    grid = {}
+    for values in itertools.product(*(axes[key] for key in keys)):
+        scenario = dict(base)
+        scenario.update(zip(keys, values))
+        grid[' '.join(f"{key}={value:g}" for key, value in zip(keys, values))] = scenario
+    return grid
+
+
+def run_sweep(named_scenarios, duration, time_step, integrator='euler', workers=None, output=None,
+              ephemeris_path=None):
+    """Run scenarios in parallel and stream their summaries
+
+    Summaries are yielded in completion order and, when output is a path,
+    appended to a CSV file as they arrive. A run that raises is reported
+    as a row with status "error" and the exception, so the other runs of
+    the sweep still complete.
+    """
+    writer = None
+    output_file = None
+    if output:
+        output_file = open(output, 'w', newline='')
+        writer = csv.DictWriter(output_file, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = {
+                executor.submit(run_scenario, name, scenario, duration, time_step, integrator, ephemeris_path): name
+                for name, scenario in named_scenarios.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    summary = {**future.result(), 'status': 'ok'}
+                except Exception as e:
+                    summary = {'name': futures[future], 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+                if writer:
+                    writer.writerow(summary)
+                    output_file.flush()
+                yield summary
+    finally:
+        if output_file:
+            output_file.close()
+
+
+def parse_grid_axis(text):
+    """Parse 'key=v1,v2,...' into (key, [floats])"""
+    key, _, values = text.partition('=')
+    return key.strip(), [float(value) for value in values.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel asteroid scenario sweep")
+    parser.add_argument('--duration-days', type=float, default=365.0)
+    parser.add_argument('--time-step-days', type=float, default=0.1)
+    parser.add_argument('--integrator', default='euler', choices=list(integrators.INTEGRATORS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="CSV file for the result table")
+    parser.add_argument('--base', default='Impact', help="Scenario the grid axes are applied to")
+    parser.add_argument('--grid', action='append', default=[], metavar='KEY=V1,V2,...',
+                        help="Sweep a scenario field over values; repeat for a full grid")
+    parser.add_argument('--ephemeris', default=None, help="Ephemeris directory built by ephemeris.py")
+    args = parser.parse_args(argv)
+
+    catalog = scenarios.catalog_scenarios()
+    if args.grid:
+        named_scenarios = grid_scenarios(catalog[args.base], dict(parse_grid_axis(axis) for axis in args.grid))
+    else:
+        named_scenarios = catalog
+
+    failed = 0
+    print(f"{'Scenario':<28} {'Min dist (AU)':>14} {'Impact':>7} {'Energy (J)':>12}")
+    for summary in run_sweep(named_scenarios, args.duration_days * DAY, args.time_step_days * DAY,
+                             args.integrator, args.workers, args.output, args.ephemeris):
+        if summary['status'] != 'ok':
+            failed += 1
+            print(f"{summary['name']:<28} error: {summary['error']}")
+            continue
+        print(f"{summary['name']:<28} {summary['min_distance_au']:>14.5f} "
+              f"{'yes' if summary['impact'] else 'no':>7} {summary['impact_energy_j']:>12.3e}")
+    if failed:
+        print(f"{failed} of {len(named_scenarios)} runs failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
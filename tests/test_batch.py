@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import batch
+
+DEFAULTS = {'duration_days': 2, 'time_step_days': 0.5}
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def _results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_valid_file_exits_zero(tmp_path):
+    jobs = _write(tmp_path / 'jobs.json', {'defaults': DEFAULTS, 'scenarios': [
+        {'preset': 'Impact'},
+        {'name': 'Faster', 'preset': 'Impact', 'asteroid': {'vy': 22.0}, 'integrator': 'rk45'}
+    ]})
+    output = tmp_path / 'results.jsonl'
+    assert batch.main([jobs, '--output', str(output)]) == 0
+
+    results = _results(output)
+    assert [record['name'] for record in results] == ['Impact', 'Faster']
+    assert all(record['status'] == 'ok' for record in results)
+
+
+def test_failing_scenario_exits_one_and_runs_the_rest(tmp_path):
+    jobs = _write(tmp_path / 'jobs.json', {'defaults': DEFAULTS, 'scenarios': [
+        {'preset': 'Impact'},
+        {'name': 'Massless', 'preset': 'Impact', 'asteroid': {'mass': -1}},
+        {'preset': 'No such preset'}
+    ]})
+    output = tmp_path / 'results.jsonl'
+    assert batch.main([jobs, '--output', str(output), '--workers', '2']) == 1
+
+    results = _results(output)
+    assert [record['status'] for record in results] == ['ok', 'error', 'error']
+    assert 'mass must be positive' in results[1]['error']
+
+
+@pytest.mark.parametrize('text', ['{"scenarios": [', '"just a string"', '{"scenarios": [1, 2]}'])
+def test_malformed_file_exits_two(tmp_path, text):
+    path = tmp_path / 'jobs.json'
+    path.write_text(text)
+    output = tmp_path / 'results.jsonl'
+    assert batch.main([str(path), '--output', str(output)]) == 2
+    assert not output.exists()
+
+
+def test_missing_file_exits_two(tmp_path):
+    assert batch.main([str(tmp_path / 'missing.json')]) == 2
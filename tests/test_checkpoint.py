@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+import checkpoint
+import ephemeris
+import integrators
+import physics
+from physics import DAY
+
+DURATION = 20 * DAY
+TIME_STEP = 0.5 * DAY
+
+
+def _scene_state():
+    state = physics.create_initial_state()
+    physics.add_asteroid(state, **physics.DEFAULT_ASTEROID)
+    return state
+
+
+@pytest.mark.parametrize('name', list(integrators.INTEGRATORS))
+def test_resumed_run_is_bit_identical(tmp_path, name):
+    path = str(tmp_path / 'run.npz')
+    state = _scene_state()
+    state.add_particles(state.pos[-1] + [[1e8, 0, 0], [0, 1e8, 0]], state.vel[-1] + [[0, 10, 0], [10, 0, 0]])
+    reference_state = state.copy()
+    reference = physics.propagate(reference_state, DURATION, TIME_STEP,
+                                  integrator=integrators.create_integrator(name))
+
+    # A single checkpoint written just past half-way through the run
+    interrupted = state.copy()
+    physics.propagate(interrupted, DURATION, TIME_STEP, integrator=integrators.create_integrator(name),
+                      checkpoint=checkpoint.Checkpointer(path, every=reference['steps'] // 2 + 1))
+    snapshot = checkpoint.load_checkpoint(path)
+    resumed = snapshot['state']
+    progress = snapshot['progress']
+    assert state.time < resumed.time < reference_state.time
+
+    result = physics.propagate(resumed, progress['end_time'] - resumed.time, TIME_STEP,
+                               integrator=snapshot['integrator'], progress=progress)
+    assert result == reference
+    assert resumed.time == reference_state.time
+    assert np.array_equal(resumed.pos, reference_state.pos)
+    assert np.array_equal(resumed.vel, reference_state.vel)
+    assert np.array_equal(resumed.particle_pos, reference_state.particle_pos)
+    assert np.array_equal(resumed.particle_ids, reference_state.particle_ids)
+
+
+def test_checkpoint_with_ephemeris_loads_from_another_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    table = ephemeris.build_ephemeris('ephemeris', 30 * DAY)
+    state = table.create_state()
+    rng = np.random.default_rng(7)
+    rng.random(3)
+    checkpoint.save_checkpoint('run.npz', state, integrators.create_integrator('rk45'), rng=rng, seed=7)
+
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    snapshot = checkpoint.load_checkpoint(os.path.join('..', 'run.npz'))
+    assert snapshot['state'].ephemeris is not None
+    assert np.array_equal(snapshot['state'].ephemeris.positions(10 * DAY), table.positions(10 * DAY))
+    assert snapshot['integrator'].name == 'rk45'
+    assert snapshot['seed'] == 7
+    assert snapshot['rng'].random() == rng.random()
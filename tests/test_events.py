@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import events
+import physics
+from physics import DAY, EARTH_RADIUS, G
+
+EARTH_MU = G * physics.BODY_DATA['Earth']['mass']
+
+
+def _fall(rel_vel, time_step):
+    """propagate() of a body 20,000 km from a lone Earth with the given relative velocity"""
+    state = physics.SystemState()
+    state.add_body('Earth', physics.BODY_DATA['Earth']['mass'], [0, 0, 0], [0, 0, 0])
+    state.add_body('Asteroid', 1e10, [2e7, 0, 0], rel_vel)
+    return physics.propagate(state, DAY, time_step)
+
+
+@pytest.mark.parametrize('rel_vel', [[-10, 0, 0], [0, 10, 0], [10, 0, 0]])
+def test_slow_body_falls_in_within_one_long_step(rel_vel):
+    # 10 m/s covers 86 km in 0.1 day, but gravity brings the body in within 1.3 h
+    encounter = events.find_encounters([[2e7, 0, 0]], [rel_vel], EARTH_MU, 0.1 * DAY, EARTH_RADIUS)
+    assert encounter['contact'][0]
+    assert encounter['contact_time'][0] == pytest.approx(1.26 * 3600, rel=0.01)
+    assert np.linalg.norm(encounter['contact_pos'][0]) == pytest.approx(EARTH_RADIUS)
+
+
+@pytest.mark.parametrize('rel_vel', [[-10, 0, 0], [0, 10, 0], [10, 0, 0]])
+def test_slow_infall_impact_matches_fine_steps(rel_vel):
+    coarse = _fall(rel_vel, 0.1 * DAY)
+    fine = _fall(rel_vel, 60)
+    assert coarse['impact'] and fine['impact']
+    assert coarse['impact_time'] == pytest.approx(fine['impact_time'], rel=0.02)
+    assert coarse['impact_velocity'] == pytest.approx(fine['impact_velocity'], rel=0.05)
+
+
+def test_distant_body_moves_in_straight_line():
+    encounter = events.find_encounters([[1e10, 0, 0]], [[-1e3, 1e3, 0]], EARTH_MU, 0.1 * DAY, EARTH_RADIUS)
+    assert not encounter['contact'][0]
+    assert encounter['min_time'][0] == pytest.approx(0.1 * DAY)
+    assert np.array_equal(encounter['min_vel'][0], [-1e3, 1e3, 0])
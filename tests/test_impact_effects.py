@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pytest
+
+import impact_effects
+
+# 100 m stony impactor (3000 kg/m^3) at 20 km/s and 45 degrees into
+# sedimentary rock. Expected values are the Collins, Melosh & Marcus (2005)
+# equations evaluated by hand.
+MASS = 3000.0 * math.pi / 6 * 100.0 ** 3
+VELOCITY = 20000.0
+ANGLE = 45.0
+REFERENCE = {
+    'energy': 3.1416e17,
+    'energy_mt': 75.09,
+    'impactor_diameter': 100.0,
+    'transient_crater_diameter': 1885.1,
+    'crater_diameter': 2356.4,  # Simple crater, 1.25 D_tc
+    'fireball_radius': 1359.6,
+    'thermal_radius': 17091.0,
+    'airblast_radius_windows': 49468.0,
+    'airblast_radius_buildings': 18391.0,
+    'airblast_radius_concrete': 9046.2
+}
+
+
+def test_reference_impactor_vectorized():
+    result = impact_effects.impact_effects([MASS, 1000 * MASS], VELOCITY, ANGLE)
+    for key, expected in REFERENCE.items():
+        assert result[key][0] == pytest.approx(expected, rel=1e-3), key
+
+    # 1 km impactor: transient crater grows by 10^0.78, final crater is complex
+    assert result['transient_crater_diameter'][1] == pytest.approx(11359.0, rel=1e-3)
+    assert result['crater_diameter'][1] == pytest.approx(15669.0, rel=1e-3)
+
+
+def test_reference_impactor_scalar():
+    result = impact_effects.effects_for(MASS, VELOCITY, ANGLE)
+    for key, expected in REFERENCE.items():
+        assert isinstance(result[key], float)
+        assert result[key] == pytest.approx(expected, rel=1e-3), key
+
+
+def test_blast_reference_point():
+    # A 1 kt surface burst has the reference overpressure p_x at r_x
+    p_x, r_x = impact_effects.OVERPRESSURE_REFERENCE
+    assert impact_effects._scaled_blast_distance(p_x) == pytest.approx(r_x, rel=1e-9)
+
+
+def test_slow_impacts_have_no_thermal_radius_and_targets_broadcast():
+    result = impact_effects.impact_effects(MASS, [12000.0, VELOCITY], ANGLE, target=['water', 'crystalline'])
+    assert result['thermal_radius'][0] == 0.0
+    # Lighter targets open larger craters
+    water = impact_effects.impact_effects(MASS, VELOCITY, ANGLE, target='water')
+    assert np.all(water['transient_crater_diameter'] > REFERENCE['transient_crater_diameter'])
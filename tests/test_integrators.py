@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+
+import integrators
+import physics
+from physics import AU, DAY, G
+
+SUN_MASS = physics.BODY_DATA['Sun']['mass']
+EARTH_MASS = physics.BODY_DATA['Earth']['mass']
+
+
+def _sun_earth():
+    """Fixed Sun and Earth on a circular orbit; returns (state, period, orbital speed)"""
+    speed = math.sqrt(G * SUN_MASS / AU)
+    state = physics.SystemState()
+    state.add_body('Sun', SUN_MASS, [0, 0, 0], [0, 0, 0], fixed=True)
+    state.add_body('Earth', EARTH_MASS, [AU, 0, 0], [0, speed, 0])
+    return state, 2 * math.pi * AU / speed, speed
+
+
+def _add_quiet_bodies(state, count):
+    """Light bodies on wide circular orbits, far from Earth"""
+    for i in range(count):
+        radius = (3 + i / count) * AU
+        angle = 2 * math.pi * i / count
+        speed = math.sqrt(G * SUN_MASS / radius)
+        state.add_body(f'Quiet {i}', 1e10, [radius * math.cos(angle), radius * math.sin(angle), 0],
+                       [-speed * math.sin(angle), speed * math.cos(angle), 0])
+
+
+@pytest.mark.parametrize('name', ['rk45', 'bs'])
+@pytest.mark.parametrize('rtol', [1e-6, 1e-9])
+def test_adaptive_step_meets_rtol_on_two_body_orbit(name, rtol):
+    state, period, speed = _sun_earth()
+    integrator = integrators.create_integrator(name, rtol=rtol, atol_pos=rtol * AU, atol_vel=rtol * speed)
+    angular_speed = 2 * math.pi / period
+    time_step = period / 8
+    for _ in range(5):
+        # Restart each step on the exact orbit so only that step's error is measured
+        angle = angular_speed * state.time
+        state.pos[1] = [AU * math.cos(angle), AU * math.sin(angle), 0]
+        state.vel[1] = [-speed * math.sin(angle), speed * math.cos(angle), 0]
+        integrator.step(state, time_step)
+        time_step = integrator.next_step
+
+        angle = angular_speed * state.time
+        error = np.linalg.norm(state.pos[1] - [AU * math.cos(angle), AU * math.sin(angle), 0])
+        assert error <= rtol * AU
+
+
+@pytest.mark.parametrize('name', ['rk45', 'bs'])
+def test_close_encounter_shrinks_next_step(name):
+    def next_step(encounter, quiet_bodies):
+        state, _period, _speed = _sun_earth()
+        _add_quiet_bodies(state, quiet_bodies)
+        if encounter:
+            # 10,000 km from Earth, passing at 10 km/s
+            state.add_body('Asteroid', 1e12, state.pos[1] + [1e7, 0, 0], state.vel[1] + [0, 1e4, 0])
+        integrator = integrators.create_integrator(name, rtol=1e-9, atol_pos=1e3, atol_vel=1e-3)
+        integrator.step(state, 0.1 * DAY)
+        return integrator.next_step
+
+    encounter_step = next_step(encounter=True, quiet_bodies=200)
+    assert encounter_step < 0.2 * next_step(encounter=False, quiet_bodies=200)
+    # However many quiet bodies surround it, the encountering body sets the step
+    assert encounter_step == pytest.approx(next_step(encounter=True, quiet_bodies=0), rel=0.05)
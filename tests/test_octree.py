@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import octree
+import physics
+
+SOFTENING = 1e6
+
+
+def _cluster(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, 3)) * 1e11, rng.uniform(1e20, 1e24, n)
+
+
+def _relative_error(approximate, exact):
+    return np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+
+
+@pytest.mark.parametrize('theta', [0.2, 0.5])
+def test_barnes_hut_matches_direct_sum_within_theta(theta):
+    # Monopole error scales with theta^2; the tail is where the net pull nearly cancels
+    pos, mass = _cluster(2000)
+    solver = octree.BarnesHutSolver(theta=theta)
+    error = _relative_error(solver.accelerations(pos, mass, SOFTENING),
+                            physics.calculate_accelerations(pos, mass, SOFTENING))
+    assert np.median(error) < 0.02 * theta ** 2
+    assert np.percentile(error, 99) < 0.1 * theta ** 2
+
+    targets = np.random.default_rng(4).normal(size=(300, 3)) * 1e11
+    error = _relative_error(solver.accelerations_at(targets, SOFTENING),
+                            physics.calculate_field_accelerations(targets, pos, mass, SOFTENING))
+    assert np.median(error) < 0.02 * theta ** 2
+    assert np.percentile(error, 99) < 0.1 * theta ** 2
+
+
+def test_copied_state_has_its_own_tree():
+    pos, mass = _cluster(500)
+    state = physics.SystemState(softening=SOFTENING, force_solver=octree.BarnesHutSolver())
+    state.add_bodies([f'Body {i}' for i in range(len(pos))], mass, pos, np.zeros_like(pos))
+    state.force_solver.accelerations(state.pos, state.mass, SOFTENING)
+
+    branch = state.copy()
+    assert branch.force_solver is not state.force_solver
+    branch.pos *= 3
+    branch.force_solver.accelerations(branch.pos, branch.mass, SOFTENING)
+    np.testing.assert_array_equal(state.force_solver.build_pos, state.pos)
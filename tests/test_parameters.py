@@ -0,0 +1,47 @@
+import pytest
+
+import parameters
+
+
+def _store():
+    return parameters.ParameterStore([
+        parameters.Parameter('mass', 1e15, "Mass", minimum=0, exclusive_minimum=True),
+        parameters.Parameter('lat', 50.45, "Impact Latitude", minimum=-90, maximum=90),
+    ])
+
+
+@pytest.mark.parametrize('name, text', [
+    ('lat', '91'), ('lat', '-90.5'), ('mass', '0'), ('mass', '-1e10'),
+    ('lat', 'north'), ('mass', ''), ('mass', 'nan'), ('lat', 'inf'),
+])
+def test_invalid_text_is_rejected_and_keeps_the_last_value(name, text):
+    store = _store()
+    changes = []
+    store.subscribe(name, changes.append)
+    before = store[name]
+
+    message = store.set_text(name, text)
+    assert message is not None and message.startswith(store.parameters[name].label)
+    assert store[name] == before
+    assert changes == []
+    with pytest.raises(parameters.ParameterError):
+        store.set(name, text)
+
+
+def test_valid_text_is_parsed_once_and_notifies():
+    store = _store()
+    changes = []
+    store.subscribe('lat', changes.append)
+
+    assert store.set_text('lat', ' -90 ') is None
+    assert store['lat'] == -90.0
+    assert store.set_text('lat', '-90') is None
+    assert changes == [-90.0]
+
+
+def test_update_validates_scenario_values():
+    store = _store()
+    store.update({'lat': 10, 'mass': 2e12, 'vy': 20})
+    assert (store['lat'], store['mass']) == (10.0, 2e12)
+    with pytest.raises(parameters.ParameterError):
+        store.update({'lat': 100})
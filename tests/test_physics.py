@@ -0,0 +1,23 @@
+import numpy as np
+
+import physics
+
+
+def test_add_bodies_matches_add_body():
+    rng = np.random.default_rng(1)
+    names = [f'Body {i}' for i in range(5)]
+    mass = rng.uniform(1e20, 1e24, 5)
+    pos = rng.normal(size=(5, 3))
+    vel = rng.normal(size=(5, 3))
+    fixed = np.array([True, False, False, True, False])
+
+    one_by_one = physics.create_initial_state()
+    for i, name in enumerate(names):
+        one_by_one.add_body(name, mass[i], pos[i], vel[i], fixed=fixed[i])
+    at_once = physics.create_initial_state()
+    at_once.add_bodies(names, mass, pos, vel, fixed)
+
+    assert at_once.names == one_by_one.names
+    for column in ('mass', 'pos', 'vel', 'fixed'):
+        np.testing.assert_array_equal(getattr(at_once, column), getattr(one_by_one, column))
+    assert at_once.fixed.dtype == bool
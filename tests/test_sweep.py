@@ -0,0 +1,35 @@
+import csv
+
+import scenarios
+import sweep
+from physics import DAY
+
+
+def _with_broken_preset():
+    catalog = dict(scenarios.PRESETS)
+    broken = dict(catalog['Impact'])
+    del broken['vx']
+    catalog['Broken'] = broken
+    return catalog
+
+
+def test_failing_scenario_does_not_abort_sweep(tmp_path):
+    output = tmp_path / 'sweep.csv'
+    named_scenarios = _with_broken_preset()
+    rows = list(sweep.run_sweep(named_scenarios, 2 * DAY, 0.5 * DAY, workers=2, output=str(output)))
+
+    assert sorted(row['name'] for row in rows) == sorted(named_scenarios)
+    failed = [row for row in rows if row['status'] == 'error']
+    assert [row['name'] for row in failed] == ['Broken']
+    assert failed[0]['error'].startswith('KeyError')
+    assert all(row['steps'] == 4 for row in rows if row['status'] == 'ok')
+
+    with open(output, newline='') as f:
+        table = list(csv.DictReader(f))
+    assert len(table) == len(named_scenarios)
+    assert {row['name']: row['status'] for row in table}['Broken'] == 'error'
+
+
+def test_main_exits_nonzero_when_a_run_fails(monkeypatch):
+    monkeypatch.setattr(scenarios, 'catalog_scenarios', _with_broken_preset)
+    assert sweep.main(['--duration-days', '1', '--time-step-days', '0.5', '--workers', '2']) == 1
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+
+import trails
+
+
+def _circle(steps, turns=1.0):
+    angle = np.linspace(0, 2 * np.pi * turns, steps, endpoint=False)
+    return np.column_stack([np.cos(angle), np.sin(angle), np.zeros(steps)])
+
+
+def test_straight_path_keeps_only_its_ends():
+    trail = trails.TrailBuffer(budget=50)
+    for x in range(1000):
+        assert trail.append([x, 0, 0]) == (False, False)
+    np.testing.assert_array_equal(trail.points(), [[0, 0, 0], [999, 0, 0]])
+
+
+def test_max_spacing_commits_on_straight_paths():
+    trail = trails.TrailBuffer(budget=50, max_spacing=10.0)
+    for x in range(101):
+        trail.append([x, 0, 0])
+    spacing = np.diff(trail.points()[:, 0])
+    assert np.all(spacing <= 11)
+    assert trail.points()[-1, 0] == 100
+
+
+def test_turns_are_decimated_by_angle():
+    trail = trails.TrailBuffer(budget=500, angle_tolerance=math.radians(2.0))
+    for pos in _circle(3600):
+        trail.append(pos)
+    # The chord turns by half the arc, so a vertex every ~4 degrees
+    assert 70 <= len(trail) <= 110
+    assert np.allclose(np.linalg.norm(trail.points(), axis=1), 1.0)
+
+
+def test_full_buffer_wraps_and_keeps_the_newest_vertices():
+    trail = trails.TrailBuffer(budget=20, angle_tolerance=math.radians(2.0))
+    path = _circle(3600, turns=2.0)
+    committed = []
+    dropped = 0
+    for pos in path:
+        previous_tip = trail.tip
+        was_committed, was_dropped = trail.append(pos)
+        if was_committed:
+            committed.append(previous_tip)
+        dropped += was_dropped
+
+    assert trail.count == trail.budget
+    assert len(trail) == trail.budget + 1
+    assert dropped == len(committed) + 1 - trail.budget
+    points = trail.points()
+    np.testing.assert_array_equal(points[:-1], committed[-trail.budget:])
+    np.testing.assert_array_equal(points[-1], path[-1])
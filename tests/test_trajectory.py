@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import physics
+import trajectory
+from physics import DAY
+
+
+def _state_with_particles(count=4):
+    state = physics.create_initial_state()
+    earth = state.index("Earth")
+    offsets = np.arange(1, count + 1)[:, None] * [1e8, 0, 0]
+    state.add_particles(state.pos[earth] + offsets, np.tile(state.vel[earth] + [0, 100, 0], (count, 1)))
+    return state
+
+
+def test_particles_round_trip_with_removed_as_nan(tmp_path):
+    path = str(tmp_path / 'run')
+    state = _state_with_particles()
+    expected = []
+    with trajectory.TrajectoryWriter(path, chunk_size=3) as writer:
+        for row in range(8):
+            if row == 5:
+                state.remove_particles(state.particle_ids == 1)
+            physics.step(state, DAY)
+            writer.append(state)
+            expected.append((state.particle_ids.copy(), state.particle_pos.copy(), state.particle_vel.copy()))
+
+    reader = trajectory.TrajectoryReader(path)
+    rows = reader.read()
+    assert list(reader.particle_ids) == [0, 1, 2, 3]
+    assert rows['particle_pos'].shape == (8, 4, 3)
+    for row, (ids, pos, vel) in enumerate(expected):
+        np.testing.assert_array_equal(rows['particle_pos'][row, ids], pos)
+        np.testing.assert_array_equal(rows['particle_vel'][row, ids], vel)
+    assert np.isnan(rows['particle_pos'][5:, 1]).all()
+    assert not np.isnan(rows['particle_pos'][:5]).any()
+
+
+def test_added_particles_raise(tmp_path):
+    state = _state_with_particles()
+    with trajectory.TrajectoryWriter(str(tmp_path / 'run')) as writer:
+        writer.append(state)
+        state.add_particles([[1e12, 0, 0]], [[0, 0, 0]])
+        with pytest.raises(ValueError):
+            writer.append(state)
+
+
+def test_chunk_rows_fit_the_buffer_budget(tmp_path):
+    state = _state_with_particles(count=1000)
+    row_bytes = 48 * (len(state.names) + 1000) + 8
+    writer = trajectory.TrajectoryWriter(str(tmp_path / 'run'), buffer_bytes=10 * row_bytes)
+    writer.append(state)
+    assert writer.chunk_size == 10
+    assert sum(column.nbytes for column in writer.buffer.values()) <= 10 * row_bytes
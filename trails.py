@@ -0,0 +1,88 @@
+"""Bounded, curvature-adaptive orbit trails.
+
+A TrailBuffer keeps at most `budget` vertices of a body's path in a NumPy
+ring buffer. Positions are fed in as the body moves, but a vertex is only
+committed once the path has turned by more than angle_tolerance since the
+last vertex (or has run further than max_spacing), so tight turns keep
+many vertices and smooth arcs very few. The newest position is carried as
+a moving tip, so the trail always reaches the body.
+"""
+import math
+
+import numpy as np
+
+
+class TrailBuffer:
+    """Ring buffer of decimated trail vertices for one body"""
+    def __init__(self, budget=500, angle_tolerance=math.radians(2.0), max_spacing=math.inf):
+        self.budget = budget
+        self.cos_tolerance = math.cos(angle_tolerance)
+        self.max_spacing = max_spacing
+        self.vertices = np.zeros((budget, 3))
+        self.start = 0
+        self.count = 0
+        self.tip = None
+        self.direction = None
+
+    def __len__(self):
+        """Committed vertices plus the tip"""
+        return self.count + (self.tip is not None)
+
+    @property
+    def last_vertex(self):
+        return self.vertices[(self.start + self.count - 1) % self.budget]
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+        self.tip = None
+        self.direction = None
+
+    def _commit(self, pos):
+        """Store a vertex, overwriting the oldest when full; True if one was dropped"""
+        dropped = self.count == self.budget
+        if dropped:
+            self.start = (self.start + 1) % self.budget
+            self.count -= 1
+        self.vertices[(self.start + self.count) % self.budget] = pos
+        self.count += 1
+        return dropped
+
+    def append(self, pos):
+        """Feed the body's current position
+
+        Returns (committed, dropped): whether the previous tip became a
+        vertex, and whether the oldest vertex was discarded to make room.
+        """
+        pos = np.asarray(pos, dtype=float)
+        if self.count == 0:
+            self._commit(pos)
+            self.tip = pos.copy()
+            return False, False
+
+        chord = pos - self.last_vertex
+        length = float(np.linalg.norm(chord))
+        if length == 0:
+            return False, False
+        if self.direction is None:
+            self.direction = chord / length
+            self.tip = pos.copy()
+            return False, False
+
+        # Commit the old tip once the path has turned or run too far from the last vertex
+        committed = dropped = False
+        if np.dot(self.direction, chord) < self.cos_tolerance * length or length > self.max_spacing:
+            dropped = self._commit(self.tip)
+            committed = True
+            chord = pos - self.last_vertex
+            length = float(np.linalg.norm(chord))
+            self.direction = chord / length if length > 0 else None
+        self.tip = pos.copy()
+        return committed, dropped
+
+    def points(self):
+        """(len, 3) vertices from oldest to newest, ending with the tip"""
+        order = (self.start + np.arange(self.count)) % self.budget
+        if self.tip is None:
+            return self.vertices[order]
+        return np.vstack([self.vertices[order], self.tip])
@@ -0,0 +1,221 @@
+"""Streaming trajectory output in chunked columnar files.
+
+steps() turns any integrator into a generator of per-step states and
+record() writes the states flowing through it to a directory of
+append-only .npy chunks, so memory stays constant however long the run:
+
+    states = trajectory.steps(state, 100 * 365.25 * DAY, DAY, integrator)
+    for state in trajectory.record(states, 'century', every=10):
+        pass
+
+    reader = trajectory.TrajectoryReader('century')
+    rows = reader.read_time(50 * 365.25 * DAY, 51 * 365.25 * DAY, names=['Earth', 'Asteroid'])
+
+A trajectory directory holds, for every chunk k, time_k.npy (rows,),
+pos_k.npy and vel_k.npy (rows, bodies, 3), plus index.json with the body
+names and the row count and time span of each chunk. The index is
+rewritten after every chunk, so a trajectory is readable while it is
+being written and up to its last complete chunk after a crash.
+
+Test particles present in the first state are written too, as
+particle_pos_k.npy and particle_vel_k.npy (rows, particles, 3), with their
+ids in the index. Particles removed later in the run (ensemble clones that
+hit, for example) are NaN from then on.
+"""
+import json
+import os
+
+import numpy as np
+
+import physics
+
+INDEX_FILE = 'index.json'
+BUFFER_BYTES = 64 * 2 ** 20  # Row buffer of one chunk across all columns
+COLUMNS = ('time', 'pos', 'vel')
+PARTICLE_COLUMNS = ('particle_pos', 'particle_vel')
+
+
+def steps(state, duration, time_step, integrator=None):
+    """Advance state for duration and yield it after every step
+
+    The same state object is yielded each time; copy what must be kept.
+    integrator works as in physics.propagate.
+    """
+    end_time = state.time + duration
+    while state.time < end_time:
+        if integrator is None:
+            physics.step(state, time_step)
+        else:
+            integrator.step(state, min(integrator.next_step or time_step, end_time - state.time))
+        yield state
+
+
+def record(states, path, chunk_size=4096, every=1, buffer_bytes=BUFFER_BYTES):
+    """Write every `every`-th state of a state stream to path and pass all states on"""
+    with TrajectoryWriter(path, chunk_size, buffer_bytes) as writer:
+        for count, state in enumerate(states, 1):
+            if count % every == 0:
+                writer.append(state)
+            yield state
+
+
+class TrajectoryWriter:
+    """Append body states to a chunked trajectory directory
+
+    Rows are buffered in preallocated arrays and flushed as one file per
+    column when the buffer is full. A chunk holds at most chunk_size rows
+    and as many as fit in buffer_bytes, so ensembles with many particles
+    get shorter chunks instead of a buffer of gigabytes. The body names and
+    the test particle ids are fixed by the first state appended; later
+    states may have lost particles but not gained any.
+    """
+    def __init__(self, path, chunk_size=4096, buffer_bytes=BUFFER_BYTES):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffer_bytes = buffer_bytes
+        self.names = None
+        self.particle_ids = None
+        self.columns = COLUMNS
+        self.chunks = []
+        self.rows = 0
+        self.buffer = None
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, state):
+        """Buffer the current time, positions and velocities of state and its test particles"""
+        if self.names is None:
+            self.names = list(state.names)
+            self.particle_ids = state.particle_ids.copy()
+            n = len(self.names)
+            p = len(self.particle_ids)
+            # Position and velocity of every body and particle plus the time
+            row_bytes = 48 * (n + p) + 8
+            self.chunk_size = min(self.chunk_size, max(1, self.buffer_bytes // row_bytes))
+            self.buffer = {
+                'time': np.empty(self.chunk_size),
+                'pos': np.empty((self.chunk_size, n, 3)),
+                'vel': np.empty((self.chunk_size, n, 3))
+            }
+            if p:
+                self.columns = COLUMNS + PARTICLE_COLUMNS
+                self.buffer['particle_pos'] = np.empty((self.chunk_size, p, 3))
+                self.buffer['particle_vel'] = np.empty((self.chunk_size, p, 3))
+        elif state.names != self.names:
+            raise ValueError(f"Bodies changed during the trajectory: {self.names} -> {state.names}")
+
+        self.buffer['time'][self.rows] = state.time
+        self.buffer['pos'][self.rows] = state.pos
+        self.buffer['vel'][self.rows] = state.vel
+        if len(self.particle_ids) or len(state.particle_ids):
+            slots = self._particle_slots(state.particle_ids)
+            for column, values in (('particle_pos', state.particle_pos), ('particle_vel', state.particle_vel)):
+                row = self.buffer[column][self.rows]
+                row[:] = np.nan
+                row[slots] = values
+        self.rows += 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def _particle_slots(self, ids):
+        """Columns of the particles with ids; ValueError for particles not in the first state"""
+        if not np.isin(ids, self.particle_ids).all():
+            raise ValueError("Test particles were added during the trajectory")
+        return np.searchsorted(self.particle_ids, ids)
+
+    def flush(self):
+        """Write the buffered rows as a new chunk and update the index"""
+        if self.rows == 0:
+            return
+        chunk = len(self.chunks)
+        for column in self.columns:
+            np.save(os.path.join(self.path, f'{column}_{chunk:05d}.npy'), self.buffer[column][:self.rows])
+        self.chunks.append({
+            'rows': self.rows,
+            'start_time': float(self.buffer['time'][0]),
+            'end_time': float(self.buffer['time'][self.rows - 1])
+        })
+        self.rows = 0
+
+        temporary_path = os.path.join(self.path, INDEX_FILE + '.tmp')
+        with open(temporary_path, 'w') as f:
+            json.dump({'names': self.names, 'particle_ids': self.particle_ids.tolist(), 'chunks': self.chunks},
+                      f, indent=2)
+        os.replace(temporary_path, os.path.join(self.path, INDEX_FILE))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TrajectoryReader:
+    """Read slices of a trajectory written by TrajectoryWriter
+
+    Chunks are memory-mapped, so only the rows of a slice are read from
+    disk.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.names = index['names']
+        self.particle_ids = np.array(index.get('particle_ids', []), dtype=np.int64)
+        self.chunks = index['chunks']
+        self.offsets = np.cumsum([0] + [chunk['rows'] for chunk in self.chunks])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _column(self, column, chunk):
+        return np.load(os.path.join(self.path, f'{column}_{chunk:05d}.npy'), mmap_mode='r')
+
+    def read(self, start=0, stop=None, names=None):
+        """Rows [start, stop) as a dict of time, pos and vel arrays
+
+        names selects a subset of the bodies, in the given order. A
+        trajectory with test particles also returns particle_pos and
+        particle_vel for all of them, in the order of particle_ids.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        columns = [self.names.index(name) for name in names] if names is not None else slice(None)
+        has_particles = len(self.particle_ids) > 0
+        parts = {column: [] for column in COLUMNS + (PARTICLE_COLUMNS if has_particles else ())}
+        first = max(int(np.searchsorted(self.offsets, start, side='right')) - 1, 0)
+        for chunk in range(first, len(self.chunks)):
+            if self.offsets[chunk] >= stop:
+                break
+            low = max(start - self.offsets[chunk], 0)
+            high = min(stop, self.offsets[chunk + 1]) - self.offsets[chunk]
+            parts['time'].append(np.array(self._column('time', chunk)[low:high]))
+            for column in ('pos', 'vel'):
+                parts[column].append(np.array(self._column(column, chunk)[low:high][:, columns]))
+            if has_particles:
+                for column in PARTICLE_COLUMNS:
+                    parts[column].append(np.array(self._column(column, chunk)[low:high]))
+
+        n = len(self.names) if names is None else len(names)
+        rows = {
+            'time': np.concatenate(parts['time']) if parts['time'] else np.zeros(0),
+            'pos': np.concatenate(parts['pos']) if parts['pos'] else np.zeros((0, n, 3)),
+            'vel': np.concatenate(parts['vel']) if parts['vel'] else np.zeros((0, n, 3))
+        }
+        if has_particles:
+            p = len(self.particle_ids)
+            for column in PARTICLE_COLUMNS:
+                rows[column] = np.concatenate(parts[column]) if parts[column] else np.zeros((0, p, 3))
+        return rows
+
+    def _row(self, time, side):
+        """Row index where time would be inserted, as np.searchsorted over all rows"""
+        for chunk, info in enumerate(self.chunks):
+            if info['end_time'] > time or (side == 'left' and info['end_time'] == time):
+                return int(self.offsets[chunk] + np.searchsorted(self._column('time', chunk), time, side=side))
+        return len(self)
+
+    def read_time(self, start_time, end_time, names=None):
+        """Rows with start_time <= time <= end_time"""
+        return self.read(self._row(start_time, 'left'), self._row(end_time, 'right'), names)
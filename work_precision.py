@@ -0,0 +1,328 @@
+"""Work-precision benchmark of the integrators against reference orbits.
+
+Each case is propagated with every integrator over a range of step
+settings: steps per orbit for the fixed-step integrators, tolerances for
+the adaptive ones. Two-body cases are compared with their closed-form
+solution (kepler.kepler_drift), the perturbed case with a Bulirsch-Stoer
+run at tight tolerance. For every run the table lists the work (steps,
+force evaluations, wall time) against the final position error and the
+relative energy drift:
+
+    python work_precision.py                        # all cases, 1 orbit
+    python work_precision.py --case icarus --orbits 5 --output icarus.csv
+    python work_precision.py --budget 1e4           # cheapest run within 10 km
+
+Cases:
+
+- earth: Earth on a circular orbit around the fixed Sun
+- icarus: an Icarus-like orbit (a = 1.078 AU, e = 0.827) around the fixed
+  Sun, started at aphelion so the run passes perihelion at 0.19 AU
+- earth-moon: Earth and Moon alone, both free, on an eccentric (e = 0.055)
+  orbit about their barycentre
+- earth-jupiter: Earth and Jupiter on circular orbits around the fixed Sun,
+  starting in conjunction; Jupiter's pull is the perturbation
+
+Wisdom-Holman needs a fixed central body and is skipped for earth-moon. In
+earth and icarus its Kepler drift already is the exact solution, so its
+error there is round-off: those rows are marked in the table and left out
+of --budget. earth-jupiter measures its real accuracy.
+"""
+import argparse
+import csv
+import functools
+import math
+import sys
+import time
+
+import numpy as np
+
+import ephemeris
+import integrators
+import physics
+from kepler import kepler_drift
+from physics import AU, G, MOON_DISTANCE
+
+STEPS_PER_ORBIT = [25, 50, 100, 200, 400, 800, 1600, 3200]
+TOLERANCES = [1e-4, 1e-6, 1e-8, 1e-10, 1e-12]
+RESULT_FIELDS = ['case', 'integrator', 'setting', 'steps', 'force_evaluations', 'wall_time',
+                 'position_error', 'relative_position_error', 'energy_error', 'trivially_exact']
+
+ICARUS_ORBIT = {'semi_major_axis': 1.078 * AU, 'eccentricity': 0.827}
+MOON_ECCENTRICITY = 0.055
+# Bulirsch-Stoer settings for the reference run of cases without a closed-form solution
+REFERENCE_TOLERANCES = {'rtol': 1e-14, 'atol_pos': 1e-6, 'atol_vel': 1e-12}
+
+
+class CountingSolver:
+    """All-pairs force solver that counts its evaluations (usable as SystemState.force_solver)"""
+    def __init__(self):
+        self.evaluations = 0
+        self.pos = np.zeros((0, 3))
+        self.mass = np.zeros(0)
+
+    def accelerations(self, pos, mass, softening=0.0):
+        self.evaluations += 1
+        self.pos, self.mass = pos, mass
+        return physics.calculate_accelerations(pos, mass, softening)
+
+    def accelerations_at(self, target_pos, softening=0.0):
+        """Accelerations of test particles from the bodies of the last accelerations() call"""
+        return physics.calculate_field_accelerations(target_pos, self.pos, self.mass, softening)
+
+
+def _state(bodies):
+    """SystemState from (name, mass, pos, vel, fixed) tuples, counting force evaluations"""
+    state = physics.SystemState(force_solver=CountingSolver())
+    for name, mass, pos, vel, fixed in bodies:
+        state.add_body(name, mass, pos, vel, fixed)
+    return state
+
+
+def earth_case():
+    """Circular Earth orbit around the fixed Sun; returns (state, period, length scale)"""
+    sun_mass = physics.BODY_DATA['Sun']['mass']
+    speed = math.sqrt(G * sun_mass / AU)
+    state = _state([
+        ('Sun', sun_mass, [0, 0, 0], [0, 0, 0], True),
+        ('Earth', physics.BODY_DATA['Earth']['mass'], [AU, 0, 0], [0, speed, 0], False)
+    ])
+    return state, 2 * math.pi * AU / speed, AU
+
+
+def icarus_case():
+    """Eccentric Icarus-like orbit around the fixed Sun, from aphelion"""
+    sun_mass = physics.BODY_DATA['Sun']['mass']
+    mu = G * sun_mass
+    a, e = ICARUS_ORBIT['semi_major_axis'], ICARUS_ORBIT['eccentricity']
+    aphelion = a * (1 + e)
+    speed = math.sqrt(mu * (1 - e) / aphelion)
+    state = _state([
+        ('Sun', sun_mass, [0, 0, 0], [0, 0, 0], True),
+        ('Icarus', 3.6e12, [aphelion, 0, 0], [0, speed, 0], False)
+    ])
+    return state, 2 * math.pi * math.sqrt(a ** 3 / mu), a
+
+
+def earth_moon_case():
+    """Free Earth and Moon on an eccentric orbit, from perigee, barycentre at rest"""
+    earth_mass = physics.BODY_DATA['Earth']['mass']
+    moon_mass = physics.BODY_DATA['Moon']['mass']
+    total = earth_mass + moon_mass
+    mu = G * total
+    a, e = MOON_DISTANCE, MOON_ECCENTRICITY
+    perigee = a * (1 - e)
+    speed = math.sqrt(mu * (1 + e) / perigee)
+    state = _state([
+        ('Earth', earth_mass, [-moon_mass / total * perigee, 0, 0], [0, -moon_mass / total * speed, 0], False),
+        ('Moon', moon_mass, [earth_mass / total * perigee, 0, 0], [0, earth_mass / total * speed, 0], False)
+    ])
+    return state, 2 * math.pi * math.sqrt(a ** 3 / mu), a
+
+
+def earth_jupiter_case():
+    """Earth and Jupiter on circular orbits around the fixed Sun, in conjunction"""
+    sun_mass = physics.BODY_DATA['Sun']['mass']
+    mu = G * sun_mass
+    jupiter = ephemeris.PLANET_DATA['Jupiter']
+    jupiter_distance = jupiter['distance'] * AU
+    state = _state([
+        ('Sun', sun_mass, [0, 0, 0], [0, 0, 0], True),
+        ('Earth', physics.BODY_DATA['Earth']['mass'], [AU, 0, 0], [0, math.sqrt(mu / AU), 0], False),
+        ('Jupiter', jupiter['mass'], [jupiter_distance, 0, 0], [0, math.sqrt(mu / jupiter_distance), 0], False)
+    ])
+    return state, 2 * math.pi * math.sqrt(AU ** 3 / mu), AU
+
+
+CASES = {
+    'earth': earth_case,
+    'icarus': icarus_case,
+    'earth-moon': earth_moon_case,
+    'earth-jupiter': earth_jupiter_case
+}
+
+
+def two_body_reference(state, duration):
+    """Exact positions of the two bodies of state after duration
+
+    With a fixed body the other follows a Kepler orbit around it; otherwise
+    both move about their barycentre, which drifts uniformly.
+    """
+    pos, vel, mass = state.pos, state.vel, state.mass
+    if state.fixed.any():
+        central = int(np.flatnonzero(state.fixed)[0])
+        other = 1 - central
+        reference = pos.copy()
+        drift_pos, _ = kepler_drift((pos[other] - pos[central])[np.newaxis], vel[other][np.newaxis],
+                                    G * mass[central], duration)
+        reference[other] = pos[central] + drift_pos[0]
+        return reference
+
+    total = mass.sum()
+    barycentre = (mass @ pos + (mass @ vel) * duration) / total
+    rel_pos, _ = kepler_drift((pos[1] - pos[0])[np.newaxis], (vel[1] - vel[0])[np.newaxis], G * total, duration)
+    return np.array([barycentre - mass[1] / total * rel_pos[0], barycentre + mass[0] / total * rel_pos[0]])
+
+
+@functools.lru_cache(maxsize=None)
+def numerical_reference(case, duration):
+    """Positions of the bodies of case after duration from a tight-tolerance Bulirsch-Stoer run"""
+    state = CASES[case]()[0]
+    integrators.advance(integrators.create_integrator('bs', **REFERENCE_TOLERANCES), state, duration)
+    return state.pos.copy()
+
+
+def reference_positions(case, state, duration):
+    """Reference positions after duration: exact for two bodies, numerical otherwise"""
+    if len(state.names) == 2:
+        return two_body_reference(state, duration)
+    return numerical_reference(case, duration)
+
+
+def trivially_exact(state, integrator_name):
+    """True when the integrator's drift step alone solves the case exactly
+
+    Wisdom-Holman drifts each body on a Kepler orbit around the fixed
+    central body, which is the whole motion when there is one other body.
+    """
+    return integrator_name == 'wh' and len(state.names) == 2 and bool(state.fixed.any())
+
+
+def total_energy(state):
+    """Kinetic plus potential energy of the bodies of state"""
+    kinetic = 0.5 * np.sum(state.mass * np.einsum('ij,ij->i', state.vel, state.vel))
+    potential = 0.0
+    for i in range(len(state.mass)):
+        distance = np.linalg.norm(state.pos[i + 1:] - state.pos[i], axis=1)
+        potential -= G * state.mass[i] * np.sum(state.mass[i + 1:] / distance)
+    return kinetic + potential
+
+
+def run_case(case, integrator_name, setting, orbits=1.0):
+    """Propagate one case with one integrator setting and return its result row
+
+    setting is the number of steps per orbit for fixed-step integrators and
+    the relative tolerance for adaptive ones.
+    """
+    state, period, length = CASES[case]()
+    duration = orbits * period
+    reference = reference_positions(case, state, duration)
+    exact = trivially_exact(state, integrator_name)
+    initial_energy = total_energy(state)
+
+    if integrators.INTEGRATORS[integrator_name].adaptive:
+        speed = 2 * math.pi * length / period
+        integrator = integrators.create_integrator(integrator_name, rtol=setting, atol_pos=setting * length,
+                                                   atol_vel=setting * speed)
+        time_step = period / 100  # First trial step; later steps follow the error control
+    else:
+        integrator = integrators.create_integrator(integrator_name)
+        time_step = period / setting
+
+    steps = 0
+    start = time.perf_counter()
+    end_time = state.time + duration
+    while end_time - state.time > 1e-9 * duration:
+        integrator.step(state, min(integrator.next_step or time_step, end_time - state.time))
+        steps += 1
+    wall_time = time.perf_counter() - start
+
+    position_error = float(np.max(np.linalg.norm(state.pos - reference, axis=1)))
+    return {
+        'case': case,
+        'integrator': integrator_name,
+        'setting': setting,
+        'steps': steps,
+        'force_evaluations': state.force_solver.evaluations,
+        'wall_time': wall_time,
+        'position_error': position_error,
+        'relative_position_error': position_error / length,
+        'energy_error': abs(total_energy(state) / initial_energy - 1),
+        'trivially_exact': exact
+    }
+
+
+def settings_for(integrator_name, steps_per_orbit=STEPS_PER_ORBIT, tolerances=TOLERANCES):
+    return tolerances if integrators.INTEGRATORS[integrator_name].adaptive else steps_per_orbit
+
+
+def run_work_precision(cases=None, integrator_names=None, orbits=1.0, steps_per_orbit=STEPS_PER_ORBIT,
+                       tolerances=TOLERANCES):
+    """Yield a result row for every case, integrator and setting"""
+    for case in cases or CASES:
+        for integrator_name in integrator_names or integrators.INTEGRATORS:
+            if integrator_name == 'wh' and not CASES[case]()[0].fixed.any():
+                continue
+            for setting in settings_for(integrator_name, steps_per_orbit, tolerances):
+                yield run_case(case, integrator_name, setting, orbits)
+
+
+def cheapest(rows, budget):
+    """Per case, the row with the fewest force evaluations whose position error is within budget (m)
+
+    Trivially exact rows are skipped: their error says nothing about the
+    integrator's accuracy on a real problem.
+    """
+    best = {}
+    for row in rows:
+        if row['position_error'] <= budget and not row['trivially_exact']:
+            current = best.get(row['case'])
+            if current is None or row['force_evaluations'] < current['force_evaluations']:
+                best[row['case']] = row
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work-precision tables against reference orbits")
+    parser.add_argument('--case', action='append', choices=list(CASES), help="Case to run; repeatable")
+    parser.add_argument('--integrator', action='append', choices=list(integrators.INTEGRATORS),
+                        help="Integrator to run; repeatable")
+    parser.add_argument('--orbits', type=float, default=1.0, help="Propagated duration in orbital periods")
+    parser.add_argument('--quick', action='store_true', help="Only the coarser half of the settings")
+    parser.add_argument('--output', default=None, help="CSV file for the result rows")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="Position error budget in m; report the cheapest run per case within it")
+    args = parser.parse_args(argv)
+
+    steps_per_orbit = STEPS_PER_ORBIT[:4] if args.quick else STEPS_PER_ORBIT
+    tolerances = TOLERANCES[:3] if args.quick else TOLERANCES
+
+    writer = None
+    output_file = None
+    if args.output:
+        output_file = open(args.output, 'w', newline='')
+        writer = csv.DictWriter(output_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+    rows = []
+    print(f"{'Case':<13} {'Integrator':<10} {'Setting':>8} {'Steps':>7} {'Forces':>8} {'Time (s)':>9} "
+          f"{'Pos error (m)':>14} {'Rel. error':>10} {'Energy drift':>12}")
+    try:
+        for row in run_work_precision(args.case, args.integrator, args.orbits, steps_per_orbit, tolerances):
+            rows.append(row)
+            if writer:
+                writer.writerow(row)
+            print(f"{row['case']:<13} {row['integrator']:<10} {row['setting']:>8g} {row['steps']:>7} "
+                  f"{row['force_evaluations']:>8} {row['wall_time']:>9.3f} {row['position_error']:>14.3e} "
+                  f"{row['relative_position_error']:>10.2e} {row['energy_error']:>12.2e}"
+                  f"{' *' if row['trivially_exact'] else ''}")
+    finally:
+        if output_file:
+            output_file.close()
+    if any(row['trivially_exact'] for row in rows):
+        print("* Kepler drift is the exact solution of this case: round-off only, excluded from --budget")
+
+    if args.budget is not None:
+        best = cheapest(rows, args.budget)
+        print(f"\nCheapest runs within {args.budget:g} m:")
+        for case in args.case or CASES:
+            row = best.get(case)
+            if row is None:
+                print(f"{case:<13} none of the settings meets the budget")
+            else:
+                print(f"{case:<13} {row['integrator']} at {row['setting']:g} "
+                      f"({row['force_evaluations']} force evaluations, {row['position_error']:.3e} m)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())